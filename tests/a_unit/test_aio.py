@@ -0,0 +1,173 @@
+import asyncio
+from collections import defaultdict
+
+import ldap3
+import mock
+import pytest
+from mock import ANY, call
+
+import tldap.backend
+import tldap.backend.aio
+import tldap.database
+import tldap.database.aio
+import tldap.modlist
+import tldap.transaction
+import tests.database
+
+
+@pytest.fixture
+def settings():
+    return {
+        'default': {
+            'ENGINE': 'tldap.backend.fake_transactions',
+            'URI': 'ldap://localhost:38911/',
+            'USER': 'cn=Manager,dc=python-ldap,dc=org',
+            'PASSWORD': 'password',
+            'LDAP_ACCOUNT_BASE': 'ou=People, dc=python-ldap,dc=org',
+            'LDAP_GROUP_BASE': 'ou=Group, dc=python-ldap,dc=org'
+        }
+    }
+
+
+@pytest.fixture
+def mock_connection(settings):
+    tldap.backend.setup(settings)
+
+    connection = mock.MagicMock()
+    connection.closed = False
+    connection.bound = True
+    connection.result = {}
+
+    # The pool is shared, so this affects every connection created.
+    tldap.backend.connections['default'].set_connection_class(mock.Mock(return_value=connection))
+    return connection
+
+
+def test_connection_per_task(settings):
+    """ Test every task gets its own connection sharing the same pool. """
+    tldap.backend.setup(settings)
+
+    async def get_connection():
+        return tldap.backend.aio.get_connection()
+
+    async def main():
+        c1 = tldap.backend.aio.get_connection()
+        c2 = tldap.backend.aio.get_connection()
+        c3 = await asyncio.create_task(get_connection())
+        return c1, c2, c3
+
+    async def other():
+        return await asyncio.create_task(get_connection())
+
+    c1, c2, c3 = asyncio.run(main())
+    c4 = asyncio.run(other())
+
+    # Connection inherited by new task.
+    assert c1 is c2
+    assert c1 is c3
+
+    # New context.
+    assert c1 is not c4
+    assert c1.connection.pool is c4.connection.pool
+
+
+def test_rollback(mock_connection):
+    """ Test rollback of async transaction. """
+    dn = 'uid=tux,ou=People,dc=python-ldap,dc=org'
+    modlist = tldap.modlist.addModlist({'sn': [b"Torvalds"]})
+    mock_connection.response = [{
+        'type': 'searchResEntry',
+        'dn': dn,
+        'raw_attributes': modlist,
+    }]
+
+    async def main():
+        c = tldap.backend.aio.get_connection()
+        async with tldap.transaction.async_commit_on_success():
+            await c.add(dn, modlist)
+            await c.modify(dn, {'sn': [(ldap3.MODIFY_REPLACE, [b"Gates"])]})
+            raise RuntimeError("testing failure")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(main())
+
+    expected_calls = [
+        call.add(dn, None, modlist),
+        call.search(dn, '(objectclass=*)', 'BASE', attributes=ANY),
+        call.modify(dn, {'sn': [('MODIFY_REPLACE', [b'Gates'])]}),
+        call.modify(dn, {'sn': [('MODIFY_REPLACE', [b'Torvalds'])]}),
+        call.delete(dn)
+    ]
+    mock_connection.assert_has_calls(expected_calls)
+
+
+def test_search(mock_ldap):
+    """ Test async database search. """
+    group = tests.database.Group({
+        'dn': 'cn=group1,ou=Group,dc=python-ldap,dc=org',
+        'cn': 'group1',
+        'gidNumber': 10,
+    })
+    mock_ldap.search.return_value = [
+        (group.get_as_single('dn'), defaultdict(list, {'cn': [b'group1'], 'gidNumber': [b'10']})),
+    ]
+
+    async def main():
+        database = tldap.database.Database(mock_ldap)
+        return [
+            result async for result in
+            tldap.database.aio.search(tests.database.Group, database=database)
+        ]
+
+    results = asyncio.run(main())
+    assert len(results) == 1
+    assert results[0].get_as_single('gidNumber') == 10
+
+
+def test_insert(mock_ldap):
+    """ Test async database insert. """
+    group = tests.database.Group({
+        'cn': 'group1',
+        'gidNumber': 10,
+    })
+
+    async def main():
+        database = tldap.database.Database(mock_ldap)
+        return await tldap.database.aio.insert(group, database=database)
+
+    group = asyncio.run(main())
+    assert group.get_as_single('dn') == 'cn=group1,ou=Group,dc=python-ldap,dc=org'
+    mock_ldap.add.assert_called_once_with('cn=group1,ou=Group,dc=python-ldap,dc=org', ANY)
+
+
+def test_on_load_in_transaction(mock_connection):
+    """ Test lookups in on_load hooks use the connection of the task. """
+    dn = 'cn=group1,ou=Group,dc=python-ldap,dc=org'
+    mock_connection.response = [{
+        'type': 'searchResEntry',
+        'dn': dn,
+        'raw_attributes': defaultdict(list, {'cn': [b'group1'], 'gidNumber': [b'10']}),
+    }]
+    used = []
+
+    class Group(tests.database.Group):
+        __slots__ = ()
+
+        @classmethod
+        def on_load(cls, python_data, database):
+            # a lookup that doesn't pass the database along
+            default = tldap.database.get_default_database()
+            used.append((default.connection, default.connection.is_managed()))
+            if len(used) == 1:
+                tldap.database.get_by_dn(tests.database.Group, dn)
+            return super().on_load(python_data, database)
+
+    async def main():
+        async with tldap.transaction.async_commit_on_success():
+            group = await tldap.database.aio.get_one(Group, tldap.Q(cn='group1'))
+            return group, tldap.backend.aio.get_connection().connection
+
+    group, connection = asyncio.run(main())
+    assert group.get_as_single('cn') == 'group1'
+    assert used == [(connection, True)]
+    assert connection is not tldap.backend.connections['default']
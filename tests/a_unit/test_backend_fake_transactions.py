@@ -24,6 +24,10 @@ from mock import call, ANY
 
 import tldap
 import tldap.backend
+import tldap.backend.base
+import tldap.backend.controls
+import tldap.backend.tls
+import tldap.database.cache
 import tldap.transaction
 import tldap.exceptions
 import tldap.modlist
@@ -32,6 +36,7 @@ import tldap.test.slapd
 
 import ldap3
 import ldap3.core.exceptions as errors
+from pyasn1.codec.ber import encoder
 
 server = None
 
@@ -39,6 +44,17 @@ server = None
 NO_SUCH_OBJECT = ldap3.core.exceptions.LDAPNoSuchObjectResult
 
 
+def get_bulk_response(search_response, lost=()):
+    """ Get the response to a bulk operation; searches have message ID 3. """
+    def get_response(message_id):
+        if message_id == 3:
+            return search_response.response, {'result': 0}
+        if message_id in lost:
+            raise errors.LDAPSocketReceiveError("lost")
+        return [], {'result': 0}
+    return get_response
+
+
 class Defaults:
     pass
 
@@ -101,6 +117,9 @@ def defaults(search_response):
 
     values.mock_connection = mock.MagicMock()
     values.mock_connection.response = search_response
+    values.mock_connection.closed = False
+    values.mock_connection.bound = True
+    values.mock_connection.result = {}
 
     values.mock_class = mock.MagicMock()
     values.mock_class.return_value = values.mock_connection
@@ -152,8 +171,10 @@ class TestBackendBase:
             password='password',
             user='cn=Manager,dc=python-ldap,dc=org')
 
-        expected_calls = [call.open(), call.bind(), call.unbind()]
-        defaults.mock_connection.assert_has_calls(expected_calls)
+        # Connection is kept for the next password check.
+        expected_calls = [call.open(), call.bind()]
+        assert defaults.mock_connection.mock_calls == expected_calls
+        assert tldap.backend.connection.auth_pool.stats()['idle'] == 1
 
     def test_check_password_wrong(self, defaults):
         """ Test that we can't logon correctly with wrong password. """
@@ -175,6 +196,43 @@ class TestBackendBase:
         expected_calls = [call.open(), call.bind(), call.unbind()]
         defaults.mock_connection.assert_has_calls(expected_calls)
 
+    def test_check_password_rebind(self, defaults):
+        """ Test that connections are rebound for another user. """
+        c = tldap.backend.connection
+        assert c.check_password('uid=tux,ou=People,dc=python-ldap,dc=org', 'silly') is True
+        assert c.check_password('uid=tuz,ou=People,dc=python-ldap,dc=org', 'silly2') is True
+
+        defaults.mock_class.assert_called_once()
+        defaults.mock_connection.rebind.assert_called_once_with(
+            user='uid=tuz,ou=People,dc=python-ldap,dc=org', password='silly2', read_server_info=False)
+
+    def test_check_password_rebind_wrong(self, defaults):
+        """ Test that connections are kept after a rebind with wrong password. """
+        c = tldap.backend.connection
+        assert c.check_password('uid=tux,ou=People,dc=python-ldap,dc=org', 'silly') is True
+
+        defaults.mock_connection.rebind.side_effect = errors.LDAPInvalidCredentialsResult()
+        assert c.check_password('uid=tuz,ou=People,dc=python-ldap,dc=org', 'wrong') is False
+
+        defaults.mock_class.assert_called_once()
+        assert c.auth_pool.stats()['idle'] == 1
+
+    def test_check_password_rebind_failed(self, defaults):
+        """ Test that a new connection is used if rebind fails. """
+        c = tldap.backend.connection
+        assert c.check_password('uid=tux,ou=People,dc=python-ldap,dc=org', 'silly') is True
+
+        defaults.mock_connection.rebind.side_effect = errors.LDAPSocketReceiveError()
+        assert c.check_password('uid=tuz,ou=People,dc=python-ldap,dc=org', 'silly2') is True
+
+        assert defaults.mock_class.call_count == 2
+        defaults.mock_class.assert_called_with(
+            defaults.expected_server,
+            authentication='SIMPLE',
+            password='silly2',
+            user='uid=tuz,ou=People,dc=python-ldap,dc=org')
+        assert c.auth_pool.stats()['idle'] == 1
+
     def test_search(self, search_response, defaults):
         """ Test base search scope. """
         dn = 'uid=tux,ou=People,dc=python-ldap,dc=org'
@@ -203,6 +261,166 @@ class TestBackendBase:
         ]
         defaults.mock_connection.assert_has_calls(expected_calls)
 
+    def test_search_paged(self, defaults):
+        """ Test search follows the paged results cookie. """
+        dn1 = 'uid=tux,ou=People,dc=python-ldap,dc=org'
+        dn2 = 'uid=tuz,ou=People,dc=python-ldap,dc=org'
+        pages = {None: (dn1, b'cookie'), b'cookie': (dn2, b'')}
+        conn = defaults.mock_connection
+
+        def search(*args, paged_cookie=None, **kwargs):
+            dn, next_cookie = pages[paged_cookie]
+            conn.response = MockSearchResponse()
+            conn.response.add(dn, defaults.modlist)
+            conn.result = {'controls': {
+                tldap.backend.base.PAGED_RESULTS_OID: {'value': {'cookie': next_cookie}},
+            }}
+        conn.search.side_effect = search
+
+        c = tldap.backend.connection
+        r = c.search('ou=People,dc=python-ldap,dc=org', ldap3.SUBTREE, limit=1)
+        assert [dn for dn, _ in r] == [dn1, dn2]
+
+        expected_calls = [
+            call.search(
+                'ou=People,dc=python-ldap,dc=org', '(objectClass=*)', 'SUBTREE',
+                attributes=ANY, paged_size=1),
+            call.search(
+                'ou=People,dc=python-ldap,dc=org', '(objectClass=*)', 'SUBTREE',
+                attributes=ANY, paged_size=1, paged_cookie=b'cookie'),
+        ]
+        assert conn.search.call_args_list == expected_calls
+        assert c.pool.stats()['in_use'] == 0
+
+    def test_search_paged_abandon(self, defaults):
+        """ Test unread pages are abandoned if search is not finished. """
+        dn = 'uid=tux,ou=People,dc=python-ldap,dc=org'
+        conn = defaults.mock_connection
+        conn.response = MockSearchResponse()
+        conn.response.add(dn, defaults.modlist)
+        conn.result = {'controls': {
+            tldap.backend.base.PAGED_RESULTS_OID: {'value': {'cookie': b'cookie'}},
+        }}
+
+        c = tldap.backend.connection
+        r = c.search(dn, ldap3.SUBTREE, limit=1)
+        assert next(r)[0] == dn
+        r.close()
+
+        conn.search.assert_called_with(
+            dn, '(objectClass=*)', 'SUBTREE',
+            attributes=ANY, paged_size=0, paged_cookie=b'cookie')
+        assert c.pool.stats()['in_use'] == 0
+
+    def test_search_paged_broken(self, defaults):
+        """ Test a connection that fails fetching a page is not reused. """
+        dn = 'uid=tux,ou=People,dc=python-ldap,dc=org'
+        conn = defaults.mock_connection
+
+        def search(*args, paged_cookie=None, **kwargs):
+            if paged_cookie is not None:
+                raise errors.LDAPSocketReceiveError("timed out")
+            conn.response = MockSearchResponse()
+            conn.response.add(dn, defaults.modlist)
+            conn.result = {'controls': {
+                tldap.backend.base.PAGED_RESULTS_OID: {'value': {'cookie': b'cookie'}},
+            }}
+        conn.search.side_effect = search
+
+        c = tldap.backend.connection
+        r = c.search(dn, ldap3.SUBTREE, limit=1)
+        with pytest.raises(errors.LDAPSocketReceiveError):
+            list(r)
+
+        # no attempt to abandon the search on the broken connection
+        assert conn.search.call_count == 2
+        assert c.pool.stats()['in_use'] == 0
+        assert c.pool.stats()['idle'] == 0
+        conn.unbind.assert_called_once_with()
+
+    def test_search_vlv(self, defaults):
+        """ Test sorted window of results uses sort and VLV controls. """
+        conn = defaults.mock_connection
+        conn.response = MockSearchResponse()
+        for uid in ['tux', 'tuy', 'tuz']:
+            conn.response.add('uid=%s,ou=People,dc=python-ldap,dc=org' % uid, defaults.modlist)
+
+        # the server positioned the view one entry before the one requested
+        vlv_response = tldap.backend.controls.VirtualListViewResponse()
+        vlv_response['targetPosition'] = 10
+        vlv_response['contentCount'] = 12
+        vlv_response['virtualListViewResult'] = 0
+        conn.result = {'controls': {
+            tldap.backend.controls.VLV_RESPONSE_OID: {'value': encoder.encode(vlv_response)},
+        }}
+
+        c = tldap.backend.connection
+        results = list(c.search(
+            'ou=People,dc=python-ldap,dc=org', ldap3.SUBTREE, order_by=['-uid'], offset=10, count=3))
+        assert [dn for dn, _ in results] == [
+            'uid=tuy,ou=People,dc=python-ldap,dc=org',
+            'uid=tuz,ou=People,dc=python-ldap,dc=org',
+        ]
+
+        conn.search.assert_called_once_with(
+            'ou=People,dc=python-ldap,dc=org', '(objectClass=*)', 'SUBTREE',
+            attributes=ANY, controls=[ANY, ANY])
+        sort, vlv = conn.search.call_args[1]['controls']
+        assert str(sort['controlType']) == tldap.backend.controls.SORT_REQUEST_OID
+        assert str(vlv['controlType']) == tldap.backend.controls.VLV_REQUEST_OID
+
+    def test_search_window(self, defaults):
+        """ Test a window of unsorted results is read from the pages. """
+        conn = defaults.mock_connection
+        conn.response = MockSearchResponse()
+        for uid in ['tux', 'tuy', 'tuz']:
+            conn.response.add('uid=%s,ou=People,dc=python-ldap,dc=org' % uid, defaults.modlist)
+
+        c = tldap.backend.connection
+        results = list(c.search(
+            'ou=People,dc=python-ldap,dc=org', ldap3.SUBTREE, offset=1, count=1))
+        assert [dn for dn, _ in results] == ['uid=tuy,ou=People,dc=python-ldap,dc=org']
+        conn.search.assert_called_once_with(
+            'ou=People,dc=python-ldap,dc=org', '(objectClass=*)', 'SUBTREE',
+            attributes=ANY, paged_size=ANY, size_limit=2)
+
+    def test_sort_control(self):
+        """ Test encoding of the sort control. """
+        control = tldap.backend.controls.sort_control(['uid', '-cn'])
+        assert bytes(control['controlValue']) == (
+            b'\x30\x10'
+            b'\x30\x05\x04\x03uid'
+            b'\x30\x07\x04\x02cn\x81\x01\xff'
+        )
+
+    def test_connection_reused(self, search_response, defaults):
+        """ Test the same connection is reused by the pool. """
+        dn = 'uid=tux,ou=People,dc=python-ldap,dc=org'
+        search_response.add(dn, defaults.modlist)
+
+        c = tldap.backend.connection
+        list(c.search(dn, ldap3.BASE))
+        list(c.search(dn, ldap3.BASE))
+
+        defaults.mock_class.assert_called_once()
+        assert c.pool.stats()['in_use'] == 0
+        assert c.pool.stats()['idle'] == 1
+
+    def test_server_reused(self, defaults):
+        """ Test new connections share the same Server and Tls objects. """
+        c = tldap.backend.connection
+        c.settings_dict['START_TLS'] = True
+
+        c.pool.discard(c.pool.checkout())
+        c.pool.discard(c.pool.checkout())
+
+        assert defaults.mock_class.call_count == 2
+        server1 = defaults.mock_class.call_args_list[0][0][0]
+        server2 = defaults.mock_class.call_args_list[1][0][0]
+        assert server1 is server2
+        assert isinstance(server1.tls, tldap.backend.tls.Tls)
+        assert server1.tls.get_ssl_context() is server1.tls.get_ssl_context()
+
 
 class TestBackendFakeTransactions:
     def test_roll_back_explicit(self, search_response, defaults):
@@ -620,3 +838,132 @@ class TestBackendFakeTransactions:
             call.delete(dn),
         ]
         defaults.mock_connection.assert_has_calls(expected_calls)
+
+    def test_roll_back_invalidates_cache(self, search_response, defaults):
+        """ Test searches that could have cached uncommitted changes are forgotten. """
+        dn = 'uid=tux,ou=People,dc=python-ldap,dc=org'
+        search_response.add(dn, defaults.modlist)
+
+        c = tldap.backend.connection
+        c.settings_dict['CACHE_MAX_SIZE'] = 10
+        cache = tldap.database.cache.get_cache(c)
+
+        with tldap.transaction.commit_on_success():
+            c.modify(dn, {'sn': [(ldap3.MODIFY_REPLACE, [b"Gates"])]})
+            # another thread caches the uncommitted change
+            cache.set('people', 'ou=People,dc=python-ldap,dc=org', [(dn, {'sn': [b"Gates"]})])
+            cache.set('groups', 'ou=Group,dc=python-ldap,dc=org', [])
+            c.rollback()
+
+        assert cache.get('people') is None
+        assert cache.get('groups') == []
+
+    def test_bulk_roll_back(self, search_response, defaults):
+        """ Test bulk operations are pipelined and rolled back. """
+        dn = 'uid=tux,ou=People,dc=python-ldap,dc=org'
+        dn2 = 'uid=tuz,ou=People,dc=python-ldap,dc=org'
+        search_response.add(dn, defaults.modlist)
+        defaults.mock_connection.search.return_value = 3
+        defaults.mock_connection.add.return_value = 1
+        defaults.mock_connection.modify.return_value = 2
+        defaults.mock_connection.get_response.side_effect = get_bulk_response(search_response)
+
+        c = tldap.backend.connection
+        with tldap.transaction.commit_on_success():
+            results = c.bulk([
+                ('add', dn2, defaults.modlist),
+                ('modify', dn, {'sn': [(ldap3.MODIFY_REPLACE, [b"Gates"])]}),
+            ])
+            c.rollback()
+
+        assert [result.ok for result in results] == [True, True]
+        assert [result.message_id for result in results] == [1, 2]
+        defaults.mock_class.assert_any_call(
+            defaults.expected_server,
+            user='cn=Manager,dc=python-ldap,dc=org',
+            password='password',
+            authentication=ldap3.SIMPLE,
+            client_strategy=ldap3.ASYNC)
+
+        expected_calls = [
+            call.open(),
+            call.bind(),
+            call.search(dn, '(objectclass=*)', 'BASE', attributes=ANY),
+            call.get_response(3),
+            call.add(dn2, None, defaults.modlist),
+            call.modify(dn, {'sn': [('MODIFY_REPLACE', [b'Gates'])]}),
+            call.get_response(1),
+            call.get_response(2),
+            call.unbind(),
+            call.open(),
+            call.bind(),
+            call.modify(dn, {'sn': [('MODIFY_REPLACE', [b'Torvalds'])]}),
+            call.delete(dn2),
+        ]
+        defaults.mock_connection.assert_has_calls(expected_calls)
+
+    def test_bulk_error(self, search_response, defaults):
+        """ Test a failed bulk operation is reported and not rolled back. """
+        dn = 'uid=tux,ou=People,dc=python-ldap,dc=org'
+        dn2 = 'uid=tuz,ou=People,dc=python-ldap,dc=org'
+        defaults.mock_connection.add.side_effect = [1, 2]
+        defaults.mock_connection.get_response.side_effect = [
+            errors.LDAPEntryAlreadyExistsResult("exists"),
+            ([], {'result': 0}),
+        ]
+
+        c = tldap.backend.connection
+        with tldap.transaction.commit_on_success():
+            results = c.bulk([
+                ('add', dn, defaults.modlist),
+                ('add', dn2, defaults.modlist),
+            ])
+            c.rollback()
+
+        assert not results[0].ok
+        assert isinstance(results[0].error, errors.LDAPEntryAlreadyExistsResult)
+        assert results[1].ok
+        defaults.mock_connection.delete.assert_called_once_with(dn2)
+
+    def test_bulk_missing(self, search_response, defaults):
+        """ Test a bulk operation on a missing DN fails without stopping the others. """
+        dn = 'uid=tux,ou=People,dc=python-ldap,dc=org'
+        dn2 = 'uid=tuz,ou=People,dc=python-ldap,dc=org'
+        defaults.mock_connection.search.return_value = 3
+        defaults.mock_connection.add.return_value = 1
+        defaults.mock_connection.get_response.side_effect = get_bulk_response(search_response)
+
+        c = tldap.backend.connection
+        with tldap.transaction.commit_on_success():
+            results = c.bulk([
+                ('add', dn2, defaults.modlist),
+                ('delete', dn),
+                ('frobnicate', dn),
+            ])
+            c.rollback()
+
+        assert results[0].ok
+        assert isinstance(results[1].error, tldap.backend.fake_transactions.NoSuchObject)
+        assert isinstance(results[2].error, ValueError)
+        defaults.mock_connection.delete.assert_called_once_with(dn2)
+
+    def test_bulk_lost_response(self, search_response, defaults):
+        """ Test rollbacks are recorded for every operation sent when a response is lost. """
+        dn = 'uid=tux,ou=People,dc=python-ldap,dc=org'
+        dn2 = 'uid=tuz,ou=People,dc=python-ldap,dc=org'
+        defaults.mock_connection.add.side_effect = [1, 2]
+        defaults.mock_connection.get_response.side_effect = get_bulk_response(search_response, lost=[1])
+
+        c = tldap.backend.connection
+        with tldap.transaction.commit_on_success():
+            results = c.bulk([
+                ('add', dn, defaults.modlist),
+                ('add', dn2, defaults.modlist),
+            ])
+            c.rollback()
+
+        assert isinstance(results[0].error, errors.LDAPSocketReceiveError)
+        assert results[1].ok
+        defaults.mock_connection.get_response.assert_has_calls([call(1), call(2)])
+        # the lost operation may have been applied, so is rolled back too
+        defaults.mock_connection.delete.assert_has_calls([call(dn2), call(dn)])
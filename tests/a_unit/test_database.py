@@ -18,15 +18,20 @@
 # You should have received a copy of the GNU General Public License
 # along with python-tldap  If not, see <http://www.gnu.org/licenses/>.
 import datetime
+import re
 import os
+import threading
+from collections import defaultdict
 from typing import Optional, List
 
+import ldap3
 import mock
 import pytest
 
 import tldap
 import tldap.database
 import tldap.database.helpers
+from tldap.database.cache import ResultCache
 import tldap.transaction
 import tldap.exceptions
 import tldap.modlist
@@ -47,7 +52,8 @@ class SearchMock:
 
     def __call__(
             self, base: str, scope: str, filterstr: bytes=b'(objectClass=*)',
-            attrlist: Optional[List[str]]=None, limit: Optional[int]=None):
+            attrlist: Optional[List[str]]=None, limit: Optional[int]=None,
+            order_by: Optional[List[str]]=None, offset: int=0, count: Optional[int]=None):
 
         self.calls.append((base, scope, filterstr, attrlist, limit))
 
@@ -393,27 +399,40 @@ class TestModelAccount:
         c = mock_ldap
         c.search = SearchMock()
 
-        c.search.add_result(
-            b"entryDN:=uid=tux, ou=People, dc=python-ldap,dc=org", account1)
+        c.search.add_result(b"objectClass=person", account1)
 
         person = tldap.database.get_one(
             tests.database.Account,
             Q(dn="uid=tux, ou=People, dc=python-ldap,dc=org"))
         assert person.get_as_single('uid') == "tux"
 
-        expected_calls = [(
-            'ou=People, dc=python-ldap,dc=org',
-            'SUBTREE',
+        person = tldap.database.get_by_dn(
+            tests.database.Account, "uid=tux, ou=People, dc=python-ldap,dc=org")
+        assert person.get_as_single('uid') == "tux"
+
+        expected_call = (
+            'uid=tux, ou=People, dc=python-ldap,dc=org',
+            'BASE',
             b'(&'
             b'(objectClass=inetOrgPerson)'
             b'(objectClass=organizationalPerson)'
             b'(objectClass=person)'
-            b'(entryDN:=uid=tux, ou=People, dc=python-ldap,dc=org)'
             b')',
             mock.ANY,
             None
-        )]
-        assert c.search.calls == expected_calls
+        )
+        assert c.search.calls == [expected_call, expected_call]
+
+    def test_search_by_dn_outside_base(self, mock_ldap):
+        """ Test a DN outside the base DN is still a SUBTREE search. """
+        c = mock_ldap
+        c.search = SearchMock()
+
+        results = tldap.database.search(
+            tests.database.Account, Q(dn="uid=tux, ou=Other, dc=python-ldap,dc=org"))
+        assert list(results) == []
+        assert c.search.calls[0][1] == 'SUBTREE'
+        assert b'(entryDN:=uid=tux, ou=Other, dc=python-ldap,dc=org)' in c.search.calls[0][2]
 
     def test_delete(self, mock_ldap, account1):
         """ Test delete LDAP object. """
@@ -731,3 +750,462 @@ class TestModelGroup:
         group = groups[0]
         for key in ["cn", "description", "gidNumber"]:
             assert group[key] == group2[key], key
+
+
+def get_group_results(gid_numbers):
+    return [
+        ('cn=group%d,ou=Group,dc=python-ldap,dc=org' % gid_number,
+         defaultdict(list, {'cn': [b'group%d' % gid_number], 'gidNumber': [b'%d' % gid_number]}))
+        for gid_number in gid_numbers
+    ]
+
+
+class TestSearchOrder:
+    def test_search_order_server(self, mock_ldap):
+        """ Test ordering and window are passed to the server. """
+        mock_ldap.search.return_value = get_group_results([2, 3])
+
+        results = tldap.database.search(
+            tests.database.Group, order_by=['-gidNumber', 'cn'], offset=1, limit=2)
+        assert [group.get_as_single('gidNumber') for group in results] == [2, 3]
+
+        mock_ldap.search.assert_called_once_with(
+            'ou=Group, dc=python-ldap,dc=org', 'SUBTREE', mock.ANY, mock.ANY,
+            order_by=['-gidNumber', 'cn'], offset=1, count=2)
+
+    def test_search_order_fallback(self, mock_ldap):
+        """ Test sorting in python when the server refuses. """
+        def search(*args, **kwargs):
+            if 'order_by' in kwargs:
+                raise ldap3.core.exceptions.LDAPOperationResult(result=12)
+            return get_group_results([2, 4, 1, 3])
+        mock_ldap.search.side_effect = search
+
+        results = tldap.database.search(
+            tests.database.Group, order_by=['-gidNumber'], offset=1, limit=2)
+        assert [group.get_as_single('gidNumber') for group in results] == [3, 2]
+        assert mock_ldap.search.call_count == 2
+
+    def test_search_order_not_refused(self, mock_ldap):
+        """ Test other errors are not hidden by the fallback. """
+        mock_ldap.search.side_effect = ldap3.core.exceptions.LDAPOperationResult(result=50)
+
+        with pytest.raises(ldap3.core.exceptions.LDAPInsufficientAccessRightsResult):
+            list(tldap.database.search(tests.database.Group, order_by=['gidNumber']))
+
+    def test_search_order_invalid(self, mock_ldap):
+        """ Test ordering by a field that isn't in the database. """
+        with pytest.raises(ValueError):
+            list(tldap.database.search(tests.database.Account, order_by=['groups']))
+
+
+class TestCache:
+    @pytest.fixture
+    def database(self, mock_ldap):
+        mock_ldap.is_managed.return_value = False
+        mock_ldap.search.side_effect = lambda *args, **kwargs: iter(get_group_results([1]))
+        return tldap.database.Database(mock_ldap, cache=ResultCache(max_size=2))
+
+    def test_cache_hit(self, mock_ldap, database):
+        """ Test repeated searches are only sent to the server once. """
+        for _ in range(2):
+            group = tldap.database.get_one(tests.database.Group, Q(cn='group1'), database=database)
+            assert group.get_as_single('gidNumber') == 1
+        assert mock_ldap.search.call_count == 1
+
+        tldap.database.get_one(tests.database.Group, Q(cn='group2'), database=database)
+        assert mock_ldap.search.call_count == 2
+
+    def test_cache_partial(self, mock_ldap, database):
+        """ Test results are only cached once all have been read. """
+        mock_ldap.search.side_effect = lambda *args, **kwargs: iter(get_group_results([1, 2]))
+        next(tldap.database.search(tests.database.Group, database=database))
+        assert len(list(tldap.database.search(tests.database.Group, database=database))) == 2
+        assert len(list(tldap.database.search(tests.database.Group, database=database))) == 2
+        assert mock_ldap.search.call_count == 2
+
+    def test_cache_delete(self, mock_ldap, database):
+        """ Test deleting an entry forgets searches that could find it. """
+        group = tldap.database.get_one(tests.database.Group, Q(cn='group1'), database=database)
+        database.invalidate('uid=tux, ou=People, dc=python-ldap,dc=org')
+        tldap.database.get_one(tests.database.Group, Q(cn='group1'), database=database)
+        assert mock_ldap.search.call_count == 1
+
+        tldap.database.delete(group, database=database)
+        tldap.database.get_one(tests.database.Group, Q(cn='group1'), database=database)
+        assert mock_ldap.search.call_count == 2
+
+    def test_cache_rename(self, mock_ldap, database):
+        """ Test moving an entry forgets searches of the old and new location. """
+        group = tldap.database.get_one(tests.database.Group, Q(cn='group1'), database=database)
+        tldap.database.rename(group, 'ou=Other,dc=python-ldap,dc=org', database=database)
+        tldap.database.get_one(tests.database.Group, Q(cn='group1'), database=database)
+        assert mock_ldap.search.call_count == 2
+
+    def test_cache_transaction(self, mock_ldap, database):
+        """ Test the cache isn't used inside transactions. """
+        mock_ldap.is_managed.return_value = True
+        for _ in range(2):
+            tldap.database.get_one(tests.database.Group, Q(cn='group1'), database=database)
+        assert mock_ldap.search.call_count == 2
+        assert len(database.cache) == 0
+
+    def test_cache_eviction(self):
+        """ Test the least recently used and expired searches are evicted. """
+        cache = ResultCache(max_size=2, ttl=60)
+        cache.set('a', 'dc=org', [])
+        cache.set('b', 'dc=org', [])
+        cache.get('a')
+        cache.set('c', 'dc=org', [])
+        assert cache.get('a') == []
+        assert cache.get('b') is None
+
+        cache.set('d', 'dc=org', [], ttl=-1)
+        assert cache.get('d') is None
+
+    def test_cache_settings(self, mock_ldap):
+        """ Test the cache is shared and only enabled by the settings. """
+        assert tldap.database.Database(mock_ldap).cache is None
+
+        mock_ldap.settings_dict = dict(mock_ldap.settings_dict, CACHE_MAX_SIZE=10, CACHE_TTL=5)
+        cache = tldap.database.Database(mock_ldap).cache
+        assert cache.max_size == 10
+        assert cache.ttl == 5
+        assert tldap.database.Database(mock_ldap).cache is cache
+
+
+class TestSearchOnly:
+    def test_search_only(self, mock_ldap):
+        """ Test only the requested attributes are retrieved. """
+        mock_ldap.search.return_value = get_group_results([1])
+
+        group, = tldap.database.search(tests.database.Group, only=['cn'])
+        assert group.get_as_single('cn') == 'group1'
+        assert group.is_loaded('cn')
+        assert not group.is_loaded('gidNumber')
+        assert not group.is_loaded('memberUid')
+        assert isinstance(group.get_as_list('memberUid'), tldap.database.NotLoadedField)
+        assert isinstance(group.get_as_list('members'), tldap.database.NotLoadedField)
+
+        mock_ldap.search.assert_called_once_with(
+            'ou=Group, dc=python-ldap,dc=org', 'SUBTREE', mock.ANY, ['cn'])
+
+    def test_search_defer(self, mock_ldap):
+        """ Test deferred attributes are not retrieved. """
+        results = get_group_results([1])
+        results[0][1]['uid'] = [b'tux']
+        results[0][1]['loginShell'] = [b'/bin/bash']
+        mock_ldap.search.return_value = results
+
+        account, = tldap.database.search(tests.database.Account, defer=['userPassword', 'gidNumber'])
+        assert not account.is_loaded('gidNumber')
+        assert isinstance(account.get_as_single('primary_group'), tldap.database.NotLoadedField)
+
+        attributes = mock_ldap.search.call_args[0][3]
+        assert 'uid' in attributes
+        assert 'userPassword' not in attributes
+        assert 'gidNumber' not in attributes
+
+    def test_search_only_preload(self, mock_ldap):
+        """ Test preload retrieves fields that were not loaded. """
+        mock_ldap.search.return_value = get_group_results([1])
+        group, = tldap.database.search(tests.database.Group, only=['cn'])
+
+        mock_ldap.search.return_value = get_group_results([1])
+        group = tldap.database.preload(group)
+        assert group.is_loaded('memberUid')
+        assert group.get_as_list('members') == []
+        assert mock_ldap.search.call_args[0][3] is not None
+
+    def test_search_only_invalid(self, mock_ldap):
+        """ Test only fields in the database can be retrieved. """
+        with pytest.raises(ValueError):
+            list(tldap.database.search(tests.database.Account, only=['groups']))
+
+
+class TestExists:
+    def test_dns(self, mock_ldap):
+        """ Test getting DNs doesn't retrieve any attributes. """
+        mock_ldap.search.return_value = [('cn=group1,ou=Group,dc=python-ldap,dc=org', {})]
+
+        dns = list(tldap.database.dns(tests.database.Group, Q(cn='group1')))
+        assert dns == ['cn=group1,ou=Group,dc=python-ldap,dc=org']
+        mock_ldap.search.assert_called_once_with(
+            'ou=Group, dc=python-ldap,dc=org', 'SUBTREE',
+            b'(&(objectClass=posixGroup)(cn=group1))', ['1.1'])
+
+    def test_exists(self, mock_ldap):
+        """ Test exists only asks for one entry. """
+        mock_ldap.search.return_value = [('cn=group1,ou=Group,dc=python-ldap,dc=org', {})]
+        assert tldap.database.exists(tests.database.Group, Q(gidNumber=10))
+        assert mock_ldap.search.call_args[1] == {'order_by': None, 'offset': 0, 'count': 1}
+
+        mock_ldap.search.return_value = []
+        assert not tldap.database.exists(tests.database.Group, Q(gidNumber=10))
+
+
+class TestSearchIn:
+    def test_search_in_chunks(self, mock_ldap):
+        """ Test long in lookups are searched in chunks and merged. """
+        mock_ldap.settings_dict = dict(mock_ldap.settings_dict, FILTER_MAX_SIZE=120)
+
+        def search(base, scope, filterstr, attrlist, **kwargs):
+            gid_numbers = [int(n) for n in re.findall(rb'gidNumber=(\d+)', filterstr)]
+            # group 1 is found by every chunk
+            return get_group_results(sorted(set([1] + gid_numbers)))
+        mock_ldap.search.side_effect = search
+
+        gid_numbers = list(range(2, 40))
+        results = tldap.database.search(tests.database.Group, Q(gidNumber__in=gid_numbers), order_by=['gidNumber'])
+        assert [group.get_as_single('gidNumber') for group in results] == [1] + gid_numbers
+        assert mock_ldap.search.call_count > 1
+        for call in mock_ldap.search.call_args_list:
+            assert len(call[0][2]) <= 120
+            assert 'order_by' not in call[1]
+
+        results = tldap.database.search(tests.database.Group, Q(gidNumber__in=gid_numbers), offset=2, limit=3)
+        assert len(list(results)) == 3
+
+    def test_search_in_empty(self, mock_ldap):
+        """ Test an empty in lookup returns nothing without searching. """
+        assert list(tldap.database.search(tests.database.Group, Q(gidNumber__in=[]))) == []
+        assert not tldap.database.exists(tests.database.Group, Q(gidNumber__in=[]))
+        mock_ldap.search.assert_not_called()
+
+    def test_exists_in_chunks(self, mock_ldap):
+        """ Test the searches of every chunk stop after the first result. """
+        mock_ldap.settings_dict = dict(mock_ldap.settings_dict, FILTER_MAX_SIZE=120, PARALLEL_SEARCHES=1)
+        release = threading.Event()
+        closed = threading.Event()
+
+        def search(base, scope, filterstr, attrlist, **kwargs):
+            try:
+                for result in get_group_results([1, 2]):
+                    yield result
+                    release.wait(1)
+            finally:
+                closed.set()
+        mock_ldap.search.side_effect = search
+
+        assert tldap.database.exists(tests.database.Group, Q(gidNumber__in=list(range(2, 40))))
+        release.set()
+        assert closed.wait(1)
+        assert mock_ldap.search.call_count == 1
+
+
+def get_account_results(uids):
+    return [
+        ('uid=%s,ou=People,dc=python-ldap,dc=org' % uid,
+         defaultdict(list, {'uid': [uid.encode()], 'loginShell': [b'/bin/bash'], 'gidNumber': [b'1']}))
+        for uid in uids
+    ]
+
+
+class TestPrefetch:
+    def test_prefetch_members(self, mock_ldap):
+        """ Test members of every group are retrieved with one search. """
+        results = get_group_results([1, 2])
+        results[0][1]['memberUid'] = [b'tux', b'tuz']
+        results[1][1]['memberUid'] = [b'TUX']
+        mock_ldap.search.return_value = results
+        groups = list(tldap.database.search(tests.database.Group))
+
+        mock_ldap.search.reset_mock()
+        mock_ldap.search.return_value = get_account_results(['tux', 'tuz'])
+        groups = tldap.database.prefetch(groups, 'members')
+
+        mock_ldap.search.assert_called_once()
+        assert b'(|(uid=tux)(uid=tuz))' in mock_ldap.search.call_args[0][2]
+        assert [account.get_as_single('uid') for account in groups[0].get_as_list('members')] == ['tux', 'tuz']
+        assert [account.get_as_single('uid') for account in groups[1].get_as_list('members')] == ['tux']
+
+    def test_prefetch_missing(self, mock_ldap):
+        """ Test prefetch fails if a value cannot be found. """
+        results = get_group_results([1])
+        results[0][1]['memberUid'] = [b'tux']
+        mock_ldap.search.return_value = results
+        groups = list(tldap.database.search(tests.database.Group))
+
+        mock_ldap.search.return_value = []
+        with pytest.raises(tldap.exceptions.ObjectDoesNotExist):
+            tldap.database.prefetch(groups, 'members')
+
+
+class TestIdentityMap:
+    @pytest.fixture
+    def database(self, mock_ldap):
+        return tldap.database.Database(mock_ldap).with_identity_map()
+
+    def test_identity_map_get(self, mock_ldap, database):
+        """ Test loaded objects are found by DN and primary key without a search. """
+        mock_ldap.search.return_value = get_group_results([1])
+        group, = tldap.database.search(tests.database.Group, database=database)
+
+        mock_ldap.search.reset_mock()
+        assert tldap.database.get_one(tests.database.Group, Q(cn='GROUP1'), database) is group
+        assert tldap.database.get_one(tests.database.Group, Q(pk='group1'), database) is group
+        assert tldap.database.get_one(
+            tests.database.Group, Q(dn='cn=group1, ou=Group, dc=python-ldap, dc=org'), database) is group
+        mock_ldap.search.assert_not_called()
+
+        # searches return the same object
+        assert list(tldap.database.search(tests.database.Group, database=database)) == [group]
+        assert next(tldap.database.search(tests.database.Group, database=database)) is group
+
+    def test_identity_map_only(self, mock_ldap, database):
+        """ Test objects with fields that were not loaded are not added. """
+        mock_ldap.search.return_value = get_group_results([1])
+        list(tldap.database.search(tests.database.Group, database=database, only=['cn']))
+        assert len(database.identity_map) == 0
+
+    def test_identity_map_save(self, mock_ldap, database):
+        """ Test saved objects replace objects in the map, and deleted objects are removed. """
+        mock_ldap.search.return_value = get_group_results([1])
+        group, = tldap.database.search(tests.database.Group, database=database)
+
+        changes = tldap.database.changeset(group, {'description': 'changed'})
+        group = tldap.database.save(changes, database)
+        assert tldap.database.get_one(tests.database.Group, Q(cn='group1'), database) is group
+
+        tldap.database.delete(group, database)
+        assert len(database.identity_map) == 0
+
+    def test_identity_map_rename(self, mock_ldap, database):
+        """ Test renamed objects are found by their new DN and primary key. """
+        mock_ldap.search.return_value = get_group_results([1])
+        group, = tldap.database.search(tests.database.Group, database=database)
+
+        group = tldap.database.rename(group, database=database, cn='group2')
+        mock_ldap.search.reset_mock()
+        assert tldap.database.get_one(tests.database.Group, Q(cn='group2'), database) is group
+        mock_ldap.search.assert_not_called()
+        assert database.identity_map.get(tests.database.Group, 'cn', 'group1') is None
+
+
+class TestSchema:
+    def test_schema_compiled_once(self, mock_ldap):
+        """ Test fields and search options are only worked out once for each table. """
+        calls = defaultdict(int)
+
+        class CountedGroup(tests.database.Group):
+            @classmethod
+            def get_fields(cls):
+                calls['get_fields'] += 1
+                return super().get_fields()
+
+            @classmethod
+            def get_search_options(cls, database):
+                calls['get_search_options'] += 1
+                return super().get_search_options(database)
+
+        database = tldap.database.Database(mock_ldap)
+        mock_ldap.search.return_value = get_group_results([1, 2])
+        groups = list(tldap.database.search(CountedGroup, database=database))
+        list(tldap.database.search(CountedGroup, database=database))
+        tldap.database.changeset(groups[0], {'description': 'changed'})
+        assert calls == {'get_fields': 1, 'get_search_options': 1}
+
+        schema = CountedGroup.get_schema()
+        assert schema is not tests.database.Group.get_schema()
+        assert 'memberUid' in schema.db_fields
+        assert 'members' not in schema.db_fields
+        assert schema.attributes == sorted(schema.db_fields)
+
+        # new settings get new search options
+        mock_ldap.settings_dict = dict(mock_ldap.settings_dict, LDAP_GROUP_BASE='ou=Other,dc=python-ldap,dc=org')
+        database = tldap.database.Database(mock_ldap)
+        assert schema.get_search_options(database).base_dn == 'ou=Other,dc=python-ldap,dc=org'
+        assert calls['get_search_options'] == 2
+
+        # settings changed in place get new search options
+        mock_ldap.settings_dict['LDAP_GROUP_BASE'] = 'ou=Changed,dc=python-ldap,dc=org'
+        assert schema.get_search_options(database).base_dn == 'ou=Changed,dc=python-ldap,dc=org'
+        assert schema.get_search_options(database).base_dn == 'ou=Changed,dc=python-ldap,dc=org'
+        assert calls['get_search_options'] == 3
+
+    def test_table_slots(self, mock_ldap):
+        """ Test objects of tables declaring __slots__ have no __dict__. """
+        mock_ldap.search.return_value = get_group_results([1])
+        group, = tldap.database.search(tests.database.Group)
+        assert not hasattr(group, '__dict__')
+
+    def test_schema_search_options_bounded(self, mock_ldap):
+        """ Test search options are only kept for a few settings. """
+        schema = tests.database.Group.get_schema()
+        settings = [dict(mock_ldap.settings_dict) for _ in range(schema.max_search_options * 2)]
+        for settings_dict in settings:
+            schema.get_search_options(tldap.database.Database(mock_ldap, settings_dict))
+        assert len(schema._search_options) == schema.max_search_options
+
+
+class TestLazyDecode:
+    def test_lazy_decode(self, mock_ldap):
+        """ Test values are only converted when used, and only once. """
+        mock_ldap.search.return_value = get_group_results([1])
+        mock_ldap.search.return_value[0][1]['description'] = [b'penguins']
+
+        with mock.patch.object(tldap.fields.CharField, 'to_python', autospec=True,
+                               side_effect=tldap.fields.Field.to_python) as to_python:
+            group, = tldap.database.search(tests.database.Group, lazy_decode=True)
+            decoded = len(to_python.call_args_list)
+
+            assert group.get_as_single('description') == 'penguins'
+            assert group.get_as_list('description') == ['penguins']
+            assert group.merge({'gidNumber': 2}).get_as_single('description') == 'penguins'
+            assert len(to_python.call_args_list) == decoded + 1
+
+        assert group.to_dict()['cn'] == ['group1']
+        assert group['gidNumber'] == [1]
+
+    def test_lazy_decode_copies(self, mock_ldap):
+        """ Test a value shared by copies is always converted from the original values. """
+        mock_ldap.search.return_value = get_group_results([1])
+        mock_ldap.search.return_value[0][1]['description'] = [b'penguins']
+        group, = tldap.database.search(tests.database.Group, lazy_decode=True)
+        copies = [group.merge({'gidNumber': 2}), group.merge({'gidNumber': 3})]
+
+        def to_python(field, value):
+            # the other copy is resolved while this one is being converted
+            if to_python.call_count == 1:
+                assert copies[1].get_as_single('description') == 'penguins'
+            return tldap.fields.Field.to_python(field, value)
+
+        with mock.patch.object(tldap.fields.CharField, 'to_python', autospec=True,
+                               side_effect=to_python) as to_python:
+            assert copies[0].get_as_single('description') == 'penguins'
+            assert copies[1].get_as_single('description') == 'penguins'
+            assert group.get_as_single('description') == 'penguins'
+
+        assert to_python.call_args_list == [mock.call(mock.ANY, [b'penguins'])] * 2
+
+
+class TestBatchDecode:
+    def test_batch_decode(self, mock_ldap):
+        """ Test values are converted a page at a time. """
+        mock_ldap.search.return_value = get_group_results([1, 2, 3, 4, 5, 6])
+
+        with mock.patch.object(tldap.fields.IntegerField, 'to_python_many', autospec=True,
+                               side_effect=tldap.fields.IntegerField.to_python_many) as to_python_many:
+            groups = list(tldap.database.search(tests.database.Group, page_size=2))
+
+        # one call for gidNumber on each page, pages grow up to page_size
+        assert [[v for v, in call[0][1]] for call in to_python_many.call_args_list] == [
+            [b'1'], [b'2', b'3'], [b'4', b'5'], [b'6']
+        ]
+        assert [group['gidNumber'] for group in groups] == [[1], [2], [3], [4], [5], [6]]
+
+    def test_batch_limit(self, mock_ldap):
+        """ Test no more results are read than the caller can use. """
+        results = iter(get_group_results(list(range(1, 11))))
+        mock_ldap.search.return_value = results
+
+        groups = list(tldap.database.search(tests.database.Group, limit=3))
+        assert [group['gidNumber'] for group in groups] == [[1], [2], [3]]
+        assert len(list(results)) == 7
+
+        results = iter(get_group_results([1, 2, 3]))
+        mock_ldap.search.return_value = results
+        with pytest.raises(tldap.exceptions.MultipleObjectsReturned):
+            tldap.database.get_one(tests.database.Group, Q(cn='group'))
+        assert mock_ldap.search.call_args[1]['count'] == 2
+        assert len(list(results)) == 1
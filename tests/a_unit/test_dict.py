@@ -1,6 +1,7 @@
+import mock
 import pytest
 
-from tldap.dict import CaseInsensitiveDict, ImmutableDict
+from tldap.dict import CaseInsensitiveDict, ImmutableDict, PersistentDict
 
 
 @pytest.fixture
@@ -134,3 +135,53 @@ class TestImmutable:
         with pytest.raises(KeyError):
             assert immutable['nUmberoFfIsh'] == 10
 
+
+class TestPersistent:
+    def test_set(self):
+        allowed_values = {'Key%d' % i for i in range(100)}
+        d = PersistentDict(allowed_values, {'key1': 1})
+        d2 = d.set('KEY50', 50).set('key99', 99)
+        assert d.to_dict() == {'Key1': 1}
+        assert d2.to_dict() == {'Key1': 1, 'Key50': 50, 'Key99': 99}
+        assert d2['key50'] == 50
+        assert 'Key2' not in d2
+        assert d2.get('Key2', 'default') == 'default'
+        with pytest.raises(KeyError):
+            d2['Key2']
+        with pytest.raises(KeyError):
+            d2.set('numberOFfish', 10)
+
+    def test_shared(self):
+        allowed_values = {'Key%d' % i for i in range(100)}
+        d = PersistentDict(allowed_values, {'Key%d' % i: i for i in range(100)})
+        d2 = d.set('Key0', 'changed')
+        assert d['Key0'] == 0
+        assert d2['Key0'] == 'changed'
+        # only the path to the changed value is copied
+        assert d2._root is not d._root
+        assert sum(a is b for a, b in zip(d._root, d2._root)) == len(d._root) - 1
+
+    def test_views(self):
+        """ Test keys and items are read from the trie, without a copy. """
+        allowed_values = {'Key%d' % i for i in range(100)}
+        d = PersistentDict(allowed_values, {'key1': 1, 'KEY50': 50})
+        with mock.patch.object(PersistentDict, 'to_dict', side_effect=AssertionError):
+            assert list(d) == ['Key1', 'Key50']
+            assert len(d) == 2
+            assert d.keys() == {'Key1', 'Key50'}
+            assert 'key50' in d.keys()
+            assert list(d.items()) == [('Key1', 1), ('Key50', 50)]
+            assert ('Key1', 1) in d.items()
+            assert ('Key1', 2) not in d.items()
+
+    def test_immutable_merge(self, immutable):
+        merged = immutable.merge({'numberofpenguins': 10, 'NUMBEROFSHARKS': 2})
+        assert immutable.keys() == set()
+        assert merged.to_dict() == {'NumberOfPenguins': 10, 'NumberOfSharks': 2}
+
+    def test_immutable_slots(self, immutable):
+        immutable = immutable.set('numberofpenguins', 10)
+        assert not hasattr(immutable, '__dict__')
+        merged = immutable.merge({'numberofsharks': 2})
+        assert merged._allowed_keys is immutable._allowed_keys
+        assert merged.to_dict() == {'NumberOfPenguins': 10, 'NumberOfSharks': 2}
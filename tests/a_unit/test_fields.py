@@ -0,0 +1,49 @@
+import datetime
+
+import pytest
+
+import tldap.exceptions
+import tldap.fields
+
+
+class TestToPythonMany:
+    def test_char(self):
+        field = tldap.fields.CharField(max_instances=None)
+        values = [[b'a', b'b'], [], [b'\xc3\xa9']]
+        assert field.to_python_many(values) == [['a', 'b'], [], ['é']]
+        assert field.to_python_many(values) == [field.to_python(value) for value in values]
+
+    def test_integer(self):
+        field = tldap.fields.IntegerField(max_instances=None)
+        values = [[b'1'], [], [b'2', b'-3']]
+        assert field.to_python_many(values) == [[1], [], [2, -3]]
+
+    def test_dates(self):
+        field = tldap.fields.DaysSinceEpochField()
+        values = [[b'18000'], []]
+        assert field.to_python_many(values) == [field.to_python(value) for value in values]
+        assert isinstance(field.to_python_many(values)[0][0], datetime.date)
+
+        field = tldap.fields.SecondsSinceEpochField()
+        assert field.to_python_many([[b'86400'], []]) == [[datetime.datetime(1970, 1, 2)], []]
+
+    def test_sid(self):
+        field = tldap.fields.SidField()
+        sid = "S-1-5-21-1-2-3"
+        value = field.value_to_db(sid)
+        assert field.to_python_many([[value], []]) == [[sid], []]
+
+    @pytest.mark.parametrize("field_class,value,message", [
+        (tldap.fields.CharField, 'a', "should be a bytes"),
+        (tldap.fields.IntegerField, b'x', "is invalid integer"),
+        (tldap.fields.IntegerField, 1, "should be bytes"),
+        (tldap.fields.DaysSinceEpochField, b'x', "is invalid integer"),
+        (tldap.fields.DaysSinceEpochField, b'9' * 30, "is too big a date"),
+        (tldap.fields.SecondsSinceEpochField, b'9' * 30, "is too big a date"),
+    ])
+    def test_error(self, field_class, value, message):
+        """ Test the error is the same as converting each value. """
+        field = field_class(max_instances=None)
+        with pytest.raises(tldap.exceptions.ValidationError) as e:
+            field.to_python_many([[b'1'], [value]])
+        assert str(e.value) == message
@@ -0,0 +1,154 @@
+import ldap3
+import ldap3.core.exceptions as errors
+import mock
+import pytest
+
+import tldap.backend
+import tldap.exceptions
+from tldap.backend import metrics
+
+
+@pytest.fixture
+def registry():
+    registry = metrics.Registry()
+    metrics.add_hook(registry)
+    yield registry
+    metrics.remove_hook(registry)
+
+
+@pytest.fixture
+def connection():
+    tldap.backend.setup({
+        'default': {
+            'ENGINE': 'tldap.backend.no_transactions',
+            'URI': 'ldap://localhost:38911/',
+            'USER': 'cn=Manager,dc=python-ldap,dc=org',
+            'PASSWORD': 'password',
+        }
+    })
+
+    connection = mock.MagicMock()
+    connection.closed = False
+    connection.bound = True
+    connection.result = {}
+    connection.response = [
+        {'type': 'searchResEntry', 'dn': 'uid=tux,dc=python-ldap,dc=org', 'raw_attributes': {}},
+        {'type': 'searchResEntry', 'dn': 'uid=tuz,dc=python-ldap,dc=org', 'raw_attributes': {}},
+    ]
+
+    c = tldap.backend.connections['default']
+    c.set_connection_class(mock.Mock(return_value=connection))
+    return connection
+
+
+def test_histogram():
+    """ Test histogram buckets are cumulative. """
+    histogram = metrics.Histogram([1, 10])
+    histogram.observe(0)
+    histogram.observe(5)
+    histogram.observe(50)
+
+    assert histogram.snapshot() == {
+        'count': 3,
+        'sum': 55,
+        'buckets': {'1': 1, '10': 2, '+Inf': 3},
+    }
+
+
+def test_search(registry, connection):
+    """ Test search results and duration are recorded. """
+    c = tldap.backend.connections['default']
+    assert len(list(c.search('dc=python-ldap,dc=org', ldap3.SUBTREE))) == 2
+
+    snapshot = registry.snapshot()
+    search = snapshot['default']['search']
+    assert search['duration']['count'] == 1
+    assert search['results']['sum'] == 2
+    assert search['retries'] == 0
+    assert search['errors'] == 0
+
+
+def test_retry(registry, connection):
+    """ Test retries and reconnects are recorded. """
+    connection.delete_s.side_effect = [errors.LDAPSocketSendError("down"), None]
+
+    c = tldap.backend.connections['default']
+    c.delete('uid=tux,dc=python-ldap,dc=org')
+
+    delete = registry.snapshot()['default']['delete']
+    assert delete['retries'] == 1
+    assert delete['reconnects'] == 1
+    assert delete['results']['count'] == 0
+
+
+def test_error(registry, connection):
+    """ Test failed operations are recorded. """
+    connection.delete_s.side_effect = errors.LDAPNoSuchObjectResult("missing")
+
+    c = tldap.backend.connections['default']
+    with pytest.raises(errors.LDAPNoSuchObjectResult):
+        c.delete('uid=tux,dc=python-ldap,dc=org')
+
+    assert registry.snapshot()['default']['delete']['errors'] == 1
+
+
+def test_bulk(registry, connection):
+    """ Test bulk operations are recorded, with the first error. """
+    connection.add.side_effect = [1, 2]
+    connection.get_response.side_effect = [
+        ([], {'result': 0}),
+        errors.LDAPEntryAlreadyExistsResult("exists"),
+    ]
+
+    c = tldap.backend.connections['default']
+    results = c.bulk([
+        ('add', 'uid=tux,dc=python-ldap,dc=org', {}),
+        ('add', 'uid=tuz,dc=python-ldap,dc=org', {}),
+    ])
+    assert [result.ok for result in results] == [True, False]
+
+    bulk = registry.snapshot()['default']['bulk']
+    assert bulk['duration']['count'] == 1
+    assert bulk['errors'] == 1
+
+
+def test_bulk_circuit_open(registry, connection):
+    """ Test bulk operations fail fast while the server is down. """
+    c = tldap.backend.connections['default']
+    c.circuit_breaker.threshold = 1
+    c.circuit_breaker.record_failure()
+
+    with pytest.raises(tldap.exceptions.CircuitOpen):
+        c.bulk([('delete', 'uid=tux,dc=python-ldap,dc=org')])
+
+    assert c._connection_class.call_count == 0
+    assert registry.snapshot()['default']['bulk']['errors'] == 1
+
+
+def test_prometheus(registry, connection):
+    """ Test Prometheus text format. """
+    c = tldap.backend.connections['default']
+    list(c.search('dc=python-ldap,dc=org', ldap3.SUBTREE))
+
+    lines = registry.prometheus().splitlines()
+    assert '# TYPE tldap_operation_duration_seconds histogram' in lines
+    assert 'tldap_operation_duration_seconds_count{alias="default",operation="search"} 1' in lines
+    assert 'tldap_search_results_bucket{alias="default",operation="search",le="1"} 0' in lines
+    assert 'tldap_search_results_bucket{alias="default",operation="search",le="10"} 1' in lines
+    assert 'tldap_search_results_bucket{alias="default",operation="search",le="+Inf"} 1' in lines
+    assert 'tldap_operation_retries_total{alias="default",operation="search"} 0' in lines
+
+
+def test_hook_error(registry, connection):
+    """ Test a failing hook doesn't break operations or other hooks. """
+    def hook(operation):
+        raise RuntimeError("broken hook")
+
+    metrics.add_hook(hook)
+    try:
+        c = tldap.backend.connections['default']
+        c.delete('uid=tux,dc=python-ldap,dc=org')
+    finally:
+        metrics.remove_hook(hook)
+
+    assert registry.snapshot()['default']['delete']['duration']['count'] == 1
@@ -0,0 +1,175 @@
+import threading
+import time
+
+import mock
+import pytest
+
+import tldap.backend
+import tldap.exceptions
+from tldap.backend.pool import ConnectionPool
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.bound = True
+
+    def unbind(self):
+        self.closed = True
+        self.bound = False
+
+
+@pytest.fixture
+def factory():
+    return mock.Mock(side_effect=FakeConnection)
+
+
+class TestConnectionPool:
+    def test_reuse(self, factory):
+        """ Test connections are reused after being returned. """
+        pool = ConnectionPool(factory)
+
+        conn = pool.checkout()
+        pool.checkin(conn)
+        assert pool.checkout() is conn
+        assert factory.call_count == 1
+
+    def test_concurrent(self, factory):
+        """ Test concurrent checkouts get different connections. """
+        pool = ConnectionPool(factory)
+
+        conn1 = pool.checkout()
+        conn2 = pool.checkout()
+        assert conn1 is not conn2
+        assert pool.stats()['in_use'] == 2
+
+        pool.checkin(conn1)
+        pool.checkin(conn2)
+        assert pool.stats()['in_use'] == 0
+        assert pool.stats()['idle'] == 2
+
+    def test_unhealthy(self, factory):
+        """ Test closed connections are replaced on checkout. """
+        pool = ConnectionPool(factory)
+
+        conn = pool.checkout()
+        pool.checkin(conn)
+        conn.closed = True
+
+        new_conn = pool.checkout()
+        assert new_conn is not conn
+        assert factory.call_count == 2
+
+    def test_fresh(self, factory):
+        """ Test fresh checkout replaces idle connections when full. """
+        pool = ConnectionPool(factory, max_size=1)
+
+        conn = pool.checkout()
+        pool.checkin(conn)
+
+        new_conn = pool.checkout(fresh=True)
+        assert new_conn is not conn
+        assert conn.closed
+        assert pool.stats()['idle'] == 0
+
+    def test_discard(self, factory):
+        """ Test discarded connections are closed and free a slot. """
+        pool = ConnectionPool(factory, max_size=1)
+
+        conn = pool.checkout()
+        pool.discard(conn)
+        assert conn.closed
+
+        assert pool.checkout() is not conn
+
+    def test_idle_timeout(self, factory):
+        """ Test idle connections are closed after idle timeout. """
+        pool = ConnectionPool(factory, idle_timeout=0)
+
+        conn = pool.checkout()
+        pool.checkin(conn)
+        time.sleep(0.01)
+
+        assert pool.checkout() is not conn
+        assert conn.closed
+
+    def test_idle_timeout_min_size(self, factory):
+        """ Test idle timeout doesn't go below min_size connections. """
+        pool = ConnectionPool(factory, min_size=1, idle_timeout=0)
+
+        conn = pool.checkout()
+        pool.checkin(conn)
+        time.sleep(0.01)
+
+        assert pool.checkout() is conn
+
+    def test_min_size(self, factory):
+        """ Test min_size connections are opened when the pool is created. """
+        pool = ConnectionPool(factory, min_size=2)
+        assert factory.call_count == 2
+        assert pool.stats()['idle'] == 2
+
+        pool.checkout()
+        pool.checkout()
+        assert factory.call_count == 2
+
+    def test_min_size_error(self, factory):
+        """ Test the pool is created if the server is down. """
+        factory.side_effect = tldap.exceptions.PoolTimeout("down")
+        pool = ConnectionPool(factory, min_size=2)
+        assert pool.stats()['idle'] == 0
+        assert pool.stats()['in_use'] == 0
+
+    def test_timeout(self, factory):
+        """ Test waiting for a connection times out. """
+        pool = ConnectionPool(factory, max_size=1, timeout=0.01)
+
+        pool.checkout()
+        with pytest.raises(tldap.exceptions.PoolTimeout):
+            pool.checkout()
+
+        stats = pool.stats()
+        assert stats['waits'] == 1
+        assert stats['wait_time'] > 0
+
+    def test_wait(self, factory):
+        """ Test waiting for another thread to return a connection. """
+        pool = ConnectionPool(factory, max_size=1)
+        conn = pool.checkout()
+
+        timer = threading.Timer(0.01, pool.checkin, [conn])
+        timer.start()
+        assert pool.checkout() is conn
+        timer.join()
+
+        assert pool.stats()['waits'] == 1
+
+    def test_factory_error(self, factory):
+        """ Test a failure to connect doesn't use up a slot. """
+        pool = ConnectionPool(factory, max_size=1)
+        factory.side_effect = RuntimeError("connection refused")
+
+        with pytest.raises(RuntimeError):
+            pool.checkout()
+        assert pool.stats()['in_use'] == 0
+
+
+def test_shared_between_threads():
+    """ Test every thread gets its own wrapper but they share one pool. """
+    tldap.backend.setup({
+        'default': {
+            'ENGINE': 'tldap.backend.no_transactions',
+            'URI': 'ldap://localhost:38911/',
+            'USER': 'cn=Manager,dc=python-ldap,dc=org',
+            'PASSWORD': 'password',
+        }
+    })
+    connections = tldap.backend.connections
+
+    results = []
+    thread = threading.Thread(target=lambda: results.append(connections['default']))
+    thread.start()
+    thread.join()
+
+    assert results[0] is not connections['default']
+    assert results[0].pool is connections['default'].pool
@@ -1,3 +1,8 @@
+import copy
+import datetime
+
+import pytest
+
 import tldap
 import tldap.query
 import tests.database
@@ -71,3 +76,163 @@ def test_filter_and_or():
         "uid"
     )
     assert ldap_filter == b"(&(uid=tux)(|(uid=tuz)(uid=meow)))"
+
+
+def test_filter_contains():
+    """ Test filter with contains and dn lookups. """
+    ldap_filter = tldap.query.get_filter(
+        tldap.Q(cn__contains='T*x') & tldap.Q(dn='uid=tux,dc=org'),
+        tests.database.Account.get_fields(),
+        "uid"
+    )
+    assert ldap_filter == b"(&(cn=*T\\2ax*)(entryDN:=uid=tux,dc=org))"
+
+
+def test_filter_compiled_once():
+    """ Test queries with the same structure share a compiled filter. """
+    fields = tests.database.Account.get_fields()
+    tldap.query._compile_filter.cache_clear()
+
+    for uid in ['tux', 'tuz', 'meow']:
+        ldap_filter = tldap.query.get_filter(~tldap.Q(pk=uid) | tldap.Q(cn=uid), fields, "uid")
+        assert ldap_filter == b"(|(!(uid=%s))(cn=%s))" % (uid.encode(), uid.encode())
+
+    info = tldap.query._compile_filter.cache_info()
+    assert info.misses == 1
+    assert info.hits == 2
+
+
+def test_q_hashable():
+    """ Test Q trees compare and hash by structure and value. """
+    assert tldap.Q(uid='tux') & tldap.Q(cn=['a']) == tldap.Q(uid='tux') & tldap.Q(cn=['a'])
+    assert hash(tldap.Q(uid='tux')) == hash(tldap.Q(uid='tux'))
+    assert tldap.Q(uid='tux') != tldap.Q(uid='tuz')
+    assert tldap.Q(uid='tux') != ~tldap.Q(uid='tux')
+
+
+def test_q_subclass_with_dict():
+    """ Test Q subclasses with a __dict__ can be combined and copied. """
+    class TaggedQ(tldap.Q):
+        tag = None
+
+    query = TaggedQ(uid='tux') & TaggedQ(cn='tux')
+    query.tag = 'users'
+    query.add(TaggedQ(sn='tux'), tldap.Q.OR)
+    assert isinstance(query.children[0], TaggedQ)
+    assert query.children[0].children == [('uid', 'tux'), ('cn', 'tux')]
+
+    clone = copy.deepcopy(query)
+    assert isinstance(clone, TaggedQ)
+    assert clone == query
+
+
+def test_filter_list():
+    """ Test filter with a list of values that must all match. """
+    ldap_filter = tldap.query.get_filter(
+        tldap.Q(cn=['tux', 'tuz']),
+        tests.database.Account.get_fields(),
+        "uid"
+    )
+    assert ldap_filter == b"(&(cn=tux)(cn=tuz))"
+
+
+def test_filter_in():
+    """ Test filter with a list of values that may match. """
+    ldap_filter = tldap.query.get_filter(
+        tldap.Q(uid__in=['tux', 't*z']) & tldap.Q(uidNumber__in=[10]),
+        tests.database.Account.get_fields(),
+        "uid"
+    )
+    assert ldap_filter == b"(&(|(uid=tux)(uid=t\\2az))(|(uidNumber=10)))"
+
+
+def test_filter_in_empty():
+    """ Test an empty in lookup matches nothing, without an empty filter. """
+    fields = tests.database.Account.get_fields()
+    assert tldap.query.get_filter(tldap.Q(uid__in=[]) & tldap.Q(cn='tux'), fields, "uid") is None
+    assert tldap.query.get_filter(tldap.Q(uid__in=[]) | tldap.Q(cn='tux'), fields, "uid") == b"(cn=tux)"
+    assert tldap.query.get_filter(~tldap.Q(uid__in=[]) & tldap.Q(cn='tux'), fields, "uid") == (
+        b"(&(objectClass=*)(cn=tux))"
+    )
+    assert tldap.query.get_search_filter(tldap.Q(uid__in=[]), fields, {'person'}, "uid") is None
+
+
+def test_split_query():
+    """ Test long in lookups are split into chunks. """
+    fields = tests.database.Account.get_fields()
+    uids = ['user%03d' % i for i in range(100)]
+    query = tldap.Q(uid__in=uids) & ~tldap.Q(cn__in=['a', 'b'])
+
+    queries = tldap.query.split_query(query, fields, {'person'}, "uid", 400)
+    assert len(queries) > 1
+
+    found = []
+    for chunk in queries:
+        ldap_filter = tldap.query.get_search_filter(chunk, fields, {'person'}, "uid")
+        assert len(ldap_filter) <= 400
+        assert ldap_filter.endswith(b"(!(|(cn=a)(cn=b))))")
+        found.extend(chunk.children[0][1])
+    assert found == uids
+
+    assert tldap.query.split_query(query, fields, {'person'}, "uid", 100000) == [query]
+
+
+def test_filter_operations():
+    """ Test filter with each search operation. """
+    ldap_filter = tldap.query.get_filter(
+        tldap.Q(uid__startswith='tu*') & tldap.Q(cn__endswith='x') & tldap.Q(uidNumber__gte=10)
+        & tldap.Q(uidNumber__lte=20) & tldap.Q(sn__approx='Tux') & tldap.Q(mail__present=True)
+        & tldap.Q(title__present=False),
+        tests.database.Account.get_fields(),
+        "uid"
+    )
+    assert ldap_filter == (
+        b"(&(uid=tu\\2a*)(cn=*x)(uidNumber>=10)(uidNumber<=20)(sn~=Tux)(mail=*)(!(title=*)))"
+    )
+
+
+def test_filter_date():
+    """ Test range filter values are encoded by the field. """
+    ldap_filter = tldap.query.get_filter(
+        tldap.Q(shadowLastChange__lte=datetime.date(1970, 1, 11)) & tldap.Q(uid__in=['a', 'b'])
+        & tldap.Q(mail__present=False),
+        tests.database.Account.get_fields(),
+        "uid"
+    )
+    assert ldap_filter == b"(&(shadowLastChange<=10)(|(uid=a)(uid=b))(!(mail=*)))"
+
+
+def test_filter_unknown_operation():
+    """ Test filter with an unknown search operation. """
+    with pytest.raises(ValueError):
+        tldap.query.get_filter(
+            tldap.Q(uid__like='tux'),
+            tests.database.Account.get_fields(),
+            "uid"
+        )
+
+
+def test_plan_search():
+    """ Test searches for a single DN or primary key read only that entry. """
+    fields = tests.database.Account.get_fields()
+    base_dn = "ou=People,dc=python-ldap,dc=org"
+
+    plan = tldap.query.plan_search(
+        tldap.Q(dn="uid=tux," + base_dn) & tldap.Q(mail="tux@example.org"), fields, base_dn, {"person"}, "uid")
+    assert plan == ("uid=tux," + base_dn, "BASE", b"(&(objectClass=person)(mail=tux@example.org))")
+
+    plan = tldap.query.plan_search(tldap.Q(pk="tux"), fields, base_dn, {"person"}, "uid")
+    assert plan == (base_dn, "SUBTREE", b"(&(objectClass=person)(uid=tux))")
+
+    plan = tldap.query.plan_search(tldap.Q(pk="t,ux"), fields, base_dn, {"person"}, "uid", pk_in_rdn=True)
+    assert plan == ("uid=t\\,ux," + base_dn, "BASE", b"(objectClass=person)")
+
+    plan = tldap.query.plan_search(~tldap.Q(pk="tux"), fields, base_dn, {"person"}, "uid", pk_in_rdn=True)
+    assert plan[1] == "SUBTREE"
+
+
+def test_compact():
+    """ Test queries and fields don't have a __dict__ for each instance. """
+    assert not hasattr(tldap.Q(uid='tux') & tldap.Q(cn='tux'), '__dict__')
+    for field in tests.database.Account.get_fields().values():
+        assert not hasattr(field, '__dict__')
@@ -0,0 +1,88 @@
+from collections import defaultdict
+
+import mock
+import pytest
+
+import tests.database
+import tldap.exceptions
+from tldap import Q
+from tldap.database.queryset import QuerySet
+
+
+def get_results(names):
+    return [
+        ('cn=%s,ou=Group,dc=python-ldap,dc=org' % name,
+         defaultdict(list, {'cn': [name.encode()], 'gidNumber': [b'10']}))
+        for name in names
+    ]
+
+
+def test_lazy(mock_ldap):
+    """ Test nothing is retrieved until the results are used. """
+    mock_ldap.search.return_value = get_results(['group1', 'group2'])
+
+    queryset = QuerySet(tests.database.Group).filter(cn='group1').exclude(Q(gidNumber=11))
+    queryset = queryset.order_by('-cn').only('cn')
+    assert mock_ldap.search.call_count == 0
+
+    assert [group.get_as_single('cn') for group in queryset] == ['group1', 'group2']
+    assert len(queryset) == 2
+    assert mock_ldap.search.call_count == 1
+
+    mock_ldap.search.assert_called_once_with(
+        'ou=Group, dc=python-ldap,dc=org', 'SUBTREE',
+        b'(&(objectClass=posixGroup)(cn=group1)(!(gidNumber=11)))', ['cn'],
+        order_by=['-cn'], offset=0, count=None)
+
+
+def test_slice(mock_ldap):
+    """ Test slices are combined into one window. """
+    mock_ldap.search.return_value = get_results(['group3'])
+
+    queryset = QuerySet(tests.database.Group)[10:20][2:5]
+    assert queryset[0].get_as_single('cn') == 'group3'
+
+    mock_ldap.search.assert_called_once_with(
+        'ou=Group, dc=python-ldap,dc=org', 'SUBTREE', mock.ANY, mock.ANY,
+        order_by=None, offset=12, count=1)
+
+
+def test_exists(mock_ldap):
+    """ Test exists asks for one result with only the pk. """
+    mock_ldap.search.return_value = get_results(['group1'])
+    assert QuerySet(tests.database.Group).order_by('cn').exists()
+
+    mock_ldap.search.assert_called_once_with(
+        'ou=Group, dc=python-ldap,dc=org', 'SUBTREE', mock.ANY, ['1.1'],
+        order_by=None, offset=0, count=1)
+
+    mock_ldap.search.return_value = []
+    assert not QuerySet(tests.database.Group).exists()
+    assert QuerySet(tests.database.Group).first() is None
+
+
+def test_get(mock_ldap):
+    """ Test get asks for at most two results. """
+    mock_ldap.search.return_value = get_results(['group1'])
+    group = QuerySet(tests.database.Group).get(cn='group1')
+    assert group.get_as_single('cn') == 'group1'
+    assert mock_ldap.search.call_args[1]['count'] == 2
+
+    mock_ldap.search.return_value = get_results(['group1', 'group2'])
+    with pytest.raises(tldap.exceptions.MultipleObjectsReturned):
+        QuerySet(tests.database.Group).get()
+
+    mock_ldap.search.return_value = []
+    with pytest.raises(tldap.exceptions.ObjectDoesNotExist):
+        QuerySet(tests.database.Group).get(cn='group1')
+
+
+def test_iterator(mock_ldap):
+    """ Test iterator sets the page size and doesn't keep results. """
+    mock_ldap.search.return_value = get_results(['group1'])
+    queryset = QuerySet(tests.database.Group)
+
+    assert len(list(queryset.iterator(chunk_size=10))) == 1
+    assert len(list(queryset.iterator(chunk_size=10))) == 1
+    assert mock_ldap.search.call_count == 2
+    assert mock_ldap.search.call_args[1] == {'limit': 10}
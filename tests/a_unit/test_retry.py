@@ -0,0 +1,195 @@
+import threading
+
+import ldap3.core.exceptions as errors
+import mock
+import pytest
+
+import tldap.backend
+import tldap.exceptions
+from tldap.backend.retry import CircuitBreaker, RetryPolicy
+
+
+def setup(**kwargs):
+    settings = {
+        'ENGINE': 'tldap.backend.no_transactions',
+        'URI': 'ldap://localhost:38911/',
+        'USER': 'cn=Manager,dc=python-ldap,dc=org',
+        'PASSWORD': 'password',
+        'RETRY_BACKOFF': 0,
+    }
+    settings.update(kwargs)
+    tldap.backend.setup({'default': settings})
+
+    connection = mock.MagicMock()
+    connection.closed = False
+    connection.bound = True
+    connection.result = {}
+
+    c = tldap.backend.connections['default']
+    c.set_connection_class(mock.Mock(return_value=connection))
+    return c, connection
+
+
+def test_policy_backoff():
+    """ Test exponential backoff without jitter. """
+    policy = RetryPolicy(max_attempts=5, backoff=1, multiplier=2, max_backoff=5, jitter=False)
+    assert [policy.get_delay(attempt, 0) for attempt in range(1, 6)] == [1, 2, 4, 5, None]
+
+
+def test_policy_jitter():
+    """ Test jitter never waits longer than the backoff. """
+    policy = RetryPolicy(max_attempts=3, backoff=1, multiplier=2)
+    for _ in range(20):
+        assert 0 <= policy.get_delay(2, 0) <= 2
+
+
+def test_policy_max_elapsed():
+    """ Test giving up once the maximum elapsed time would be exceeded. """
+    policy = RetryPolicy(max_attempts=5, backoff=1, jitter=False, max_elapsed=2)
+    assert policy.get_delay(1, 0.5) == 1
+    assert policy.get_delay(1, 1.5) is None
+
+
+def test_policy_from_settings():
+    """ Test retryable exceptions may be given as dotted paths. """
+    policy = RetryPolicy.from_settings({
+        'RETRY_EXCEPTIONS': ['ldap3.core.exceptions.LDAPBusyResult'],
+        'RETRY_MAX_ATTEMPTS': 4,
+    })
+    assert policy.max_attempts == 4
+    assert policy.is_retryable(errors.LDAPBusyResult())
+    assert not policy.is_retryable(errors.LDAPSocketOpenError())
+
+
+def test_circuit_breaker():
+    """ Test the circuit opens after too many failures, and half opens. """
+    breaker = CircuitBreaker(threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.check()
+    breaker.record_failure()
+    with pytest.raises(tldap.exceptions.CircuitOpen):
+        breaker.check()
+
+    # pretend the reset timeout has passed
+    breaker._opened -= 60
+    breaker.check()
+    # only one trial operation is let through
+    with pytest.raises(tldap.exceptions.CircuitOpen):
+        breaker.check()
+    breaker.record_failure()
+    assert breaker.is_open
+    with pytest.raises(tldap.exceptions.CircuitOpen):
+        breaker.check()
+
+    # a successful trial closes the circuit
+    breaker._opened -= 60
+    breaker.check()
+    breaker.record_success()
+    assert not breaker.is_open
+    breaker.check()
+
+
+def test_circuit_breaker_half_open_concurrent():
+    """ Test only one of many concurrent callers is let through when half open. """
+    breaker = CircuitBreaker(threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    breaker._opened -= 60
+
+    barrier = threading.Barrier(10)
+    allowed = []
+
+    def check():
+        barrier.wait()
+        try:
+            breaker.check()
+        except tldap.exceptions.CircuitOpen:
+            return
+        allowed.append(True)
+
+    threads = [threading.Thread(target=check) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert allowed == [True]
+    assert breaker.is_open
+
+
+def test_circuit_breaker_success():
+    """ Test success resets the failure count. """
+    breaker = CircuitBreaker(threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.check()
+
+
+def test_retry_busy():
+    """ Test busy errors are retried on the same connection. """
+    c, connection = setup(RETRY_MAX_ATTEMPTS=3)
+    connection.delete_s.side_effect = [errors.LDAPBusyResult(), errors.LDAPBusyResult(), None]
+
+    c.delete('uid=tux,dc=python-ldap,dc=org')
+
+    assert connection.delete_s.call_count == 3
+    assert c._connection_class.call_count == 1
+
+
+def test_retry_gives_up():
+    """ Test the error is raised after the maximum attempts. """
+    c, connection = setup(RETRY_MAX_ATTEMPTS=2)
+    connection.delete_s.side_effect = errors.LDAPSocketSendError()
+
+    with pytest.raises(errors.LDAPSocketSendError):
+        c.delete('uid=tux,dc=python-ldap,dc=org')
+
+    assert connection.delete_s.call_count == 2
+    assert c._connection_class.call_count == 2
+
+
+def test_write_response_lost():
+    """ Test a write is not sent again if its response is lost. """
+    c, connection = setup(RETRY_MAX_ATTEMPTS=3)
+    connection.delete_s.side_effect = errors.LDAPSocketReceiveError()
+
+    with pytest.raises(errors.LDAPSocketReceiveError):
+        c.delete('uid=tux,dc=python-ldap,dc=org')
+
+    assert connection.delete_s.call_count == 1
+
+
+def test_policy_not_idempotent():
+    """ Test only errors before the request was applied are retried for writes. """
+    policy = RetryPolicy()
+    assert policy.is_retryable(errors.LDAPSocketReceiveError())
+    assert not policy.is_retryable(errors.LDAPSocketReceiveError(), idempotent=False)
+    assert policy.is_retryable(errors.LDAPSocketReceiveError(), idempotent=False, sent=False)
+    assert policy.is_retryable(errors.LDAPSocketSendError(), idempotent=False)
+    assert policy.is_retryable(errors.LDAPBusyResult(), idempotent=False)
+
+
+def test_not_retryable():
+    """ Test other errors are not retried. """
+    c, connection = setup(RETRY_MAX_ATTEMPTS=3)
+    connection.delete_s.side_effect = errors.LDAPNoSuchObjectResult()
+
+    with pytest.raises(errors.LDAPNoSuchObjectResult):
+        c.delete('uid=tux,dc=python-ldap,dc=org')
+
+    assert connection.delete_s.call_count == 1
+    assert not c.circuit_breaker.is_open
+
+
+def test_circuit_open():
+    """ Test operations fail fast while the server is down. """
+    c, connection = setup(RETRY_MAX_ATTEMPTS=2, CIRCUIT_BREAKER_THRESHOLD=2)
+    connection.open.side_effect = errors.LDAPSocketOpenError()
+
+    with pytest.raises(errors.LDAPSocketOpenError):
+        c.delete('uid=tux,dc=python-ldap,dc=org')
+    assert c._connection_class.call_count == 2
+
+    with pytest.raises(tldap.exceptions.CircuitOpen):
+        c.delete('uid=tux,dc=python-ldap,dc=org')
+    assert c._connection_class.call_count == 2
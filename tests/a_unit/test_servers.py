@@ -0,0 +1,157 @@
+import ldap3
+import ldap3.core.exceptions as errors
+import mock
+import pytest
+
+import tldap.backend
+import tldap.transaction
+from tldap.backend.servers import ServerList, get_uri_list
+
+
+PRIMARY = 'ldap://primary:389'
+PRIMARY2 = 'ldap://primary2:389'
+REPLICA1 = 'ldap://replica1:389'
+REPLICA2 = 'ldap://replica2:389'
+
+
+def get_connection_class(down=()):
+    """ Get a mock connection class that fails to open servers in down. """
+
+    def connect(server, **kwargs):
+        connection = mock.MagicMock()
+        connection.closed = False
+        connection.bound = True
+        connection.result = {}
+        connection.response = []
+        connection.host = server.host
+        if server.host in down:
+            connection.open.side_effect = errors.LDAPSocketOpenError("down")
+        return connection
+
+    return mock.Mock(side_effect=connect)
+
+
+def setup(engine='tldap.backend.fake_transactions', down=(), **kwargs):
+    settings = {
+        'ENGINE': engine,
+        'URI': PRIMARY,
+        'REPLICA_URI': [REPLICA1, REPLICA2],
+        'USER': 'cn=Manager,dc=python-ldap,dc=org',
+        'PASSWORD': 'password',
+    }
+    settings.update(kwargs)
+    tldap.backend.setup({'default': settings})
+
+    c = tldap.backend.connections['default']
+    c.set_connection_class(get_connection_class(down))
+    return c
+
+
+def searched_hosts(c):
+    """ Get the server host used by each search. """
+    pools = [c.pool] + list(c.replica_pools.values())
+    hosts = []
+    for pool in pools:
+        for conn, _ in pool._idle:
+            hosts.extend([conn.host] * conn.search.call_count)
+    return sorted(hosts)
+
+
+def test_get_uri_list():
+    assert get_uri_list(None) == []
+    assert get_uri_list(PRIMARY) == [PRIMARY]
+    assert get_uri_list((PRIMARY, PRIMARY2)) == [PRIMARY, PRIMARY2]
+
+
+def test_server_list_down():
+    """ Test servers are skipped while down. """
+    servers = ServerList([PRIMARY, PRIMARY2], down_time=60)
+    servers.mark_down(PRIMARY)
+    assert servers.is_down(PRIMARY)
+    assert servers.available() == [PRIMARY2]
+
+    servers.mark_up(PRIMARY)
+    assert servers.available() == [PRIMARY, PRIMARY2]
+
+
+def test_server_list_all_down():
+    """ Test every server is tried if all are down. """
+    servers = ServerList([PRIMARY, PRIMARY2], down_time=60)
+    servers.mark_down(PRIMARY)
+    servers.mark_down(PRIMARY2)
+    assert servers.available() == [PRIMARY, PRIMARY2]
+
+
+def test_server_list_cool_off():
+    """ Test servers come back after the cool-off period. """
+    servers = ServerList([PRIMARY], down_time=0)
+    servers.mark_down(PRIMARY)
+    assert not servers.is_down(PRIMARY)
+
+
+def test_reads_round_robin():
+    """ Test searches alternate between the replicas. """
+    c = setup()
+    for _ in range(4):
+        list(c.search('dc=python-ldap,dc=org', ldap3.SUBTREE))
+
+    assert searched_hosts(c) == ['replica1', 'replica1', 'replica2', 'replica2']
+
+
+def test_reads_least_loaded():
+    """ Test searches use the replica with the fewest connections in use. """
+    c = setup(READ_STRATEGY='least_loaded')
+    busy = c.replica_pools[REPLICA1].checkout()
+
+    list(c.search('dc=python-ldap,dc=org', ldap3.SUBTREE))
+    c.replica_pools[REPLICA1].checkin(busy)
+
+    assert busy.search.call_count == 0
+    assert searched_hosts(c) == ['replica2']
+
+
+def test_writes_primary():
+    """ Test writes go to the primary. """
+    c = setup(engine='tldap.backend.no_transactions')
+    c.delete('uid=tux,dc=python-ldap,dc=org')
+
+    assert c.pool.stats()['idle'] == 1
+    assert c.pool._idle[0][0].host == 'primary'
+    for pool in c.replica_pools.values():
+        assert pool.stats()['idle'] == 0
+
+
+@pytest.mark.parametrize('engine', [
+    'tldap.backend.fake_transactions',
+    'tldap.backend.no_transactions',
+])
+def test_reads_sticky_in_transaction(engine):
+    """ Test searches go to the primary inside a transaction. """
+    c = setup(engine=engine)
+    with tldap.transaction.commit_on_success():
+        list(c.search('dc=python-ldap,dc=org', ldap3.SUBTREE))
+    list(c.search('dc=python-ldap,dc=org', ldap3.SUBTREE))
+
+    assert searched_hosts(c) == ['primary', 'replica1']
+
+
+def test_replica_down():
+    """ Test a failed replica is marked down and the primary used instead. """
+    c = setup(down=['replica1'])
+    list(c.search('dc=python-ldap,dc=org', ldap3.SUBTREE))
+    list(c.search('dc=python-ldap,dc=org', ldap3.SUBTREE))
+    list(c.search('dc=python-ldap,dc=org', ldap3.SUBTREE))
+
+    assert c._replica_servers.is_down(REPLICA1)
+    assert searched_hosts(c) == ['primary', 'replica2', 'replica2']
+
+
+def test_primary_failover():
+    """ Test the next primary is used if the first is down. """
+    c = setup(engine='tldap.backend.no_transactions', URI=[PRIMARY, PRIMARY2], down=['primary'])
+    c.delete('uid=tux,dc=python-ldap,dc=org')
+    c.delete('uid=tux,dc=python-ldap,dc=org')
+
+    assert c._servers.is_down(PRIMARY)
+    assert c.pool._idle[0][0].host == 'primary2'
+    assert c._connection_class.call_count == 2
@@ -7,6 +7,7 @@ import tldap.django.helpers as dhelpers
 
 
 class Account(LdapObject):
+    __slots__ = ()
 
     @classmethod
     def get_fields(cls) -> Dict[str, tldap.fields.Field]:
@@ -70,6 +71,7 @@ class Account(LdapObject):
 
 
 class Group(LdapObject):
+    __slots__ = ()
 
     @classmethod
     def get_fields(cls) -> Dict[str, tldap.fields.Field]:
@@ -114,6 +116,7 @@ class Group(LdapObject):
 
 
 class OU(LdapObject):
+    __slots__ = ()
 
     @classmethod
     def get_fields(cls) -> Dict[str, tldap.fields.Field]:
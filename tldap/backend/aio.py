@@ -0,0 +1,219 @@
+# Copyright 2026 Brian May
+#
+# This file is part of python-tldap.
+#
+# python-tldap is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# python-tldap is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with python-tldap  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Asyncio support for the LDAP backends.
+
+ldap3 only provides blocking operations, so every operation is run in an
+executor, using the same pool of LDAP connections as the blocking API.
+Every asyncio task gets its own connection object, with its own transaction
+state, which is inherited by any tasks it creates.
+"""
+
+import asyncio
+import contextvars
+import functools
+import itertools
+from concurrent.futures import Executor
+from contextvars import ContextVar
+from typing import (
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+import tldap.backend
+from tldap.utils import DEFAULT_LDAP_ALIAS, ConnectionHandler
+
+from .base import DEFAULT_PAGE_SIZE, BulkResult, LdapBase
+
+
+Entity = TypeVar('Entity')
+
+_executor: Optional[Executor] = None
+
+_connections: ContextVar[Dict[str, Tuple[ConnectionHandler, 'AsyncLDAPwrapper']]] = \
+    ContextVar('tldap_connections')
+
+
+def set_executor(executor: Optional[Executor]) -> None:
+    """ Set the executor for blocking operations, None for the loop default. """
+    global _executor
+    _executor = executor
+
+
+async def run(fn: Callable[..., Entity], *args, **kwargs) -> Entity:
+    """
+    Run a blocking function in the executor, in a copy of the current context,
+    so it uses the connections of the current task.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, context.run, functools.partial(fn, *args, **kwargs))
+
+
+async def iterate(iterator: Iterator[Entity], chunk_size: int = DEFAULT_PAGE_SIZE) -> AsyncIterator[Entity]:
+    """
+    Consume a blocking iterator in the executor, chunk_size items at a time.
+    """
+    def next_chunk():
+        return list(itertools.islice(iterator, chunk_size))
+
+    try:
+        while True:
+            chunk = await run(next_chunk)
+            for item in chunk:
+                yield item
+            if len(chunk) < chunk_size:
+                break
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await run(close)
+
+
+class AsyncLDAPwrapper(object):
+    """ Asyncio interface to a blocking LDAP connection class. """
+
+    def __init__(self, connection: LdapBase) -> None:
+        self._connection = connection
+
+    @property
+    def connection(self) -> LdapBase:
+        """ The blocking connection object. """
+        return self._connection
+
+    @property
+    def settings_dict(self) -> dict:
+        return self._connection.settings_dict
+
+    def close(self) -> None:
+        self._connection.close()
+
+    async def check_password(self, dn: str, password: str) -> bool:
+        return await run(self._connection.check_password, dn, password)
+
+    ###################
+    # read only stuff #
+    ###################
+
+    async def search(self, base, scope, filterstr='(objectClass=*)',
+                     attrlist=None, limit=None, **kwargs) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Search for entries in LDAP database.
+        """
+        if limit is None:
+            limit = self.settings_dict.get('PAGE_SIZE', DEFAULT_PAGE_SIZE)
+
+        iterator = self._connection.search(base, scope, filterstr, attrlist, limit, **kwargs)
+        async for result in iterate(iterator, chunk_size=limit):
+            yield result
+
+    ##########################
+    # Transaction Management #
+    ##########################
+
+    def is_dirty(self) -> bool:
+        """ Are there uncommitted changes? """
+        return self._connection.is_dirty()
+
+    def is_managed(self) -> bool:
+        """ Are we inside transaction management? """
+        return self._connection.is_managed()
+
+    def enter_transaction_management(self) -> None:
+        """ Start a transaction. """
+        self._connection.enter_transaction_management()
+
+    def leave_transaction_management(self) -> None:
+        """ End a transaction. """
+        self._connection.leave_transaction_management()
+
+    async def commit(self) -> None:
+        """ Attempt to commit all changes to LDAP database. """
+        await run(self._connection.commit)
+
+    async def rollback(self) -> None:
+        """ Roll back to previous database state. """
+        await run(self._connection.rollback)
+
+    ##################################
+    # Functions needing Transactions #
+    ##################################
+
+    async def add(self, dn: str, mod_list: dict) -> None:
+        return await run(self._connection.add, dn, mod_list)
+
+    async def modify(self, dn: str, mod_list: dict) -> None:
+        return await run(self._connection.modify, dn, mod_list)
+
+    async def modify_no_rollback(self, dn: str, mod_list: dict) -> None:
+        return await run(self._connection.modify_no_rollback, dn, mod_list)
+
+    async def delete(self, dn: str) -> None:
+        return await run(self._connection.delete, dn)
+
+    async def rename(self, dn: str, new_rdn: str, new_base_dn: Optional[str] = None) -> None:
+        return await run(self._connection.rename, dn, new_rdn, new_base_dn)
+
+    async def bulk(self, operations: Iterable[tuple]) -> List[BulkResult]:
+        """ Send many operations without waiting for each response. """
+        return await run(self._connection.bulk, list(operations))
+
+
+def get_connection(alias: str = DEFAULT_LDAP_ALIAS) -> AsyncLDAPwrapper:
+    """
+    Get the connection for alias in the current asyncio context. Connections
+    share the pool of the connections in :py:data:`tldap.backend.connections`.
+    """
+    handler = tldap.backend.connections
+    connections = _connections.get({})
+
+    if alias in connections:
+        connection_handler, connection = connections[alias]
+        if connection_handler is handler:
+            return connection
+
+    connection = AsyncLDAPwrapper(handler.create(alias))
+
+    # Don't modify the dictionary, it may be shared with other contexts.
+    _connections.set({
+        **connections,
+        alias: (handler, connection),
+    })
+    return connection
+
+
+def get_context_connection(alias: str = DEFAULT_LDAP_ALIAS) -> Optional[LdapBase]:
+    """
+    Get the blocking connection for alias of the current asyncio task, or
+    None if not called from a task that has one. Blocking code run with
+    :py:func:`run` is called in the context of the task.
+    """
+    connections = _connections.get({})
+    if alias not in connections:
+        return None
+    connection_handler, connection = connections[alias]
+    if connection_handler is not tldap.backend.connections:
+        return None
+    return connection.connection
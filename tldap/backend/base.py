@@ -18,14 +18,36 @@
 """ This module provides the LDAP base functions
 with a subset of the functions from the real ldap module. """
 
+import collections
+import functools
+import itertools
 import logging
 import ssl
-from typing import Callable, Generator, Optional, Tuple, TypeVar
+import time
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
 from urllib.parse import urlparse
 
 import ldap3
 import ldap3.core.exceptions as exceptions
 
+from . import controls, metrics
+from .pool import ConnectionPool
+from .retry import CircuitBreaker, RetryPolicy
+from .servers import DEFAULT_DOWN_TIME, ServerList, get_uri_list
+from .tls import Tls
+
 
 logger = logging.getLogger(__name__)
 
@@ -37,81 +59,278 @@ def _debug(*argv):
 
 Entity = TypeVar('Entity')
 
+UpdateCallable = Callable[[ldap3.Connection], Any]
+Actions = Tuple[UpdateCallable, Optional[UpdateCallable]]
+
+
+PAGED_RESULTS_OID = '1.2.840.113556.1.4.319'
+""" OID of the Simple Paged Results control, RFC 2696. """
+
+DEFAULT_PAGE_SIZE = 500
+""" Number of entries per page if not given by the PAGE_SIZE setting. """
+
+DEFAULT_BULK_WINDOW = 100
+""" Maximum outstanding bulk operations if not given by the BULK_WINDOW setting. """
+
+
+def _get_cookie(obj: ldap3.Connection) -> Optional[bytes]:
+    """ Get the paged results cookie from the last search. """
+    try:
+        return obj.result['controls'][PAGED_RESULTS_OID]['value']['cookie']
+    except (KeyError, TypeError):
+        return None
+
+
+@functools.lru_cache(maxsize=32)
+def _get_server(uri: str, start_tls: bool, ciphers: Optional[str],
+                tls_ca: Optional[str], require_tls: bool) -> ldap3.Server:
+    """
+    Get the ldap3 Server for these settings. The Server and its SSL context
+    are created once and shared by every connection.
+    """
+    url = urlparse(uri)
+
+    if url.scheme == "ldaps":
+        use_ssl = True
+    elif url.scheme == "ldap":
+        use_ssl = False
+    else:
+        raise RuntimeError("Unknown scheme '%s'" % url.scheme)
+
+    if ":" in url.netloc:
+        host, port = url.netloc.split(":")
+        port = int(port)
+    else:
+        host = url.netloc
+        if use_ssl:
+            port = 636
+        else:
+            port = 389
+
+    tls = None
+    if use_ssl or start_tls:
+        tls = Tls()
+
+        if ciphers is not None:
+            tls.ciphers = ciphers
+
+        if tls_ca:
+            tls.ca_certs_file = tls_ca
+
+        if require_tls:
+            tls.validate = ssl.CERT_REQUIRED
+
+    return ldap3.Server(host, port=port, use_ssl=use_ssl, tls=tls)
+
+
+class BulkResult(object):
+    """ The result of one operation sent with :py:meth:`LdapBase.bulk`. """
+
+    def __init__(self, operation: tuple) -> None:
+        self.operation = operation
+        self.message_id: Optional[int] = None
+        self.result: Optional[dict] = None
+        self.error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        """ Did the operation succeed? """
+        return self.error is None
+
+    def __repr__(self) -> str:
+        return "<BulkResult %r %s>" % (self.operation[:2], "ok" if self.ok else self.error)
+
 
 class LdapBase(object):
     """ The vase LDAP connection class. """
 
     def __init__(self, settings_dict: dict) -> None:
         self.settings_dict = settings_dict
-        self._obj = None
+        self._pool: Optional[ConnectionPool] = None
+        self._auth_pool: Optional[ConnectionPool] = None
+        self._replica_pools: Optional[Dict[str, ConnectionPool]] = None
         self._connection_class = ldap3.Connection
+        self.alias: Optional[str] = None
+
+        down_time = settings_dict.get('SERVER_DOWN_TIME', DEFAULT_DOWN_TIME)
+        self._servers = ServerList(get_uri_list(settings_dict.get('URI')), down_time)
+        self._replica_servers = ServerList(get_uri_list(settings_dict.get('REPLICA_URI')), down_time)
+        self._next_replica = itertools.count()
+
+        self.retry_policy = RetryPolicy.from_settings(settings_dict)
+        self.circuit_breaker = CircuitBreaker.from_settings(settings_dict)
 
     def close(self) -> None:
-        if self._obj is not None:
-            self._obj.unbind()
-            self._obj = None
+        """ Close all idle connections in the pools. """
+        if self._pool is not None:
+            self._pool.close()
+        if self._auth_pool is not None:
+            self._auth_pool.close()
+        if self._replica_pools is not None:
+            for pool in self._replica_pools.values():
+                pool.close()
 
     #########################
     # Connection Management #
     #########################
 
     def set_connection_class(self, connection_class):
+        """
+        Set the class used to create new connections. Only affects pools
+        created by this object.
+        """
         self._connection_class = connection_class
 
+    def create_pool(self, uri: Optional[str] = None) -> ConnectionPool:
+        """
+        Create a new pool of connections bound with our credentials. If uri is
+        given, connect to that server, otherwise connect to the primary.
+        """
+        settings = self.settings_dict
+        return ConnectionPool(
+            functools.partial(self._connect_default, uri=uri),
+            min_size=settings.get('POOL_MIN_SIZE', 0),
+            max_size=settings.get('POOL_MAX_SIZE', 10),
+            idle_timeout=settings.get('POOL_IDLE_TIMEOUT', None),
+            timeout=settings.get('POOL_TIMEOUT', None),
+        )
+
+    def create_auth_pool(self) -> ConnectionPool:
+        """
+        Create a new pool of connections for checking passwords. These
+        connections are bound as whatever user last checked a password, so
+        are never used for anything else.
+        """
+        settings = self.settings_dict
+        return ConnectionPool(
+            self._connect_anonymous,
+            max_size=settings.get('AUTH_POOL_MAX_SIZE', 10),
+            idle_timeout=settings.get('AUTH_POOL_IDLE_TIMEOUT', None),
+            timeout=settings.get('AUTH_POOL_TIMEOUT', None),
+            # A failed bind leaves the connection unbound but still usable.
+            check=lambda conn: not conn.closed,
+        )
+
+    def share_pools(self, other: 'LdapBase') -> None:
+        """ Use the same pools as another object with the same settings. """
+        self._pool = other.pool
+        self._auth_pool = other.auth_pool
+        self._replica_pools = other.replica_pools
+        self._servers = other._servers
+        self._replica_servers = other._replica_servers
+        self._next_replica = other._next_replica
+        self.circuit_breaker = other.circuit_breaker
+
+    @property
+    def pool(self) -> ConnectionPool:
+        """ The pool of connections to the primary, used for all writes. """
+        if self._pool is None:
+            self._pool = self.create_pool()
+        return self._pool
+
+    @property
+    def replica_pools(self) -> Dict[str, ConnectionPool]:
+        """ The pools of connections to each read replica. """
+        if self._replica_pools is None:
+            self._replica_pools = {
+                uri: self.create_pool(uri) for uri in self._replica_servers.uris
+            }
+        return self._replica_pools
+
+    @property
+    def auth_pool(self) -> ConnectionPool:
+        """ The pool of connections used for checking passwords. """
+        if self._auth_pool is None:
+            self._auth_pool = self.create_auth_pool()
+        return self._auth_pool
+
     def check_password(self, dn: str, password: str) -> bool:
+        """
+        Check the password for a DN by binding as that user. An idle
+        connection from the auth pool is rebound if possible, otherwise a new
+        connection is created.
+        """
+        pool = self.auth_pool
+        created = []
+
+        def connect():
+            created.append(True)
+            return self._connect(user=dn, password=password)
+
         try:
-            conn = self._connect(user=dn, password=password)
-            conn.unbind()
-            return True
+            conn = pool.checkout(factory=connect)
         except exceptions.LDAPInvalidCredentialsResult:
             return False
         except exceptions.LDAPUnwillingToPerformResult:
             return False
 
-    def _connect(self, user: str, password: str) -> ldap3.Connection:
-        settings = self.settings_dict
-
-        _debug("connecting")
-        url = urlparse(settings['URI'])
-
-        if url.scheme == "ldaps":
-            use_ssl = True
-        elif url.scheme == "ldap":
-            use_ssl = False
-        else:
-            raise RuntimeError("Unknown scheme '%s'" % url.scheme)
-
-        if ":" in url.netloc:
-            host, port = url.netloc.split(":")
-            port = int(port)
-        else:
-            host = url.netloc
-            if use_ssl:
-                port = 636
-            else:
-                port = 389
+        if created:
+            # New connection is already bound as this user.
+            pool.checkin(conn)
+            return True
 
-        start_tls = False
-        if 'START_TLS' in settings and settings['START_TLS']:
-            start_tls = True
+        try:
+            conn.rebind(user=dn, password=password, read_server_info=False)
+        except (exceptions.LDAPInvalidCredentialsResult, exceptions.LDAPUnwillingToPerformResult):
+            pool.checkin(conn)
+            return False
+        except exceptions.LDAPException:
+            # Connection is broken, fall back to a new connection.
+            _debug("rebind failed, reconnecting")
+            pool.discard(conn)
+            try:
+                conn = pool.checkout(fresh=True, factory=connect)
+            except exceptions.LDAPInvalidCredentialsResult:
+                return False
+            except exceptions.LDAPUnwillingToPerformResult:
+                return False
+
+        pool.checkin(conn)
+        return True
+
+    def _connect(self, user: Optional[str], password: Optional[str],
+                 uri: Optional[str] = None, client_strategy: Optional[str] = None) -> ldap3.Connection:
+        """
+        Connect to the server uri. If uri is not given, connect to the first
+        primary server that is not down, marking servers that fail as down.
+        """
+        if uri is not None:
+            return self._connect_uri(uri, user, password, client_strategy)
+
+        error = None
+        for uri in self._servers.available():
+            try:
+                c = self._connect_uri(uri, user, password, client_strategy)
+            except exceptions.LDAPCommunicationError as e:
+                self._servers.mark_down(uri)
+                error = e
+                continue
+            self._servers.mark_up(uri)
+            return c
 
-        tls = None
-        if use_ssl or start_tls:
-            tls = ldap3.Tls()
+        if error is None:
+            raise RuntimeError("No LDAP servers in URI setting")
+        raise error
 
-            if 'CIPHERS' in settings:
-                tls.ciphers = settings['CIPHERS']
+    def _connect_uri(self, uri: str, user: Optional[str], password: Optional[str],
+                     client_strategy: Optional[str] = None) -> ldap3.Connection:
+        settings = self.settings_dict
 
-            if 'TLS_CA' in settings and settings['TLS_CA']:
-                tls.ca_certs_file = settings['TLS_CA']
+        _debug("connecting", uri)
+        start_tls = bool(settings.get('START_TLS'))
+        s = _get_server(
+            uri, start_tls, settings.get('CIPHERS'),
+            settings.get('TLS_CA'), bool(settings.get('REQUIRE_TLS')))
 
-            if 'REQUIRE_TLS' in settings and settings['REQUIRE_TLS']:
-                tls.validate = ssl.CERT_REQUIRED
+        kwargs = {}
+        if client_strategy is not None:
+            kwargs['client_strategy'] = client_strategy
 
-        s = ldap3.Server(host, port=port, use_ssl=use_ssl, tls=tls)
         c = self._connection_class(
             s,  # client_strategy=ldap3.STRATEGY_SYNC_RESTARTABLE,
-            user=user, password=password, authentication=ldap3.SIMPLE)
+            user=user, password=password,
+            authentication=ldap3.SIMPLE if user is not None else ldap3.ANONYMOUS,
+            **kwargs)
         c.strategy.restartable_sleep_time = 0
         c.strategy.restartable_tries = 1
         c.raise_exceptions = True
@@ -122,47 +341,175 @@ class LdapBase(object):
             c.start_tls()
 
         try:
-            c.bind()
+            if s.info is None and s.schema is None:
+                c.bind()
+            else:
+                # The server is shared, so the schema has already been read.
+                c.bind(read_server_info=False)
         except:  # noqa: E722
             c.unbind()
             raise
 
+        if isinstance(s.tls, Tls):
+            s.tls.save_session(c.socket)
+
         return c
 
-    def _reconnect(self) -> None:
+    def _connect_default(self, uri: Optional[str] = None, client_strategy: Optional[str] = None) -> ldap3.Connection:
         settings = self.settings_dict
-        try:
-            self._obj = self._connect(
-                user=settings['USER'], password=settings['PASSWORD'])
-        except Exception:
-            self._obj = None
-            raise
-        assert self._obj is not None
+        return self._connect(
+            user=settings['USER'], password=settings['PASSWORD'], uri=uri,
+            client_strategy=client_strategy)
+
+    def _connect_anonymous(self) -> ldap3.Connection:
+        return self._connect(user=None, password=None)
+
+    def _read_from_primary(self) -> bool:
+        """ Must reads go to the primary, to see our own writes? """
+        return self.is_managed()
+
+    def _get_read_pool(self) -> Tuple[Optional[str], ConnectionPool]:
+        """
+        Choose the pool for a read. Returns the replica URI, or None if the
+        primary should be used.
+        """
+        if len(self._replica_servers) == 0 or self._read_from_primary():
+            return None, self.pool
+
+        uris = [uri for uri in self._replica_servers.uris if not self._replica_servers.is_down(uri)]
+        if len(uris) == 0:
+            return None, self.pool
+
+        pools = self.replica_pools
+        strategy = self.settings_dict.get('READ_STRATEGY', 'round_robin')
+        if strategy == 'round_robin':
+            uri = uris[next(self._next_replica) % len(uris)]
+        elif strategy == 'least_loaded':
+            uri = min(uris, key=lambda u: pools[u].stats()['in_use'])
+        else:
+            raise RuntimeError("Unknown READ_STRATEGY '%s'" % strategy)
+        return uri, pools[uri]
+
+    def _checkout_with_retry(
+            self, fn: Callable[[ldap3.Connection], Entity], read: bool = False,
+            op: Optional[metrics.Operation] = None,
+            idempotent: bool = True) -> Tuple[ConnectionPool, ldap3.Connection, Entity]:
+        """
+        Call fn with a connection from the pool, retrying according to the
+        retry policy. Reads may use a replica, everything else uses the
+        primary. If fn is not idempotent, it is only retried if it wasn't
+        applied. On success the pool and connection are returned with the
+        connection still checked out, and it must be given back to the pool by
+        the caller. Retries are counted in op.
+        """
+        if read:
+            uri, pool = self._get_read_pool()
+        else:
+            uri, pool = None, self.pool
+
+        policy = self.retry_policy
+        breaker = self.circuit_breaker
+        started = time.monotonic()
+        attempt = 0
+        fresh = False
+
+        while True:
+            if uri is None:
+                breaker.check()
+
+            obj = None
+            try:
+                obj = pool.checkout(fresh=fresh)
+                result = fn(obj)
+            except Exception as e:
+                if obj is not None:
+                    if isinstance(e, exceptions.LDAPCommunicationError):
+                        pool.discard(obj)
+                    else:
+                        pool.checkin(obj)
+
+                if not policy.is_retryable(e, idempotent=idempotent, sent=obj is not None):
+                    if uri is None:
+                        # the server answered, or can't be relied on
+                        if isinstance(e, exceptions.LDAPOperationResult):
+                            breaker.record_success()
+                        elif isinstance(e, exceptions.LDAPCommunicationError):
+                            breaker.record_failure()
+                    raise
+
+                if op is not None:
+                    op.retries += 1
+
+                if uri is not None:
+                    # replica failed, use the primary instead
+                    _debug("replica failed, using primary", uri, e)
+                    self._replica_servers.mark_down(uri)
+                    pool.close()
+                    uri, pool = None, self.pool
+                    continue
+
+                breaker.record_failure()
+                attempt += 1
+                delay = policy.get_delay(attempt, time.monotonic() - started)
+                if delay is None:
+                    raise
+
+                # if it fails, reconnect then retry
+                _debug("retrying in", delay, e)
+                fresh = isinstance(e, exceptions.LDAPCommunicationError)
+                if fresh and op is not None:
+                    op.reconnects += 1
+                time.sleep(delay)
+                continue
 
-    def _do_with_retry(self, fn: Callable[[ldap3.Connection], Entity]) -> Entity:
-        if self._obj is None:
-            self._reconnect()
-            assert self._obj is not None
+            if uri is None:
+                breaker.record_success()
+            return pool, obj, result
 
+    def _do_with_retry(self, fn: Callable[[ldap3.Connection], Entity], read: bool = False,
+                       operation: str = "other", idempotent: bool = True) -> Entity:
+        """
+        Call fn with a connection from the pool, recording metrics for
+        operation. Writes must set idempotent to False.
+        """
+        op = metrics.Operation(operation, self.alias)
         try:
-            return fn(self._obj)
-        except ldap3.core.exceptions.LDAPSessionTerminatedByServerError:
-            # if it fails, reconnect then retry
-            _debug("SERVER_DOWN, reconnecting")
-            self._reconnect()
-            return fn(self._obj)
+            with op.timer():
+                pool, obj, result = self._checkout_with_retry(fn, read=read, op=op, idempotent=idempotent)
+        except Exception as e:
+            op.error = type(e).__name__
+            raise
+        finally:
+            metrics.record(op)
+        pool.checkin(obj)
+        return result
 
     ###################
     # read only stuff #
     ###################
 
     def search(self, base, scope, filterstr='(objectClass=*)',
-               attrlist=None, limit=None) -> Generator[Tuple[str, dict], None, None]:
+               attrlist=None, limit=None, order_by: Optional[Sequence[str]] = None,
+               offset: int = 0, count: Optional[int] = None) -> Generator[Tuple[str, dict], None, None]:
         """
         Search for entries in LDAP database.
+
+        Results are retrieved ``limit`` entries at a time with the Simple
+        Paged Results control, so only one page is held in memory at once.
+        If ``limit`` is not given the ``PAGE_SIZE`` setting is used. The
+        connection is kept out of the pool until all pages have been read.
+
+        If ``order_by`` is given, a list of attributes optionally prefixed
+        with ``-`` for descending order, the server sorts the results with
+        the Server Side Sort control. If ``count`` is also given, only
+        ``count`` results starting at ``offset`` are requested with the
+        Virtual List View control. Otherwise ``offset`` and ``count`` are
+        applied as the results are read, and the server is asked to stop
+        after ``offset + count`` results. If the server refuses the controls
+        the ldap3 exception is raised.
         """
 
-        _debug("search", base, scope, filterstr, attrlist, limit)
+        _debug("search", base, scope, filterstr, attrlist, limit, order_by, offset, count)
 
         # first results
         if attrlist is None:
@@ -170,31 +517,261 @@ class LdapBase(object):
         elif isinstance(attrlist, set):
             attrlist = list(attrlist)
 
+        if limit is None:
+            limit = self.settings_dict.get('PAGE_SIZE', DEFAULT_PAGE_SIZE)
+
+        kwargs = {}
+        use_vlv = bool(order_by) and count is not None
+        if order_by:
+            kwargs['controls'] = [controls.sort_control(order_by)]
+        if use_vlv:
+            kwargs['controls'].append(controls.vlv_control(offset, count))
+        else:
+            kwargs['paged_size'] = limit
+            if count is not None and offset + count > 0:
+                # the server can stop once it has found enough entries
+                kwargs['size_limit'] = offset + count
+
         def first_results(obj):
             _debug("---> searching ldap", limit)
             obj.search(
-                base, filterstr, scope, attributes=attrlist, paged_size=limit)
-            return obj.response
+                base, filterstr, scope, attributes=attrlist, **kwargs)
+            return obj.response, _get_cookie(obj)
+
+        op = metrics.Operation("search", self.alias)
+        op.results = 0
 
         # get the 1st result
-        result_list = self._do_with_retry(first_results)
+        try:
+            with op.timer():
+                pool, obj, (result_list, cookie) = self._checkout_with_retry(first_results, read=True, op=op)
+        except Exception as e:
+            op.error = type(e).__name__
+            metrics.record(op)
+            raise
 
-        # Loop over list of search results
-        for result_item in result_list:
-            # skip searchResRef for now
-            if result_item['type'] != "searchResEntry":
-                continue
-            dn = result_item['dn']
-            attributes = result_item['raw_attributes']
-            # did we already retrieve this from cache?
-            _debug("---> got ldap result", dn)
-            _debug("---> yielding", result_item)
-            yield (dn, attributes)
+        skip = offset
+        remaining = count
+        if use_vlv:
+            # the server already skipped to the offset, unless it was past
+            # the end, in which case it returns the last entry
+            skip = 0
+            vlv_result = controls.get_vlv_result(obj.result)
+            if vlv_result is not None:
+                skip = max(offset + 1 - vlv_result[0], 0)
+
+        # the connection can't be used again after a communication error
+        broken = False
+        try:
+            while True:
+                # Loop over list of search results
+                for result_item in result_list:
+                    # skip searchResRef for now
+                    if result_item['type'] != "searchResEntry":
+                        continue
+                    if skip > 0:
+                        skip -= 1
+                        continue
+                    if remaining is not None:
+                        if remaining == 0:
+                            break
+                        remaining -= 1
+                    dn = result_item['dn']
+                    attributes = result_item['raw_attributes']
+                    # did we already retrieve this from cache?
+                    _debug("---> got ldap result", dn)
+                    _debug("---> yielding", result_item)
+                    op.results += 1
+                    yield (dn, attributes)
+
+                if not cookie or remaining == 0:
+                    break
+
+                # get the next page, this must use the same connection
+                _debug("---> searching ldap next page", limit)
+                result_list = None
+                with op.timer():
+                    obj.search(
+                        base, filterstr, scope, attributes=attrlist, paged_cookie=cookie,
+                        **kwargs)
+                result_list = obj.response
+                cookie = _get_cookie(obj)
+
+        except Exception as e:
+            op.error = type(e).__name__
+            broken = isinstance(e, exceptions.LDAPCommunicationError)
+            raise
+
+        finally:
+            if cookie and not broken:
+                # we didn't read every page, tell the server to discard the rest
+                _debug("---> abandoning paged search")
+                try:
+                    kwargs['paged_size'] = 0
+                    with op.timer():
+                        obj.search(
+                            base, filterstr, scope, attributes=attrlist, paged_cookie=cookie,
+                            **kwargs)
+                except exceptions.LDAPException as e:
+                    _debug("---> ignoring error abandoning search", e)
+                    broken = isinstance(e, exceptions.LDAPCommunicationError)
+            if broken:
+                pool.discard(obj)
+            else:
+                pool.checkin(obj)
+            metrics.record(op)
 
         # we are finished - return results, eat cake
         _debug("---> done")
         return
 
+    ##############
+    # bulk stuff #
+    ##############
+
+    def bulk(self, operations: Iterable[tuple]) -> List[BulkResult]:
+        """
+        Send many operations without waiting for each response. Each
+        operation is one of ``('add', dn, mod_list)``,
+        ``('modify', dn, mod_list)``, ``('delete', dn)`` or
+        ``('rename', dn, new_rdn, new_base_dn)``.
+
+        Up to ``BULK_WINDOW`` operations are outstanding at once, and the
+        server may process them in any order, so they must not depend on each
+        other. A result is returned for every operation, in order. A failed
+        operation is reported in its result and does not stop the others.
+
+        The response of every operation sent is always read. Inside a
+        transaction the rollback of every operation that succeeded is
+        recorded, as is the rollback of any operation whose response was lost,
+        as it may have been applied.
+        """
+        results = [BulkResult(operation) for operation in operations]
+
+        _debug("bulk")
+        breaker = self.circuit_breaker
+        op = metrics.Operation("bulk", self.alias)
+        try:
+            breaker.check()
+            with op.timer():
+                try:
+                    obj = self._connect_default(client_strategy=ldap3.ASYNC)
+                except exceptions.LDAPCommunicationError:
+                    breaker.record_failure()
+                    raise
+                try:
+                    self._send_bulk(obj, results)
+                finally:
+                    obj.unbind()
+
+            errors = [result.error for result in results if result.error is not None]
+            if any(isinstance(e, exceptions.LDAPCommunicationError) for e in errors):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if len(errors) > 0:
+                op.error = type(errors[0]).__name__
+        except Exception as e:
+            op.error = type(e).__name__
+            raise
+        finally:
+            metrics.record(op)
+
+        _debug("---> bulk done")
+        return results
+
+    def _send_bulk(self, obj: ldap3.Connection, results: List[BulkResult]) -> None:
+        """ Send the operations of results on obj, and read their responses. """
+        window = self.settings_dict.get('BULK_WINDOW', DEFAULT_BULK_WINDOW)
+        pending: Deque[Tuple[BulkResult, Optional[UpdateCallable]]] = collections.deque()
+
+        def fail(result: BulkResult, e: Exception) -> None:
+            _debug("---> bulk operation failed", result.operation, e)
+            result.error = e
+
+        def collect() -> None:
+            result, on_rollback = pending.popleft()
+            try:
+                _, result.result = obj.get_response(result.message_id)
+            except exceptions.LDAPOperationResult as e:
+                # the server refused the operation
+                fail(result, e)
+                return
+            except Exception as e:
+                # the operation may have been applied
+                fail(result, e)
+            if on_rollback is not None:
+                self._add_rollback(on_rollback)
+
+        # work out every action before sending anything
+        all_actions = self._get_bulk_actions(obj, results)
+
+        try:
+            for result, actions in zip(results, all_actions):
+                if actions is None:
+                    continue
+                on_commit, on_rollback = actions
+                try:
+                    result.message_id = on_commit(obj)
+                except Exception as e:
+                    fail(result, e)
+                    continue
+
+                pending.append((result, on_rollback))
+                while len(pending) >= window:
+                    collect()
+        finally:
+            # always read the responses of operations already sent
+            while len(pending) > 0:
+                collect()
+
+    def _get_bulk_actions(self, obj: ldap3.Connection, results: List[BulkResult]) -> List[Optional[Actions]]:
+        """
+        Get the actions of every bulk operation, or None if an operation is
+        invalid, in which case the error is set in its result.
+        """
+        all_actions: List[Optional[Actions]] = []
+        for result in results:
+            try:
+                all_actions.append(self._get_actions(*result.operation))
+            except Exception as e:
+                _debug("---> bulk operation failed", result.operation, e)
+                result.error = e
+                all_actions.append(None)
+        return all_actions
+
+    def _get_actions(self, operation: str, *args, current: Optional[dict] = None) -> Actions:
+        """
+        Get the commit and rollback actions for a bulk operation. current is
+        the entry being modified or deleted, if already known.
+        """
+        if operation == 'add':
+            return self._add_actions(*args)
+        elif operation == 'modify':
+            return self._modify_actions(*args, current=current)
+        elif operation == 'delete':
+            return self._delete_actions(*args, current=current)
+        elif operation == 'rename':
+            return self._rename_actions(*args)
+        else:
+            raise ValueError("Unknown bulk operation '%s'" % operation)
+
+    def _add_actions(self, dn: str, mod_list: dict) -> Actions:
+        return (lambda obj: obj.add(dn, None, mod_list)), None
+
+    def _modify_actions(self, dn: str, mod_list: dict, current: Optional[dict] = None) -> Actions:
+        return (lambda obj: obj.modify(dn, mod_list)), None
+
+    def _delete_actions(self, dn: str, current: Optional[dict] = None) -> Actions:
+        return (lambda obj: obj.delete(dn)), None
+
+    def _rename_actions(self, dn: str, new_rdn: str, new_base_dn: Optional[str] = None) -> Actions:
+        return (lambda obj: obj.modify_dn(dn, new_rdn, new_superior=new_base_dn)), None
+
+    def _add_rollback(self, on_rollback: UpdateCallable) -> None:
+        """ Record how to undo a completed change, if inside a transaction. """
+        pass
+
     ####################
     # Cache Management #
     ####################
@@ -0,0 +1,182 @@
+# Copyright 2026 Brian May
+#
+# This file is part of python-tldap.
+#
+# python-tldap is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# python-tldap is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with python-tldap  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Server Side Sort (RFC 2891) and Virtual List View (draft-ietf-ldapext-ldapv3-vlv)
+controls, which ldap3 doesn't provide.
+"""
+
+from typing import Optional, Sequence, Tuple
+
+import ldap3.core.exceptions as exceptions
+from ldap3.protocol.controls import build_control
+from pyasn1.codec.ber import decoder
+from pyasn1.type import namedtype, tag, univ
+
+
+SORT_REQUEST_OID = '1.2.840.113556.1.4.473'
+SORT_RESPONSE_OID = '1.2.840.113556.1.4.474'
+VLV_REQUEST_OID = '2.16.840.1.113730.3.4.9'
+VLV_RESPONSE_OID = '2.16.840.1.113730.3.4.10'
+
+# Result codes meaning the server can't or won't sort the results:
+# adminLimitExceeded, unavailableCriticalExtension, inappropriateMatching,
+# unwillingToPerform, sortControlMissing, offsetRangeError and
+# virtualListViewError.
+REFUSED_RESULTS = frozenset([11, 12, 18, 53, 60, 61, 76])
+
+
+def _context(number: int, constructed: bool = False) -> tag.Tag:
+    tag_format = tag.tagFormatConstructed if constructed else tag.tagFormatSimple
+    return tag.Tag(tag.tagClassContext, tag_format, number)
+
+
+class SortKey(univ.Sequence):
+    componentType = namedtype.NamedTypes(
+        namedtype.NamedType('attributeType', univ.OctetString()),
+        namedtype.OptionalNamedType(
+            'orderingRule', univ.OctetString().subtype(implicitTag=_context(0))),
+        namedtype.DefaultedNamedType(
+            'reverseOrder', univ.Boolean(False).subtype(implicitTag=_context(1))),
+    )
+
+
+class SortKeyList(univ.SequenceOf):
+    componentType = SortKey()
+
+
+class SortResult(univ.Sequence):
+    componentType = namedtype.NamedTypes(
+        namedtype.NamedType('sortResult', univ.Enumerated()),
+        namedtype.OptionalNamedType(
+            'attributeType', univ.OctetString().subtype(implicitTag=_context(0))),
+    )
+
+
+class ByOffset(univ.Sequence):
+    componentType = namedtype.NamedTypes(
+        namedtype.NamedType('offset', univ.Integer()),
+        namedtype.NamedType('contentCount', univ.Integer()),
+    )
+
+
+class Target(univ.Choice):
+    componentType = namedtype.NamedTypes(
+        namedtype.NamedType('byOffset', ByOffset().subtype(implicitTag=_context(0, constructed=True))),
+        namedtype.NamedType('greaterThanOrEqual', univ.OctetString().subtype(implicitTag=_context(1))),
+    )
+
+
+class VirtualListViewRequest(univ.Sequence):
+    componentType = namedtype.NamedTypes(
+        namedtype.NamedType('beforeCount', univ.Integer()),
+        namedtype.NamedType('afterCount', univ.Integer()),
+        namedtype.NamedType('target', Target()),
+        namedtype.OptionalNamedType('contextID', univ.OctetString()),
+    )
+
+
+class VirtualListViewResponse(univ.Sequence):
+    componentType = namedtype.NamedTypes(
+        namedtype.NamedType('targetPosition', univ.Integer()),
+        namedtype.NamedType('contentCount', univ.Integer()),
+        namedtype.NamedType('virtualListViewResult', univ.Enumerated()),
+        namedtype.OptionalNamedType('contextID', univ.OctetString()),
+    )
+
+
+def parse_order_by(order_by: Sequence[str]) -> Sequence[Tuple[str, bool]]:
+    """ Convert names like ``-uid`` to (attribute, reverse) pairs. """
+    result = []
+    for name in order_by:
+        if name.startswith("-"):
+            result.append((name[1:], True))
+        else:
+            result.append((name, False))
+    return result
+
+
+def sort_control(order_by: Sequence[str], criticality: bool = True):
+    """ Build a sort request control for names like ``uid`` or ``-uid``. """
+    keys = SortKeyList()
+    for i, (name, reverse) in enumerate(parse_order_by(order_by)):
+        key = SortKey()
+        key.setComponentByName('attributeType', name)
+        if reverse:
+            key.setComponentByName('reverseOrder', True)
+        keys.setComponentByPosition(i, key)
+    return build_control(SORT_REQUEST_OID, criticality, keys)
+
+
+def vlv_control(offset: int, count: int, context_id: Optional[bytes] = None, criticality: bool = True):
+    """
+    Build a virtual list view request control for count entries, starting
+    offset entries from the start of the sorted results.
+    """
+    by_offset = Target().getComponentByName('byOffset').clone()
+    # The first entry is at offset 1, a content count of 0 means the
+    # offset is used as is.
+    by_offset.setComponentByName('offset', offset + 1)
+    by_offset.setComponentByName('contentCount', 0)
+
+    target = Target()
+    target.setComponentByName('byOffset', by_offset)
+
+    request = VirtualListViewRequest()
+    request.setComponentByName('beforeCount', 0)
+    request.setComponentByName('afterCount', max(count - 1, 0))
+    request.setComponentByName('target', target)
+    if context_id:
+        request.setComponentByName('contextID', context_id)
+    return build_control(VLV_REQUEST_OID, criticality, request)
+
+
+def _get_control_value(result: Optional[dict], oid: str) -> Optional[bytes]:
+    try:
+        return result['controls'][oid]['value']
+    except (KeyError, TypeError):
+        return None
+
+
+def get_sort_result(result: Optional[dict]) -> Optional[int]:
+    """ Get the result code of the sort response control, if any. """
+    value = _get_control_value(result, SORT_RESPONSE_OID)
+    if not isinstance(value, bytes):
+        return None
+    decoded, _ = decoder.decode(value, asn1Spec=SortResult())
+    return int(decoded['sortResult'])
+
+
+def get_vlv_result(result: Optional[dict]) -> Optional[Tuple[int, int, int]]:
+    """
+    Get the target position, content count and result code of the virtual
+    list view response control, if any.
+    """
+    value = _get_control_value(result, VLV_RESPONSE_OID)
+    if not isinstance(value, bytes):
+        return None
+    decoded, _ = decoder.decode(value, asn1Spec=VirtualListViewResponse())
+    return (
+        int(decoded['targetPosition']),
+        int(decoded['contentCount']),
+        int(decoded['virtualListViewResult']),
+    )
+
+
+def is_refused(error: exceptions.LDAPOperationResult) -> bool:
+    """ Did the server fail because it won't sort or window the results? """
+    return getattr(error, 'result', None) in REFUSED_RESULTS
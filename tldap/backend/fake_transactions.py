@@ -19,7 +19,7 @@
 with a subset of the functions from the real ldap module. """
 import logging
 import sys
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set
 
 import ldap3
 import six
@@ -27,8 +27,9 @@ import six
 import tldap.dn
 import tldap.exceptions
 import tldap.modlist
+from tldap.database.cache import get_cache
 
-from .base import LdapBase
+from .base import Actions, BulkResult, LdapBase, UpdateCallable
 
 
 logger = logging.getLogger(__name__)
@@ -49,7 +50,15 @@ class NoSuchObject(Exception):
     pass
 
 
-UpdateCallable = Callable[[ldap3.Connection], None]
+def _get_current_value(results: List[dict]) -> Dict[str, bytes]:
+    """ Get the attributes of the only entry in search results. """
+    results = [result for result in results if result['type'] == 'searchResEntry']
+    if len(results) < 1:
+        raise NoSuchObject("No results finding current value")
+    if len(results) > 1:
+        raise RuntimeError("Too many results finding current value")
+
+    return results[0]['raw_attributes']
 
 
 # wrapper class
@@ -60,6 +69,8 @@ class LDAPwrapper(LdapBase):
     def __init__(self, settings_dict: dict) -> None:
         super(LDAPwrapper, self).__init__(settings_dict)
         self._transactions: List[List[UpdateCallable]] = []
+        # DNs changed by each transaction
+        self._changed: List[Set[str]] = []
 
     ####################
     # Cache Management #
@@ -74,6 +85,7 @@ class LDAPwrapper(LdapBase):
         if len(self._transactions) == 0:
             raise RuntimeError("reset called outside a transaction.")
         self._transactions[-1] = []
+        self._changed[-1] = set()
 
     def _cache_get_for_dn(self, dn: str) -> Dict[str, bytes]:
         """
@@ -83,19 +95,57 @@ class LDAPwrapper(LdapBase):
         """
 
         # no cached item, retrieve from ldap
-        self._do_with_retry(
-            lambda obj: obj.search(
+        def search_dn(obj):
+            obj.search(
                 dn,
                 '(objectclass=*)',
                 ldap3.BASE,
-                attributes=['*', '+']))
-        results = self._obj.response
-        if len(results) < 1:
-            raise NoSuchObject("No results finding current value")
-        if len(results) > 1:
-            raise RuntimeError("Too many results finding current value")
+                attributes=['*', '+'])
+            return obj.response
+
+        results = self._do_with_retry(search_dn, operation="search")
+        return _get_current_value(results)
 
-        return results[0]['raw_attributes']
+    def _get_bulk_actions(self, obj: ldap3.Connection, results: List[BulkResult]) -> List[Optional[Actions]]:
+        """
+        Get the actions of every bulk operation. The current values of every
+        entry to be modified or deleted are retrieved at once, so rollbacks
+        can be worked out without waiting for each search.
+        """
+        message_ids = {}
+        for result in results:
+            operation = result.operation
+            if operation[0] in ('modify', 'delete') and len(operation) > 1 and operation[1] not in message_ids:
+                dn = operation[1]
+                try:
+                    message_ids[dn] = obj.search(dn, '(objectclass=*)', ldap3.BASE, attributes=['*', '+'])
+                except Exception as e:
+                    message_ids[dn] = e
+
+        current: Dict[str, Any] = {}
+        for dn, message_id in message_ids.items():
+            if isinstance(message_id, Exception):
+                current[dn] = message_id
+                continue
+            try:
+                response, _ = obj.get_response(message_id)
+                current[dn] = _get_current_value(response)
+            except Exception as e:
+                current[dn] = e
+
+        all_actions: List[Optional[Actions]] = []
+        for result in results:
+            operation = result.operation
+            try:
+                value = current.get(operation[1]) if operation[0] in ('modify', 'delete') else None
+                if isinstance(value, Exception):
+                    raise value
+                all_actions.append(self._get_actions(*operation, current=value))
+            except Exception as e:
+                _debug("---> bulk operation failed", operation, e)
+                result.error = e
+                all_actions.append(None)
+        return all_actions
 
     ##########################
     # Transaction Management #
@@ -116,6 +166,7 @@ class LDAPwrapper(LdapBase):
     def enter_transaction_management(self) -> None:
         """ Start a transaction. """
         self._transactions.append([])
+        self._changed.append(set())
 
     def leave_transaction_management(self) -> None:
         """
@@ -129,6 +180,7 @@ class LDAPwrapper(LdapBase):
             raise RuntimeError("leave_transaction_management called with uncommited rollbacks")
         else:
             self._transactions.pop()
+            self._changed.pop()
 
     def commit(self) -> None:
         """
@@ -143,8 +195,10 @@ class LDAPwrapper(LdapBase):
         if len(self._transactions) > 1:
             for on_rollback in reversed(self._transactions[-1]):
                 self._transactions[-2].insert(0, on_rollback)
+            self._changed[-2].update(self._changed[-1])
 
         _debug("commit")
+        self._invalidate_changed()
         self.reset()
 
     def rollback(self) -> None:
@@ -163,7 +217,7 @@ class LDAPwrapper(LdapBase):
             for on_rollback in self._transactions[-1]:
                 # execute it
                 _debug("--> rolling back", on_rollback)
-                self._do_with_retry(on_rollback)
+                self._do_with_retry(on_rollback, operation="rollback", idempotent=False)
         except:  # noqa: E722
             _debug("--> rollback failed")
             exc_class, exc, tb = sys.exc_info()
@@ -172,9 +226,26 @@ class LDAPwrapper(LdapBase):
         finally:
             # reset everything to clean state
             _debug("--> rollback success")
+            self._invalidate_changed()
             self.reset()
 
-    def _process(self, on_commit: UpdateCallable, on_rollback: UpdateCallable) -> Any:
+    def _add_changed(self, *dns: str) -> None:
+        """ Record DNs changed inside a transaction. """
+        if len(self._changed) > 0:
+            self._changed[-1].update(dns)
+
+    def _invalidate_changed(self) -> None:
+        """
+        Forget cached searches that could have found entries changed by the
+        transaction, as other threads may have cached uncommitted values.
+        """
+        cache = get_cache(self)
+        if cache is not None:
+            for dn in self._changed[-1]:
+                cache.invalidate(dn)
+
+    def _process(self, on_commit: UpdateCallable, on_rollback: UpdateCallable,
+                 operation: str = "other") -> Any:
         """
         Process action. oncommit is a callback to execute action, onrollback is
         a callback to execute if the oncommit() has been called and a rollback
@@ -182,14 +253,16 @@ class LDAPwrapper(LdapBase):
         """
 
         _debug("---> commiting", on_commit)
-        result = self._do_with_retry(on_commit)
+        result = self._do_with_retry(on_commit, operation=operation, idempotent=False)
+        self._add_rollback(on_rollback)
+        return result
 
+    def _add_rollback(self, on_rollback: UpdateCallable) -> None:
+        """ Record how to undo a completed change, if inside a transaction. """
         if len(self._transactions) > 0:
             # add statement to rollback log in case something goes wrong
             self._transactions[-1].insert(0, on_rollback)
 
-        return result
-
     ##################################
     # Functions needing Transactions #
     ##################################
@@ -202,15 +275,20 @@ class LDAPwrapper(LdapBase):
 
         _debug("add", self, dn, mod_list)
 
+        # process this action
+        return self._process(*self._add_actions(dn, mod_list), operation="add")
+
+    def _add_actions(self, dn: str, mod_list: dict) -> Actions:
+        self._add_changed(dn)
+
         # if rollback of add required, delete it
         def on_commit(obj):
-            obj.add(dn, None, mod_list)
+            return obj.add(dn, None, mod_list)
 
         def on_rollback(obj):
             obj.delete(dn)
 
-        # process this action
-        return self._process(on_commit, on_rollback)
+        return on_commit, on_rollback
 
     def modify(self, dn: str, mod_list: dict) -> None:
         """
@@ -219,12 +297,16 @@ class LDAPwrapper(LdapBase):
         """
 
         _debug("modify", self, dn, mod_list)
+        return self._process(*self._modify_actions(dn, mod_list), operation="modify")
+
+    def _modify_actions(self, dn: str, mod_list: dict, current: Optional[dict] = None) -> Actions:
+        self._add_changed(dn)
 
         # need to work out how to reverse changes in mod_list; result in revlist
         revlist = {}
 
         # get the current cached attributes
-        result = self._cache_get_for_dn(dn)
+        result = current if current is not None else self._cache_get_for_dn(dn)
 
         # find the how to reverse mod_list (for rollback) and put result in
         # revlist. Also simulate actions on cache.
@@ -286,12 +368,12 @@ class LDAPwrapper(LdapBase):
 
         # now the hard stuff is over, we get to the easy stuff
         def on_commit(obj):
-            obj.modify(dn, mod_list)
+            return obj.modify(dn, mod_list)
 
         def on_rollback(obj):
             obj.modify(dn, revlist)
 
-        return self._process(on_commit, on_rollback)
+        return on_commit, on_rollback
 
     def modify_no_rollback(self, dn: str, mod_list: dict):
         """
@@ -300,7 +382,8 @@ class LDAPwrapper(LdapBase):
         """
 
         _debug("modify_no_rollback", self, dn, mod_list)
-        result = self._do_with_retry(lambda obj: obj.modify_s(dn, mod_list))
+        result = self._do_with_retry(
+            lambda obj: obj.modify_s(dn, mod_list), operation="modify", idempotent=False)
         _debug("--")
 
         return result
@@ -312,9 +395,13 @@ class LDAPwrapper(LdapBase):
         """
 
         _debug("delete", self)
+        return self._process(*self._delete_actions(dn), operation="delete")
+
+    def _delete_actions(self, dn: str, current: Optional[dict] = None) -> Actions:
+        self._add_changed(dn)
 
         # get copy of cache
-        result = self._cache_get_for_dn(dn)
+        result = dict(current) if current is not None else self._cache_get_for_dn(dn)
 
         # remove special values that can't be added
         def delete_attribute(name):
@@ -339,12 +426,12 @@ class LDAPwrapper(LdapBase):
 
         # on commit carry out action; on rollback restore cached state
         def on_commit(obj):
-            obj.delete(dn)
+            return obj.delete(dn)
 
         def on_rollback(obj):
             obj.add(dn, None, mod_list)
 
-        return self._process(on_commit, on_rollback)
+        return on_commit, on_rollback
 
     def rename(self, dn: str, new_rdn: str, new_base_dn: Optional[str] = None) -> None:
         """
@@ -353,7 +440,9 @@ class LDAPwrapper(LdapBase):
         """
 
         _debug("rename", self, dn, new_rdn, new_base_dn)
+        return self._process(*self._rename_actions(dn, new_rdn, new_base_dn), operation="rename")
 
+    def _rename_actions(self, dn: str, new_rdn: str, new_base_dn: Optional[str] = None) -> Actions:
         # split up the parameters
         split_dn = tldap.dn.str2dn(dn)
         split_newrdn = tldap.dn.str2dn(new_rdn)
@@ -371,18 +460,19 @@ class LDAPwrapper(LdapBase):
             tmplist.extend(split_dn[1:])
             old_base_dn = None
         newdn = tldap.dn.dn2str(tmplist)
+        self._add_changed(dn, newdn)
 
         _debug("--> commit  ", self, dn, new_rdn, new_base_dn)
         _debug("--> rollback", self, newdn, rdn, old_base_dn)
 
         # on commit carry out action; on rollback reverse rename
         def on_commit(obj):
-            obj.modify_dn(dn, new_rdn, new_superior=new_base_dn)
+            return obj.modify_dn(dn, new_rdn, new_superior=new_base_dn)
 
         def on_rollback(obj):
             obj.modify_dn(newdn, rdn, new_superior=old_base_dn)
 
-        return self._process(on_commit, on_rollback)
+        return on_commit, on_rollback
 
     def fail(self) -> None:
         """ for testing purposes only. always fail in commit """
@@ -0,0 +1,237 @@
+# Copyright 2026 Brian May
+#
+# This file is part of python-tldap.
+#
+# python-tldap is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# python-tldap is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with python-tldap  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Per operation metrics for the LDAP backends.
+
+Every operation is measured with an :py:class:`Operation`, which is passed to
+each registered hook when it completes. By default the only hook is
+:py:data:`registry`, which keeps in process histograms that can be read with
+:py:meth:`Registry.snapshot` or :py:meth:`Registry.prometheus`.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+""" Upper bounds in seconds of the duration histogram buckets. """
+
+RESULT_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+""" Upper bounds of the search result count histogram buckets. """
+
+
+class Operation(object):
+    """
+    Measurements of one LDAP operation. ``duration`` only counts time spent
+    waiting for LDAP, not time spent by the caller processing results.
+    ``results`` is only set for searches.
+    """
+
+    def __init__(self, operation: str, alias: Optional[str]) -> None:
+        self.operation = operation
+        self.alias = alias
+        self.duration = 0.0
+        self.results: Optional[int] = None
+        self.retries = 0
+        self.reconnects = 0
+        self.error: Optional[str] = None
+
+    @contextmanager
+    def timer(self) -> Iterator[None]:
+        """ Add the time spent in this block to the duration. """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.duration += time.perf_counter() - start
+
+    def __repr__(self) -> str:
+        return "<Operation %s %s %.6fs>" % (self.operation, self.alias, self.duration)
+
+
+class Histogram(object):
+    """ Counts of observed values less than or equal to each bucket. """
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bucket in enumerate(self.buckets):
+            if value <= bucket:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """ Get the cumulative count for each bucket, ending with ``+Inf``. """
+        result = []
+        total = 0
+        for bucket, count in zip(self.buckets, self.counts):
+            total += count
+            result.append((_format_value(bucket), total))
+        result.append(("+Inf", self.count))
+        return result
+
+    def snapshot(self) -> dict:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'buckets': dict(self.cumulative()),
+        }
+
+
+class _Stats(object):
+    """ Metrics for one operation type on one connection alias. """
+
+    def __init__(self) -> None:
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.results = Histogram(RESULT_BUCKETS)
+        self.retries = 0
+        self.reconnects = 0
+        self.errors = 0
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Registry(object):
+    """ Thread safe in process histograms of every recorded operation. """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, str], _Stats] = {}
+
+    def __call__(self, operation: Operation) -> None:
+        self.record(operation)
+
+    def record(self, operation: Operation) -> None:
+        key = (str(operation.alias), operation.operation)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _Stats()
+            stats.duration.observe(operation.duration)
+            if operation.results is not None:
+                stats.results.observe(operation.results)
+            stats.retries += operation.retries
+            stats.reconnects += operation.reconnects
+            if operation.error is not None:
+                stats.errors += 1
+
+    def reset(self) -> None:
+        """ Forget all recorded operations. """
+        with self._lock:
+            self._stats = {}
+
+    def snapshot(self) -> Dict[str, Dict[str, dict]]:
+        """ Get the metrics as a dictionary of alias and operation type. """
+        result: Dict[str, Dict[str, dict]] = {}
+        with self._lock:
+            for (alias, operation), stats in sorted(self._stats.items()):
+                result.setdefault(alias, {})[operation] = {
+                    'duration': stats.duration.snapshot(),
+                    'results': stats.results.snapshot(),
+                    'retries': stats.retries,
+                    'reconnects': stats.reconnects,
+                    'errors': stats.errors,
+                }
+        return result
+
+    def prometheus(self) -> str:
+        """ Get the metrics in the Prometheus text exposition format. """
+        with self._lock:
+            items = sorted(self._stats.items())
+            lines = []
+
+            def histogram(name: str, help_text: str, get: Callable[[_Stats], Histogram]) -> None:
+                lines.append("# HELP %s %s" % (name, help_text))
+                lines.append("# TYPE %s histogram" % name)
+                for (alias, operation), stats in items:
+                    h = get(stats)
+                    if h.count == 0:
+                        continue
+                    labels = 'alias="%s",operation="%s"' % (alias, operation)
+                    for bucket, count in h.cumulative():
+                        lines.append('%s_bucket{%s,le="%s"} %d' % (name, labels, bucket, count))
+                    lines.append("%s_sum{%s} %s" % (name, labels, repr(float(h.sum))))
+                    lines.append("%s_count{%s} %d" % (name, labels, h.count))
+
+            def counter(name: str, help_text: str, get: Callable[[_Stats], int]) -> None:
+                lines.append("# HELP %s %s" % (name, help_text))
+                lines.append("# TYPE %s counter" % name)
+                for (alias, operation), stats in items:
+                    labels = 'alias="%s",operation="%s"' % (alias, operation)
+                    lines.append("%s{%s} %d" % (name, labels, get(stats)))
+
+            histogram(
+                "tldap_operation_duration_seconds", "Time spent waiting for LDAP operations.",
+                lambda stats: stats.duration)
+            histogram(
+                "tldap_search_results", "Number of entries returned by each search.",
+                lambda stats: stats.results)
+            counter(
+                "tldap_operation_retries_total", "Number of times operations were retried.",
+                lambda stats: stats.retries)
+            counter(
+                "tldap_operation_reconnects_total", "Number of new connections made to retry operations.",
+                lambda stats: stats.reconnects)
+            counter(
+                "tldap_operation_errors_total", "Number of operations that failed.",
+                lambda stats: stats.errors)
+
+        return "\n".join(lines) + "\n"
+
+
+Hook = Callable[[Operation], None]
+
+registry = Registry()
+""" The default in process metrics. """
+
+_hooks: List[Hook] = [registry]
+
+
+def add_hook(hook: Hook) -> None:
+    """ Call hook with every completed :py:class:`Operation`. """
+    _hooks.append(hook)
+
+
+def remove_hook(hook: Hook) -> None:
+    """ Stop calling a hook, including the default :py:data:`registry`. """
+    _hooks.remove(hook)
+
+
+def record(operation: Operation) -> None:
+    """ Pass a completed operation to every hook. Errors in hooks are logged. """
+    for hook in list(_hooks):
+        try:
+            hook(operation)
+        except Exception:
+            logger.exception("Error in metrics hook %r", hook)
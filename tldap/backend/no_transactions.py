@@ -27,6 +27,11 @@ from .base import LdapBase
 class LDAPwrapper(LdapBase):
     """ The LDAP connection class. """
 
+    def __init__(self, settings_dict: dict) -> None:
+        super(LDAPwrapper, self).__init__(settings_dict)
+        # Only used so reads inside a transaction go to the primary.
+        self._transaction_depth = 0
+
     ####################
     # Cache Management #
     ####################
@@ -54,7 +59,7 @@ class LDAPwrapper(LdapBase):
 
     def enter_transaction_management(self) -> None:
         """ Start a transaction. """
-        pass
+        self._transaction_depth += 1
 
     def leave_transaction_management(self) -> None:
         """
@@ -62,7 +67,12 @@ class LDAPwrapper(LdapBase):
         rollback() must be called if changes made. If dirty, changes will be
         discarded.
         """
-        pass
+        if self._transaction_depth > 0:
+            self._transaction_depth -= 1
+
+    def _read_from_primary(self) -> bool:
+        """ Must reads go to the primary, to see our own writes? """
+        return self._transaction_depth > 0
 
     def commit(self) -> None:
         """
@@ -88,7 +98,7 @@ class LDAPwrapper(LdapBase):
         if transactions enabled.
         """
 
-        return self._do_with_retry(lambda obj: obj.add_s(dn, mod_list))
+        return self._do_with_retry(lambda obj: obj.add_s(dn, mod_list), operation="add", idempotent=False)
 
     def modify(self, dn: str, mod_list: dict) -> None:
         """
@@ -96,7 +106,7 @@ class LDAPwrapper(LdapBase):
         result if transactions enabled.
         """
 
-        return self._do_with_retry(lambda obj: obj.modify_s(dn, mod_list))
+        return self._do_with_retry(lambda obj: obj.modify_s(dn, mod_list), operation="modify", idempotent=False)
 
     def modify_no_rollback(self, dn: str, mod_list: dict) -> None:
         """
@@ -104,7 +114,7 @@ class LDAPwrapper(LdapBase):
         result if transactions enabled.
         """
 
-        return self._do_with_retry(lambda obj: obj.modify_s(dn, mod_list))
+        return self._do_with_retry(lambda obj: obj.modify_s(dn, mod_list), operation="modify", idempotent=False)
 
     def delete(self, dn: str) -> None:
         """
@@ -112,7 +122,7 @@ class LDAPwrapper(LdapBase):
         result if transactions enabled.
         """
 
-        return self._do_with_retry(lambda obj: obj.delete_s(dn))
+        return self._do_with_retry(lambda obj: obj.delete_s(dn), operation="delete", idempotent=False)
 
     def rename(self, dn: str, new_rdn: str, new_base_dn: Optional[str] = None) -> None:
         """
@@ -121,4 +131,4 @@ class LDAPwrapper(LdapBase):
         """
 
         return self._do_with_retry(
-            lambda obj: obj.rename_s(dn, new_rdn, new_base_dn))
+            lambda obj: obj.rename_s(dn, new_rdn, new_base_dn), operation="rename", idempotent=False)
@@ -0,0 +1,249 @@
+# Copyright 2026 Brian May
+#
+# This file is part of python-tldap.
+#
+# python-tldap is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# python-tldap is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with python-tldap  If not, see <http://www.gnu.org/licenses/>.
+
+""" A thread safe pool of bound LDAP connections. """
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import ldap3
+
+import tldap.exceptions
+
+
+logger = logging.getLogger(__name__)
+
+
+def _debug(*argv) -> None:
+    argv = [str(arg) for arg in argv]
+    logger.debug(" ".join(argv))
+
+
+ConnectionFactory = Callable[[], ldap3.Connection]
+HealthCheck = Callable[[ldap3.Connection], bool]
+
+
+def is_healthy(conn: ldap3.Connection) -> bool:
+    """
+    Is this idle connection still open and bound? Only the local state of
+    the connection is checked, the server is not contacted, so a connection
+    the server has dropped is only noticed when it is next used.
+    """
+    return not conn.closed and bool(conn.bound)
+
+
+def _close(conn: ldap3.Connection) -> None:
+    """ Unbind a connection, ignoring any errors. """
+    try:
+        conn.unbind()
+    except Exception as e:
+        _debug("ignoring error closing connection:", e)
+
+
+class ConnectionPool(object):
+    """
+    A pool of bound LDAP connections that can be shared between threads.
+
+    New connections are created with ``factory`` when there is no idle
+    connection available, up to ``max_size`` connections in total. When the
+    pool is exhausted, ``checkout`` will wait up to ``timeout`` seconds (or
+    forever if ``None``) for another thread to return a connection.
+
+    ``min_size`` connections are opened when the pool is created, so the
+    first requests don't have to wait for them. Idle connections are checked
+    with ``check`` before being handed out, and are closed once they have been
+    idle for ``idle_timeout`` seconds, unless that would leave less than
+    ``min_size`` connections open.
+    """
+
+    def __init__(self, factory: ConnectionFactory, min_size: int = 0, max_size: int = 10,
+                 idle_timeout: Optional[float] = None, timeout: Optional[float] = None,
+                 check: HealthCheck = is_healthy) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        if min_size < 0 or min_size > max_size:
+            raise ValueError("min_size must be between 0 and max_size")
+
+        self._factory = factory
+        self._min_size = min_size
+        self._max_size = max_size
+        self._idle_timeout = idle_timeout
+        self._timeout = timeout
+        self._check = check
+
+        self._condition = threading.Condition()
+        # Idle connections and the time they were returned, most recent last.
+        self._idle: List[Tuple[ldap3.Connection, float]] = []
+        self._in_use = 0
+        self._waits = 0
+        self._wait_time = 0.0
+
+        self.fill()
+
+    @property
+    def max_size(self) -> int:
+        return self._max_size
+
+    def fill(self) -> None:
+        """
+        Open connections until there are at least ``min_size``. If a
+        connection can't be opened, stop; it will be opened when needed.
+        """
+        while True:
+            with self._condition:
+                if self._in_use + len(self._idle) >= self._min_size:
+                    return
+                # reserve the slot while connecting
+                self._in_use += 1
+
+            try:
+                conn = self._factory()
+            except Exception as e:
+                _debug("could not fill pool:", e)
+                with self._condition:
+                    self._in_use -= 1
+                    self._condition.notify()
+                return
+
+            self.checkin(conn)
+
+    def _expire_idle(self) -> List[ldap3.Connection]:
+        """ Remove expired idle connections. Must be called with the lock held. """
+        expired = []
+        if self._idle_timeout is not None:
+            cutoff = time.monotonic() - self._idle_timeout
+            while (self._idle and self._idle[0][1] < cutoff
+                   and self._in_use + len(self._idle) > self._min_size):
+                conn, _ = self._idle.pop(0)
+                expired.append(conn)
+        return expired
+
+    def checkout(self, fresh: bool = False, factory: Optional[ConnectionFactory] = None) -> ldap3.Connection:
+        """
+        Get a connection from the pool, creating one if required. If fresh is
+        set, a new connection will always be created. If factory is given, it
+        is used instead of the pool's factory to create new connections. The
+        connection must be given back with :py:meth:`checkin` or
+        :py:meth:`discard`.
+        """
+        stale: List[ldap3.Connection] = []
+        conn = None
+        started = None
+
+        with self._condition:
+            while True:
+                stale.extend(self._expire_idle())
+
+                if self._idle and not fresh:
+                    conn, _ = self._idle.pop()
+                    break
+
+                if self._in_use + len(self._idle) < self._max_size:
+                    break
+
+                if self._idle:
+                    # Make room for a fresh connection.
+                    stale.append(self._idle.pop(0)[0])
+                    break
+
+                if started is None:
+                    started = time.monotonic()
+                    self._waits += 1
+
+                if self._timeout is None:
+                    remaining = None
+                else:
+                    remaining = self._timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        self._wait_time += time.monotonic() - started
+                        raise tldap.exceptions.PoolTimeout(
+                            "Timed out waiting for a LDAP connection.")
+
+                _debug("pool exhausted, waiting")
+                self._condition.wait(remaining)
+
+            if started is not None:
+                self._wait_time += time.monotonic() - started
+            self._in_use += 1
+
+        for old_conn in stale:
+            _close(old_conn)
+
+        if conn is not None:
+            if self._check(conn):
+                return conn
+            _debug("discarding unhealthy connection")
+            _close(conn)
+
+        if factory is None:
+            factory = self._factory
+
+        try:
+            return factory()
+        except:  # noqa: E722
+            with self._condition:
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+
+    def checkin(self, conn: ldap3.Connection) -> None:
+        """ Return a connection to the pool for reuse. """
+        with self._condition:
+            self._in_use -= 1
+            self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+
+    def discard(self, conn: ldap3.Connection) -> None:
+        """ Close a connection that was checked out and free its slot. """
+        with self._condition:
+            self._in_use -= 1
+            self._condition.notify()
+        _close(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[ldap3.Connection]:
+        """ Context manager that checks out a connection and returns it after. """
+        conn = self.checkout()
+        try:
+            yield conn
+        finally:
+            self.checkin(conn)
+
+    def close(self) -> None:
+        """
+        Close all idle connections. Connections that are in use are not
+        affected, and new connections will be created as required.
+        """
+        with self._condition:
+            idle = [conn for conn, _ in self._idle]
+            self._idle = []
+        for conn in idle:
+            _close(conn)
+
+    def stats(self) -> Dict[str, float]:
+        """ Get usage statistics for this pool. """
+        with self._condition:
+            return {
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'max_size': self._max_size,
+                'waits': self._waits,
+                'wait_time': self._wait_time,
+            }
@@ -0,0 +1,199 @@
+# Copyright 2026 Brian May
+#
+# This file is part of python-tldap.
+#
+# python-tldap is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# python-tldap is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with python-tldap  If not, see <http://www.gnu.org/licenses/>.
+
+""" When and how often to retry failed LDAP operations. """
+
+import importlib
+import logging
+import random
+import threading
+import time
+from typing import Optional, Sequence, Tuple, Type, Union
+
+import ldap3.core.exceptions as exceptions
+
+import tldap.exceptions
+
+
+logger = logging.getLogger(__name__)
+
+
+def _debug(*argv) -> None:
+    argv = [str(arg) for arg in argv]
+    logger.debug(" ".join(argv))
+
+
+DEFAULT_RETRYABLE: Tuple[Type[Exception], ...] = (
+    exceptions.LDAPCommunicationError,
+    exceptions.LDAPBusyResult,
+    exceptions.LDAPUnavailableResult,
+)
+""" Exceptions that are retried if not given by the RETRY_EXCEPTIONS setting. """
+
+NOT_APPLIED: Tuple[Type[Exception], ...] = (
+    exceptions.LDAPSocketOpenError,
+    exceptions.LDAPSocketSendError,
+    exceptions.LDAPBusyResult,
+    exceptions.LDAPUnavailableResult,
+)
+""" Exceptions that mean the request was never sent or was refused by the server. """
+
+
+def _load_exception(value: Union[str, Type[Exception]]) -> Type[Exception]:
+    """ Get an exception class, which may be given as a dotted path. """
+    if isinstance(value, str):
+        module_name, class_name = value.rsplit(".", 1)
+        return getattr(importlib.import_module(module_name), class_name)
+    return value
+
+
+class RetryPolicy(object):
+    """
+    Decides if a failed operation should be tried again, and how long to wait
+    first. An operation is tried at most ``max_attempts`` times. The wait
+    before the first retry is up to ``backoff`` seconds, and is multiplied by
+    ``multiplier`` for each retry after that, up to ``max_backoff``. If
+    ``jitter`` is set, a random wait between zero and that value is used, so
+    threads don't all retry at once. No retry is attempted if it would finish
+    waiting more than ``max_elapsed`` seconds after the first attempt.
+
+    Writes are not idempotent, so are only retried if the request was never
+    sent, such as when connecting or binding fails, or if the server replied
+    it was busy or unavailable. A write whose response was lost may have been
+    applied, so is not sent again.
+    """
+
+    def __init__(self, retryable: Sequence[Type[Exception]] = DEFAULT_RETRYABLE,
+                 max_attempts: int = 2, backoff: float = 0.1, multiplier: float = 2.0,
+                 max_backoff: float = 5.0, jitter: bool = True,
+                 max_elapsed: Optional[float] = None) -> None:
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.retryable = tuple(retryable)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.multiplier = multiplier
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.max_elapsed = max_elapsed
+
+    @classmethod
+    def from_settings(cls, settings: dict) -> 'RetryPolicy':
+        retryable = settings.get('RETRY_EXCEPTIONS', DEFAULT_RETRYABLE)
+        return cls(
+            retryable=[_load_exception(value) for value in retryable],
+            max_attempts=settings.get('RETRY_MAX_ATTEMPTS', 2),
+            backoff=settings.get('RETRY_BACKOFF', 0.1),
+            multiplier=settings.get('RETRY_MULTIPLIER', 2.0),
+            max_backoff=settings.get('RETRY_MAX_BACKOFF', 5.0),
+            jitter=settings.get('RETRY_JITTER', True),
+            max_elapsed=settings.get('RETRY_MAX_ELAPSED', None),
+        )
+
+    def is_retryable(self, error: Exception, idempotent: bool = True, sent: bool = True) -> bool:
+        """
+        Should the operation be tried again after error? If not idempotent,
+        it is only retried if it is known not to have been applied; sent is
+        False if it failed before the request could be sent.
+        """
+        if not isinstance(error, self.retryable):
+            return False
+        if idempotent or not sent:
+            return True
+        return isinstance(error, NOT_APPLIED)
+
+    def get_delay(self, attempt: int, elapsed: float) -> Optional[float]:
+        """
+        Get the seconds to wait before trying again after attempt number
+        ``attempt`` failed, or None if we should give up.
+        """
+        if attempt >= self.max_attempts:
+            return None
+
+        delay = min(self.max_backoff, self.backoff * self.multiplier ** (attempt - 1))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+
+        if self.max_elapsed is not None and elapsed + delay > self.max_elapsed:
+            return None
+        return delay
+
+
+class CircuitBreaker(object):
+    """
+    Fails fast while the server is down. After ``threshold`` failures in a row
+    the circuit opens, and :py:meth:`check` raises
+    :py:class:`tldap.exceptions.CircuitOpen` for ``reset_timeout`` seconds.
+    After that a single trial operation is let through, while other callers
+    keep failing fast. The circuit closes if the trial succeeds, and opens
+    again if it fails. If the trial reports neither within ``reset_timeout``
+    seconds, another trial is let through. A threshold of None disables the
+    circuit breaker.
+    """
+
+    def __init__(self, threshold: Optional[int] = 5, reset_timeout: float = 30.0) -> None:
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened: Optional[float] = None
+        # when the trial operation was let through, if one is in progress
+        self._trial: Optional[float] = None
+
+    @classmethod
+    def from_settings(cls, settings: dict) -> 'CircuitBreaker':
+        return cls(
+            threshold=settings.get('CIRCUIT_BREAKER_THRESHOLD', 5),
+            reset_timeout=settings.get('CIRCUIT_BREAKER_RESET_TIMEOUT', 30.0),
+        )
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened is not None
+
+    def check(self) -> None:
+        """ Raise an exception if the circuit is open. """
+        with self._lock:
+            if self._opened is None:
+                return
+            now = time.monotonic()
+            if self._trial is not None:
+                if now - self._trial < self.reset_timeout:
+                    raise tldap.exceptions.CircuitOpen("LDAP server is down, trying again.")
+            elif now - self._opened < self.reset_timeout:
+                raise tldap.exceptions.CircuitOpen("LDAP server is down, not trying.")
+            # half open, let only this operation through to test the server
+            self._trial = now
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened = None
+            self._trial = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial is not None:
+                # the trial failed
+                _debug("circuit breaker open again")
+                self._opened = time.monotonic()
+                self._trial = None
+            elif self.threshold is not None and self._failures >= self.threshold and self._opened is None:
+                _debug("circuit breaker open")
+                self._opened = time.monotonic()
@@ -0,0 +1,98 @@
+# Copyright 2026 Brian May
+#
+# This file is part of python-tldap.
+#
+# python-tldap is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# python-tldap is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with python-tldap  If not, see <http://www.gnu.org/licenses/>.
+
+""" Track which of a list of LDAP servers are up. """
+
+import logging
+import threading
+import time
+from typing import Dict, List, Union
+
+
+logger = logging.getLogger(__name__)
+
+
+def _debug(*argv) -> None:
+    argv = [str(arg) for arg in argv]
+    logger.debug(" ".join(argv))
+
+
+DEFAULT_DOWN_TIME = 30
+""" Seconds to skip a failed server if not given by the SERVER_DOWN_TIME setting. """
+
+
+def get_uri_list(value: Union[None, str, List[str]]) -> List[str]:
+    """ Convert a URI setting, which may be a single URI, to a list. """
+    if value is None:
+        return []
+    elif isinstance(value, str):
+        return [value]
+    else:
+        return list(value)
+
+
+class ServerList(object):
+    """
+    An ordered list of server URIs. A server that fails is marked down, and is
+    skipped for ``down_time`` seconds.
+    """
+
+    def __init__(self, uris: List[str], down_time: float = DEFAULT_DOWN_TIME) -> None:
+        self._uris = list(uris)
+        self._down_time = down_time
+        self._down_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._uris)
+
+    @property
+    def uris(self) -> List[str]:
+        """ All servers, including those that are down. """
+        return list(self._uris)
+
+    def is_down(self, uri: str) -> bool:
+        """ Is this server within its cool-off period? """
+        with self._lock:
+            down_until = self._down_until.get(uri)
+            if down_until is None:
+                return False
+            if down_until <= time.monotonic():
+                del self._down_until[uri]
+                return False
+            return True
+
+    def available(self) -> List[str]:
+        """
+        Get the servers that are not down, in order. If every server is down,
+        all of them are returned, so they can be tried again.
+        """
+        uris = [uri for uri in self._uris if not self.is_down(uri)]
+        if len(uris) == 0:
+            uris = list(self._uris)
+        return uris
+
+    def mark_down(self, uri: str) -> None:
+        """ Skip this server until the cool-off period has passed. """
+        _debug("server down", uri)
+        with self._lock:
+            self._down_until[uri] = time.monotonic() + self._down_time
+
+    def mark_up(self, uri: str) -> None:
+        """ This server is working again. """
+        with self._lock:
+            self._down_until.pop(uri, None)
@@ -0,0 +1,100 @@
+# Copyright 2026 Brian May
+#
+# This file is part of python-tldap.
+#
+# python-tldap is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# python-tldap is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with python-tldap  If not, see <http://www.gnu.org/licenses/>.
+
+""" TLS support shared between connections. """
+
+import ssl
+import threading
+from typing import Optional
+
+import ldap3
+from ldap3.core.tls import check_hostname
+
+
+class Tls(ldap3.Tls):
+    """
+    A :py:class:`ldap3.Tls` that creates its SSL context only once, and
+    resumes the last saved TLS session for new connections where supported.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super(Tls, self).__init__(*args, **kwargs)
+        self._ssl_context: Optional[ssl.SSLContext] = None
+        self._session = None
+        self._lock = threading.Lock()
+
+    def _create_ssl_context(self) -> ssl.SSLContext:
+        """ Create the SSL context the same way as ldap3. """
+        if self.version is None:
+            ssl_context = ssl.create_default_context(
+                purpose=ssl.Purpose.SERVER_AUTH,
+                cafile=self.ca_certs_file,
+                capath=self.ca_certs_path,
+                cadata=self.ca_certs_data)
+        else:
+            ssl_context = ssl.SSLContext(self.version)
+            if self.ca_certs_file or self.ca_certs_path or self.ca_certs_data:
+                ssl_context.load_verify_locations(self.ca_certs_file, self.ca_certs_path, self.ca_certs_data)
+            elif self.validate != ssl.CERT_NONE:
+                ssl_context.load_default_certs(ssl.Purpose.SERVER_AUTH)
+
+        if self.certificate_file:
+            ssl_context.load_cert_chain(
+                self.certificate_file, keyfile=self.private_key_file, password=self.private_key_password)
+        ssl_context.check_hostname = False
+        ssl_context.verify_mode = self.validate
+        for option in self.ssl_options:
+            ssl_context.options |= option
+
+        if self.ciphers:
+            try:
+                ssl_context.set_ciphers(self.ciphers)
+            except ssl.SSLError:
+                pass
+
+        return ssl_context
+
+    def get_ssl_context(self) -> ssl.SSLContext:
+        """ Get the SSL context, creating it on first use. """
+        with self._lock:
+            if self._ssl_context is None:
+                self._ssl_context = self._create_ssl_context()
+            return self._ssl_context
+
+    def save_session(self, sock) -> None:
+        """ Save the TLS session of an established connection for reuse. """
+        session = getattr(sock, 'session', None)
+        if hasattr(ssl, 'SSLSession') and isinstance(session, ssl.SSLSession):
+            self._session = session
+
+    def wrap_socket(self, connection, do_handshake=False):
+        """
+        Adds TLS to the connection socket
+        """
+        kwargs = {}
+        if self.sni:
+            kwargs['server_hostname'] = self.sni
+        if self._session is not None:
+            kwargs['session'] = self._session
+
+        wrapped_socket = self.get_ssl_context().wrap_socket(
+            connection.socket, server_side=False, do_handshake_on_connect=do_handshake, **kwargs)
+
+        if do_handshake and (self.validate == ssl.CERT_REQUIRED or self.validate == ssl.CERT_OPTIONAL):
+            check_hostname(wrapped_socket, connection.server.host, self.valid_names)
+
+        connection.socket = wrapped_socket
@@ -16,26 +16,38 @@
 # along with python-tldap  If not, see <http://www.gnu.org/licenses/>.
 
 """ High level database interaction. """
+import itertools
+import threading
+from collections import defaultdict
 from typing import (
     Any,
     Dict,
+    Hashable,
+    ItemsView,
+    Iterable,
     Iterator,
     List,
     Optional,
+    Sequence,
     Set,
     Tuple,
     Type,
     TypeVar,
 )
 
+import ldap3
 import ldap3.core
 import ldap3.core.exceptions
 
+import tldap.backend.aio
+import tldap.backend.controls
 import tldap.fields
 import tldap.query
 from tldap import Q
-from tldap.backend.base import LdapBase
-from tldap.dict import ImmutableDict
+from tldap.backend.base import DEFAULT_PAGE_SIZE, LdapBase
+from tldap.database.cache import ResultCache, get_cache
+from tldap.database.identity import IdentityMap, get_lookup
+from tldap.dict import ImmutableDict, PersistentDict
 from tldap.dn import dn2str, str2dn
 from tldap.exceptions import (
     MultipleObjectsReturned,
@@ -49,19 +61,33 @@ NotLoadedListType = List[Any] or 'NotLoadedList'
 
 
 class SearchOptions:
-    """ Application specific search options. """
-    def __init__(self, base_dn: str, object_class: Set[str], pk_field: str) -> None:
+    """
+    Application specific search options. Search results are cached for
+    ``cache_ttl`` seconds if the cache is enabled, or the ``CACHE_TTL``
+    setting if None. A ``cache_ttl`` of 0 disables caching for the table.
+    Set ``pk_in_rdn`` if every entry is named by ``pk_field`` directly below
+    ``base_dn``, so searches for a primary key only read that entry.
+    """
+    def __init__(self, base_dn: str, object_class: Set[str], pk_field: str,
+                 cache_ttl: Optional[float] = None, pk_in_rdn: bool = False) -> None:
         self.base_dn = base_dn
         self.object_class = object_class
         self.pk_field = pk_field
+        self.cache_ttl = cache_ttl
+        self.pk_in_rdn = pk_in_rdn
 
 
 class Database:
-    def __init__(self, connection: LdapBase, settings: Optional[dict] = None):
+    def __init__(self, connection: LdapBase, settings: Optional[dict] = None,
+                 cache: Optional[ResultCache] = None, identity_map: Optional[IdentityMap] = None):
         self._connection = connection
         if settings is None:
             settings = connection.settings_dict
         self._settings = settings
+        if cache is None:
+            cache = get_cache(connection)
+        self._cache = cache
+        self._identity_map = identity_map
 
     @property
     def connection(self) -> LdapBase:
@@ -71,9 +97,33 @@ class Database:
     def settings(self) -> dict:
         return self._settings
 
+    @property
+    def cache(self) -> Optional[ResultCache]:
+        """ The cache of search results, or None if disabled. """
+        return self._cache
+
+    @property
+    def identity_map(self) -> Optional[IdentityMap]:
+        """ The map of loaded objects, or None if disabled. """
+        return self._identity_map
+
+    def with_identity_map(self) -> 'Database':
+        """ Get a database sharing this connection, with a new identity map. """
+        return Database(self._connection, self._settings, self._cache, IdentityMap())
+
+    def invalidate(self, dn: str) -> None:
+        """ Forget cached searches that could have found the entry dn. """
+        if self._cache is not None:
+            self._cache.invalidate(dn)
+
 
 def get_default_database():
-    return Database(tldap.backend.connections['default'])
+    # inside an asyncio task, including the blocking code it runs, use its
+    # connection, so hooks are part of its transaction
+    connection = tldap.backend.aio.get_context_connection()
+    if connection is None:
+        connection = tldap.backend.connections['default']
+    return Database(connection)
 
 
 def get_database(database: Optional[Database]) -> Database:
@@ -84,7 +134,7 @@ def get_database(database: Optional[Database]) -> Database:
 
 
 def _python_to_list(value: Any) -> NotLoadedListType:
-    if isinstance(value, NotLoadedList):
+    if isinstance(value, (NotLoadedList, NotLoadedField, _LazyValue)):
         return value
     elif isinstance(value, list):
         return value
@@ -98,10 +148,10 @@ def _python_to_list(value: Any) -> NotLoadedListType:
 
 def _list_to_python(field: tldap.fields.Field, value: NotLoadedListType) -> Any:
     assert not field.is_list
-    assert isinstance(value, (list, NotLoadedList))
+    assert isinstance(value, (list, NotLoadedList, NotLoadedField))
 
     if not field.is_list:
-        if isinstance(value, NotLoadedList):
+        if isinstance(value, (NotLoadedList, NotLoadedField)):
             new_value = value
         elif len(value) == 0:
             new_value = None
@@ -114,16 +164,143 @@ def _list_to_python(field: tldap.fields.Field, value: NotLoadedListType) -> Any:
     return new_value
 
 
+_NOT_DECODED = object()
+
+
+class _LazyValue:
+    """
+    Values of a field as retrieved from the database, converted the first
+    time they are needed. The result is kept, and shared by every copy of
+    the object. Threads that need the value at the same time may both
+    convert it, but always from the original values.
+    """
+    __slots__ = ('_field', '_raw', '_value')
+
+    def __init__(self, field: tldap.fields.Field, value: List[bytes]) -> None:
+        self._field = field
+        self._raw = value
+        self._value: Any = _NOT_DECODED
+
+    def get(self) -> List[Any]:
+        value = self._value
+        if value is _NOT_DECODED:
+            value = self._field.to_python(self._raw)
+            self._value = value
+        return value
+
+
+def _resolve(value: Any) -> Any:
+    if isinstance(value, _LazyValue):
+        return value.get()
+    return value
+
+
 LdapObjectEntity = TypeVar('LdapObjectEntity', bound='LdapObject')
 LdapObjectClass = Type['LdapObject']
 
 
+_MISSING = object()
+
+
+class _SettingsReader(dict):
+    """ Copy of settings that records the values read by key. """
+
+    def __init__(self, settings: dict) -> None:
+        super().__init__(settings)
+        # None if the settings were read some other way
+        self.read: Optional[Dict[str, Any]] = {}
+
+    def _record(self, key: str) -> Any:
+        value = super().get(key, _MISSING)
+        if self.read is not None:
+            self.read[key] = value
+        return value
+
+    def __getitem__(self, key: str) -> Any:
+        self._record(key)
+        return super().__getitem__(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self._record(key)
+        return default if value is _MISSING else value
+
+    def __contains__(self, key: object) -> bool:
+        return self._record(key) is not _MISSING
+
+    def __iter__(self):
+        self.read = None
+        return super().__iter__()
+
+    def keys(self):
+        self.read = None
+        return super().keys()
+
+    def values(self):
+        self.read = None
+        return super().values()
+
+    def items(self):
+        self.read = None
+        return super().items()
+
+
+class Schema:
+    """
+    The fields of a table, and its search options for each database settings,
+    worked out once instead of for every object. See
+    :py:meth:`LdapObject.get_schema`.
+    """
+
+    #: Maximum number of search options kept for different settings.
+    max_search_options = 8
+
+    def __init__(self, table: LdapObjectClass) -> None:
+        self.table = table
+        self.fields: Dict[str, tldap.fields.Field] = table.get_fields()
+        self.field_names = frozenset(self.fields)
+        self.db_fields: Dict[str, tldap.fields.Field] = {
+            name: field
+            for name, field in self.fields.items()
+            if field.db_field
+        }
+        self.attributes: List[str] = sorted(self.db_fields)
+        self.lc: Dict[str, str] = {name.lower(): name for name in self.fields}
+        self._lock = threading.Lock()
+        # settings read and the search options, by id of the settings
+        self._search_options: Dict[int, Tuple[Dict[str, Any], SearchOptions]] = {}
+
+    def get_search_options(self, database: Database) -> SearchOptions:
+        """
+        Get the search options of the table for the settings of database.
+        They are worked out again if any setting they were made from changed.
+        """
+        settings = database.settings
+        value = self._search_options.get(id(settings))
+        if value is not None and all(settings.get(key, _MISSING) == old for key, old in value[0].items()):
+            return value[1]
+
+        reader = _SettingsReader(settings)
+        search_options = self.table.get_search_options(
+            Database(database.connection, reader, database.cache, database.identity_map))
+        if reader.read is not None:
+            with self._lock:
+                self._search_options.pop(id(settings), None)
+                while len(self._search_options) >= self.max_search_options:
+                    del self._search_options[next(iter(self._search_options))]
+                self._search_options[id(settings)] = (reader.read, search_options)
+        return search_options
+
+
 class LdapObject(ImmutableDict):
-    """ A high level python representation of a LDAP object. """
+    """
+    A high level python representation of a LDAP object. Tables should
+    declare ``__slots__ = ()``, or every object has a ``__dict__`` as well.
+    """
+    __slots__ = ()
 
     def __init__(self, d: Optional[dict] = None) -> None:
-        self._fields = self.get_fields()
-        field_names = set(self._fields.keys())
+        schema = self.get_schema()
+        field_names = schema.field_names
 
         python_data: Dict[str, NotLoadedListType] = {
             field_name: []
@@ -132,7 +309,11 @@ class LdapObject(ImmutableDict):
         if d is not None:
             python_data.update(d)
 
-        super().__init__(field_names, python_data)
+        super().__init__(field_names)
+        self._dict = PersistentDict(field_names, {
+            key: _python_to_list(value)
+            for key, value in python_data.items()
+        })
 
     @classmethod
     def get_fields(cls) -> Dict[str, tldap.fields.Field]:
@@ -142,6 +323,19 @@ class LdapObject(ImmutableDict):
     def get_search_options(cls, database: Database) -> SearchOptions:
         raise NotImplementedError()
 
+    @classmethod
+    def get_schema(cls) -> Schema:
+        """
+        Get the schema of the table, created the first time it is needed.
+        get_fields must return the same fields every time, and
+        get_search_options the same options for the same database settings.
+        """
+        schema = cls.__dict__.get('_schema')
+        if schema is None:
+            schema = Schema(cls)
+            cls._schema = schema
+        return schema
+
     @classmethod
     def on_load(cls, python_data: 'LdapObject', database: Database) -> 'LdapObject':
         raise NotImplementedError()
@@ -150,13 +344,14 @@ class LdapObject(ImmutableDict):
     def on_save(cls, changes: 'Changeset', database: Database) -> 'Changeset':
         raise NotImplementedError()
 
+    @property
+    def _fields(self) -> Dict[str, tldap.fields.Field]:
+        return self.get_schema().fields
+
     def _set(self, key: str, value: NotLoadedListType) -> None:
         value = _python_to_list(value)
         return super()._set(key, value)
 
-    def __copy__(self: LdapObjectEntity) -> LdapObjectEntity:
-        return self.__class__(self._dict)
-
     # def __getitem__(self, key: str) -> Any:
     #     raise Moew()
     #     value = self._dict[key]
@@ -164,14 +359,33 @@ class LdapObject(ImmutableDict):
     #     field = self._fields[key]
     #     return _list_to_python(field, value)
 
+    def __getitem__(self, key: str) -> NotLoadedListType:
+        return _resolve(self._dict[key])
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return _resolve(super().get(key, default))
+
+    def items(self) -> ItemsView[str, NotLoadedListType]:
+        return self.to_dict().items()
+
+    def to_dict(self) -> dict:
+        return {
+            key: _resolve(value)
+            for key, value in self._dict.items()
+        }
+
     def get_as_single(self, key: str) -> Any:
-        value = self._dict[key]
+        value = _resolve(self._dict[key])
         key = self.fix_key(key)
         field = self._fields[key]
         return _list_to_python(field, value)
 
     def get_as_list(self, key: str) -> NotLoadedListType:
-        return self._dict[key]
+        return _resolve(self._dict[key])
+
+    def is_loaded(self, key: str) -> bool:
+        """ Was the field retrieved from the database? """
+        return not isinstance(self._dict[key], NotLoadedField)
 
 
 ChangesetEntity = TypeVar('ChangesetEntity', bound='Changeset')
@@ -182,6 +396,7 @@ Operation = ldap3.MODIFY_ADD or ldap3.MODIFY_REPLACE or ldap3.MODIFY_DELETE
 
 class Changeset(ImmutableDict):
     """ Represents a set of changes to an LdapObject. """
+    __slots__ = ('_fields', '_src', '_changes', '_errors')
 
     def __init__(self, fields: Dict[str, tldap.fields.Field], src: LdapObject, d: Optional[dict] = None) -> None:
         self._fields = fields
@@ -192,8 +407,8 @@ class Changeset(ImmutableDict):
         super().__init__(field_names, d)
 
     def __copy__(self: ChangesetEntity) -> ChangesetEntity:
-        copy = self.__class__(self._fields, self._src, self._dict)
-        copy._changes = self._changes
+        copy = super().__copy__()
+        copy._errors = list(self._errors)
         return copy
 
     def get_value_as_single(self, key: str) -> any:
@@ -287,6 +502,8 @@ class Changeset(ImmutableDict):
         key = self.fix_key(key)
 
         old_value_list = self.get_value_as_list(key)
+        if isinstance(old_value_list, NotLoaded) and operation != ldap3.MODIFY_REPLACE:
+            raise RuntimeError(f"{key}: Cannot change field that was not loaded.")
 
         if operation == ldap3.MODIFY_ADD:
             assert isinstance(new_value_list, list)
@@ -309,7 +526,7 @@ class Changeset(ImmutableDict):
         else:
             raise RuntimeError(f"Unknown LDAP operation {operation}.")
 
-        self._dict[key] = old_value_list
+        self._dict = self._dict.set(key, old_value_list)
 
         field = self._fields[key]
         try:
@@ -332,6 +549,7 @@ class Changeset(ImmutableDict):
 
 class NotLoaded:
     """ Base class to represent a related field that has not been loaded. """
+    __slots__ = ()
 
     def __repr__(self):
         raise NotImplementedError()
@@ -341,6 +559,8 @@ class NotLoaded:
 
     @staticmethod
     def _load_one(table: LdapObjectClass, key: str, value: str, database: Optional[Database] = None) -> LdapObject:
+        if key == 'dn':
+            return get_by_dn(table, value, database)
         q = Q(**{key: value})
         result = get_one(table, q, database)
         return result
@@ -354,6 +574,8 @@ class NotLoaded:
 
 class NotLoadedObject(NotLoaded):
     """ Represents a single object that needs to be loaded. """
+    __slots__ = ('_table', '_key', '_value')
+
     def __init__(self, *, table: LdapObjectClass, key: str, value: str):
         self._table = table
         self._key = key
@@ -368,6 +590,7 @@ class NotLoadedObject(NotLoaded):
 
 class NotLoadedList(NotLoaded):
     """ Represents a list of objects that needs to be loaded via a single key. """
+    __slots__ = ('_table', '_key', '_value')
 
     def __init__(self, *, table: LdapObjectClass, key: str, value: str):
         self._table = table
@@ -381,44 +604,92 @@ class NotLoadedList(NotLoaded):
         return self._load_list(self._table, self._key, self._value, database)
 
 
+class NotLoadedField(NotLoaded):
+    """
+    Represents a field that was not retrieved by the search, because of the
+    ``only`` or ``defer`` options.
+    """
+    __slots__ = ('_table', '_dn', '_name')
+
+    def __init__(self, *, table: LdapObjectClass, dn: str, name: str):
+        self._table = table
+        self._dn = dn
+        self._name = name
+
+    def __repr__(self):
+        return f"<NotLoadedField {self._table} {self._dn} {self._name}>"
+
+    def load(self, database: Optional[Database] = None) -> NotLoadedListType:
+        """ Retrieve the object again, and return the value of this field as a list. """
+        python_data = self._load_one(self._table, 'dn', self._dn, database)
+        return python_data.get_as_list(self._name)
+
+
 def changeset(python_data: LdapObject, d: dict) -> Changeset:
     """ Generate changes object for ldap object. """
     table: LdapObjectClass = type(python_data)
-    fields = table.get_fields()
+    fields = table.get_schema().fields
     changes = Changeset(fields, src=python_data, d=d)
     return changes
 
 
-def _db_to_python(db_data: dict, table: LdapObjectClass, dn: str) -> LdapObject:
-    """ Convert a DbDate object to a LdapObject. """
-    fields = table.get_fields()
+def _db_to_python(db_data: dict, table: LdapObjectClass, dn: str,
+                  loaded: Optional[Set[str]] = None, lazy_decode: bool = False) -> LdapObject:
+    """
+    Convert a DbDate object to a LdapObject. Fields not in loaded are
+    marked as not loaded. If lazy_decode, values are only converted when used.
+    """
+    return _db_to_python_many([(dn, db_data)], table, loaded, lazy_decode)[0]
+
+
+def _db_to_python_many(results: List[Tuple[str, dict]], table: LdapObjectClass,
+                       loaded: Optional[Set[str]] = None, lazy_decode: bool = False) -> List[LdapObject]:
+    """
+    Convert a page of search results to LdapObjects, converting all the values
+    of each field at once.
+    """
+    db_fields = table.get_schema().db_fields
+
+    columns: Dict[str, List[Any]] = {}
+    for name, field in db_fields.items():
+        if loaded is not None and name not in loaded:
+            continue
+        values = [db_data[name] for _, db_data in results]
+        if lazy_decode:
+            columns[name] = [
+                _LazyValue(field, value) if len(value) > 0 else field.to_python(value)
+                for value in values
+            ]
+        else:
+            columns[name] = field.to_python_many(values)
 
-    python_data = table({
-        name: field.to_python(db_data[name])
-        for name, field in fields.items()
-        if field.db_field
-    })
-    python_data = python_data.merge({
-        'dn': dn,
-    })
-    return python_data
+    objects = []
+    for i, (dn, _) in enumerate(results):
+        python_data = table({
+            name: columns[name][i] if name in columns else NotLoadedField(table=table, dn=dn, name=name)
+            for name in db_fields
+        })
+        python_data = python_data.merge({
+            'dn': dn,
+        })
+        objects.append(python_data)
+    return objects
 
 
 def _python_to_mod_new(changes: Changeset) -> Dict[str, List[List[bytes]]]:
     """ Convert a LdapChanges object to a modlist for add operation. """
     table: LdapObjectClass = type(changes.src)
-    fields = table.get_fields()
+    db_fields = table.get_schema().db_fields
 
     result: Dict[str, List[List[bytes]]] = {}
 
-    for name, field in fields.items():
-        if field.db_field:
-            try:
-                value = field.to_db(changes.get_value_as_list(name))
-                if len(value) > 0:
-                    result[name] = value
-            except ValidationError as e:
-                raise ValidationError(f"{name}: {e}.")
+    for name, field in db_fields.items():
+        try:
+            value = field.to_db(changes.get_value_as_list(name))
+            if len(value) > 0:
+                result[name] = value
+        except ValidationError as e:
+            raise ValidationError(f"{name}: {e}.")
 
     return result
 
@@ -445,40 +716,309 @@ def _python_to_mod_modify(changes: Changeset) -> Dict[str, List[Tuple[Operation,
     return result
 
 
-def search(table: LdapObjectClass, query: Optional[Q] = None,
-           database: Optional[Database] = None, base_dn: Optional[str] = None) -> Iterator[LdapObject]:
-    """ Search for a object of given type in the database. """
-    fields = table.get_fields()
-    db_fields = {
-        name: field
-        for name, field in fields.items()
-        if field.db_field
-    }
+def _get_order_by(order_by: Sequence[str], fields: Dict[str, tldap.fields.Field], pk: str) -> List[str]:
+    """ Convert field names to attribute names, keeping any ``-`` prefix. """
+    result = []
+    for name in order_by:
+        prefix, name = ("-", name[1:]) if name.startswith("-") else ("", name)
+        if name == "pk":
+            name = pk
+        if name not in fields:
+            raise ValueError(f"Cannot order by {name}, it is not a database field.")
+        result.append(prefix + name)
+    return result
 
-    database = get_database(database)
-    connection = database.connection
 
-    search_options = table.get_search_options(database)
+def _get_loaded(fields: Dict[str, tldap.fields.Field], pk: str,
+                only: Optional[Sequence[str]], defer: Optional[Sequence[str]]) -> Set[str]:
+    """ Get the names of the fields to retrieve. The pk field is always retrieved. """
+    def get_name(name: str) -> str:
+        if name == "pk":
+            name = pk
+        if name not in fields:
+            raise ValueError(f"Cannot load {name}, it is not a database field.")
+        return name
 
-    iterator = tldap.query.search(
-        connection=connection,
-        query=query,
-        fields=db_fields,
-        base_dn=base_dn or search_options.base_dn,
+    if only is None:
+        loaded = set(fields)
+    else:
+        loaded = {get_name(name) for name in only}
+    if defer is not None:
+        loaded -= {get_name(name) for name in defer}
+    loaded.add(pk)
+    return loaded
+
+
+def _sort_results(results: Iterator[Tuple[str, dict]], fields: Dict[str, tldap.fields.Field],
+                  order_by: Sequence[str], offset: int, limit: Optional[int]) -> Iterator[Tuple[str, dict]]:
+    """ Sort search results in python, for when the server won't. """
+    results = list(results)
+
+    def get_keys(name: str) -> List[Any]:
+        # convert the whole column at once
+        columns = fields[name].to_python_many([list(result[1].get(name, [])) for result in results])
+        # entries without a value are sorted last
+        return [(True, None) if len(values) == 0 else (False, min(values)) for values in columns]
+
+    # stable sort by each key, least significant first
+    order = list(range(len(results)))
+    for name in reversed(order_by):
+        reverse = name.startswith("-")
+        if reverse:
+            name = name[1:]
+        order.sort(key=get_keys(name).__getitem__, reverse=reverse)
+
+    stop = None if limit is None else offset + limit
+    return iter([results[i] for i in order[offset:stop]])
+
+
+def _cache_results(results: Iterator[Tuple[str, dict]], cache: ResultCache, key: Hashable,
+                   base_dn: str, ttl: Optional[float]) -> Iterator[Tuple[str, dict]]:
+    """ Cache the search results, once all of them have been read. """
+    result_list = []
+    for result in results:
+        result_list.append(result)
+        yield result
+    cache.set(key, base_dn, result_list, ttl)
+
+
+def _split_query(database: Database, query: Optional[Q], fields: Dict[str, tldap.fields.Field],
+                 search_options: SearchOptions) -> List[Optional[Q]]:
+    """ Split queries with long ``__in`` lookups into several searches. """
+    max_size = database.settings.get('FILTER_MAX_SIZE', tldap.query.DEFAULT_FILTER_MAX_SIZE)
+    return tldap.query.split_query(
+        query, fields, search_options.object_class, search_options.pk_field, max_size)
+
+
+def _search_chunks(database: Database, queries: List[Optional[Q]], fields: Dict[str, tldap.fields.Field],
+                   base_dn: str, search_options: SearchOptions, **kwargs) -> Iterator[Tuple[str, dict]]:
+    """ Search for each query at the same time, merging the results. """
+    return tldap.query.search_chunks(
+        connection=database.connection,
+        queries=queries,
+        fields=fields,
+        base_dn=base_dn,
         object_classes=search_options.object_class,
         pk=search_options.pk_field,
+        pk_in_rdn=search_options.pk_in_rdn,
+        max_workers=database.settings.get('PARALLEL_SEARCHES', tldap.query.DEFAULT_PARALLEL_SEARCHES),
+        **kwargs
     )
 
-    for dn, data in iterator:
-        python_data = _db_to_python(data, table, dn)
-        python_data = table.on_load(python_data, database)
-        yield python_data
+
+def search(table: LdapObjectClass, query: Optional[Q] = None,
+           database: Optional[Database] = None, base_dn: Optional[str] = None,
+           order_by: Optional[Sequence[str]] = None, offset: int = 0,
+           limit: Optional[int] = None, only: Optional[Sequence[str]] = None,
+           defer: Optional[Sequence[str]] = None, page_size: Optional[int] = None,
+           lazy_decode: bool = False) -> Iterator[LdapObject]:
+    """
+    Search for a object of given type in the database.
+
+    Results are retrieved ``page_size`` at a time, or the ``PAGE_SIZE``
+    setting if not given.
+
+    Only the database fields in ``only``, if given, and not in ``defer`` are
+    retrieved. Other fields are set to a :py:class:`NotLoadedField`, which
+    :py:func:`preload` can load.
+
+    If ``lazy_decode``, the values of each field are only converted from
+    the database format when first used, and any error converting them is
+    raised then.
+
+    Results are sorted by the fields in ``order_by``, which may be prefixed
+    with ``-`` for descending order, and only ``limit`` results starting at
+    ``offset`` are returned. Sorting and the window are done by the server
+    where possible, falling back to sorting in python if the server refuses.
+
+    If the database has a cache, results are taken from it when possible,
+    except inside a transaction. If the database has an identity map, objects
+    already in it are returned instead of new objects.
+    """
+    schema = table.get_schema()
+    db_fields = schema.db_fields
+
+    database = get_database(database)
+    connection = database.connection
+
+    search_options = schema.get_search_options(database)
+    base_dn = base_dn or search_options.base_dn
+    if order_by:
+        order_by = _get_order_by(order_by, db_fields, search_options.pk_field)
+
+    loaded = None
+    attributes = schema.attributes
+    if only is not None or defer is not None:
+        loaded = _get_loaded(db_fields, search_options.pk_field, only, defer)
+        # fields we sort by are needed if sorting in python
+        attributes = sorted(loaded | {name.lstrip("-") for name in order_by or []})
+
+    queries = _split_query(database, query, db_fields, search_options)
+
+    def get_iterator(**kwargs) -> Iterator[Tuple[str, dict]]:
+        if loaded is not None:
+            kwargs['attributes'] = attributes
+        if page_size is not None:
+            kwargs['page_size'] = page_size
+        if len(queries) > 1:
+            return _search_chunks(database, queries, db_fields, base_dn, search_options, **kwargs)
+        return tldap.query.search(
+            connection=connection,
+            query=query,
+            fields=db_fields,
+            base_dn=base_dn,
+            object_classes=search_options.object_class,
+            pk=search_options.pk_field,
+            pk_in_rdn=search_options.pk_in_rdn,
+            **kwargs
+        )
+
+    def get_results() -> Iterator[Tuple[str, dict]]:
+        if len(queries) > 1:
+            # the server can't sort or window results from several searches
+            if order_by:
+                return _sort_results(get_iterator(), db_fields, order_by, offset, limit)
+            stop = None if limit is None else offset + limit
+            return itertools.islice(get_iterator(), offset, stop)
+        elif order_by:
+            iterator = get_iterator(order_by=order_by, offset=offset, count=limit)
+            try:
+                first = next(iterator, None)
+            except ldap3.core.exceptions.LDAPOperationResult as e:
+                if not tldap.backend.controls.is_refused(e):
+                    raise
+                return _sort_results(get_iterator(), db_fields, order_by, offset, limit)
+            if first is None:
+                return iter([])
+            return itertools.chain([first], iterator)
+        elif offset or limit is not None:
+            return get_iterator(offset=offset, count=limit)
+        else:
+            return get_iterator()
+
+    cache = database.cache
+    if cache is not None and search_options.cache_ttl != 0 and not connection.is_managed():
+        search_filter = tldap.query.get_search_filter(
+            query, db_fields, search_options.object_class, search_options.pk_field)
+        key = (table, search_filter, base_dn, tuple(attributes),
+               tuple(order_by or ()), offset, limit)
+        cached = cache.get(key)
+        if cached is not None:
+            iterator = iter(cached)
+        else:
+            iterator = _cache_results(get_results(), cache, key, base_dn, search_options.cache_ttl)
+    else:
+        iterator = get_results()
+
+    # convert a page of results at a time. Pages start small, so the first
+    # object isn't held back, and never ask for more than limit allows.
+    chunk_size = page_size or database.settings.get('PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    identity_map = database.identity_map
+    batch_size = 1
+    remaining = limit
+    while remaining is None or remaining > 0:
+        if remaining is not None:
+            batch_size = min(batch_size, remaining)
+        page = list(itertools.islice(iterator, batch_size))
+        if len(page) == 0:
+            break
+        if remaining is not None:
+            remaining -= len(page)
+        batch_size = min(batch_size * 2, chunk_size)
+
+        if identity_map is not None and loaded is None:
+            found = [identity_map.get(table, 'dn', dn) for dn, _ in page]
+        else:
+            found = [None] * len(page)
+
+        new_results = [result for result, python_data in zip(page, found) if python_data is None]
+        new_objects = iter(_db_to_python_many(new_results, table, loaded, lazy_decode))
+
+        for python_data in found:
+            if python_data is None:
+                python_data = table.on_load(next(new_objects), database)
+                if identity_map is not None:
+                    python_data = identity_map.add(python_data, search_options.pk_field)
+            yield python_data
+
+
+def dns(table: LdapObjectClass, query: Optional[Q] = None,
+        database: Optional[Database] = None, base_dn: Optional[str] = None,
+        limit: Optional[int] = None) -> Iterator[str]:
+    """
+    Get the DN of every object of given type matching query. No attributes
+    are retrieved, and the objects are not created.
+    """
+    schema = table.get_schema()
+    db_fields = schema.db_fields
+
+    database = get_database(database)
+    connection = database.connection
+
+    search_options = schema.get_search_options(database)
+
+    base_dn = base_dn or search_options.base_dn
+    queries = _split_query(database, query, db_fields, search_options)
+
+    chunks = None
+    if len(queries) > 1:
+        chunks = _search_chunks(
+            database, queries, db_fields, base_dn, search_options, attributes=[ldap3.NO_ATTRIBUTES])
+        results = itertools.islice(chunks, limit)
+    else:
+        kwargs = {}
+        if limit is not None:
+            kwargs['count'] = limit
+
+        results = tldap.query.search(
+            connection=connection,
+            query=query,
+            fields=db_fields,
+            base_dn=base_dn,
+            object_classes=search_options.object_class,
+            pk=search_options.pk_field,
+            pk_in_rdn=search_options.pk_in_rdn,
+            attributes=[ldap3.NO_ATTRIBUTES],
+            **kwargs
+        )
+
+    try:
+        for dn, _ in results:
+            yield dn
+    finally:
+        # stop any searches still running
+        if chunks is not None:
+            chunks.close()
+
+
+def exists(table: LdapObjectClass, query: Optional[Q] = None,
+           database: Optional[Database] = None, base_dn: Optional[str] = None) -> bool:
+    """ Is there any object of given type matching query? """
+    results = dns(table, query, database, base_dn, limit=1)
+    try:
+        return next(results, None) is not None
+    finally:
+        results.close()
 
 
 def get_one(table: LdapObjectClass, query: Optional[Q] = None,
             database: Optional[Database] = None, base_dn: Optional[str] = None) -> LdapObject:
-    """ Get exactly one result from the database or fail. """
-    results = search(table, query, database, base_dn)
+    """
+    Get exactly one result from the database or fail. If the database has an
+    identity map containing the object for the DN or primary key in query, it
+    is returned without a search.
+    """
+    database = get_database(database)
+    identity_map = database.identity_map
+    if identity_map is not None and base_dn is None:
+        lookup = get_lookup(query, table.get_schema().get_search_options(database).pk_field)
+        if lookup is not None:
+            python_data = identity_map.get(table, *lookup)
+            if python_data is not None:
+                return python_data
+
+    # a second result is only needed to tell there is more than one
+    results = search(table, query, database, base_dn, limit=2)
 
     try:
         result = next(results)
@@ -494,9 +1034,28 @@ def get_one(table: LdapObjectClass, query: Optional[Q] = None,
     return result
 
 
+def get_by_dn(table: LdapObjectClass, dn: str, database: Optional[Database] = None) -> LdapObject:
+    """
+    Get the object with the given DN, which must be below the base DN of
+    table. Only that entry is read by the server.
+    """
+    return get_one(table, Q(dn=dn), database)
+
+
 def preload(python_data: LdapObject, database: Optional[Database] = None) -> LdapObject:
     """ Preload all NotLoaded fields in LdapObject. """
 
+    # Retrieve the object again, once, for fields that were not loaded.
+    not_loaded = [name for name in python_data.keys() if not python_data.is_loaded(name)]
+    if len(not_loaded) > 0:
+        table = type(python_data)
+        dn = python_data.get_as_single('dn')
+        full_data = get_by_dn(table, dn, database)
+        python_data = python_data.merge({
+            name: full_data.get_as_list(name)
+            for name in not_loaded
+        })
+
     changes = {}
 
     # Load objects within lists.
@@ -530,6 +1089,92 @@ def preload(python_data: LdapObject, database: Optional[Database] = None) -> Lda
     return python_data.merge(changes)
 
 
+def _get_prefetch_key(value: NotLoaded) -> Tuple[LdapObjectClass, str, Any]:
+    """ Get the table, field and value to search for to load value. """
+    if isinstance(value, NotLoadedField):
+        return value._table, 'dn', value._dn
+    else:
+        return value._table, value._key, value._value
+
+
+def _normalize_prefetch_value(value: Any) -> Any:
+    # LDAP matches are usually case insensitive
+    if isinstance(value, str):
+        return value.lower()
+    return value
+
+
+def prefetch(objects: Iterable[LdapObject], *names: str,
+             database: Optional[Database] = None) -> List[LdapObject]:
+    """
+    Load the NotLoaded values of the named fields of every object. Instead of
+    a search for every value, all the values for each table and field are
+    retrieved with one ``__in`` search.
+    """
+    objects = list(objects)
+
+    # Collect the values to search for.
+    pending: Dict[Tuple[LdapObjectClass, str], Dict[Any, Any]] = defaultdict(dict)
+
+    def collect(value: Any) -> None:
+        if isinstance(value, NotLoaded):
+            table, key, key_value = _get_prefetch_key(value)
+            pending[(table, key)].setdefault(_normalize_prefetch_value(key_value), key_value)
+
+    for python_data in objects:
+        for name in names:
+            value_list = python_data.get_as_list(name)
+            if isinstance(value_list, NotLoaded):
+                collect(value_list)
+            else:
+                for value in value_list:
+                    collect(value)
+
+    # Search for every value of each table and field at once.
+    found: Dict[Tuple[LdapObjectClass, str], Dict[Any, List[LdapObject]]] = {}
+    for (table, key), values in pending.items():
+        index: Dict[Any, List[LdapObject]] = defaultdict(list)
+        query = Q(**{f"{key}__in": list(values.values())})
+        for result in search(table, query, database):
+            if key == 'dn':
+                result_values = [result.get_as_single('dn')]
+            else:
+                result_values = result.get_as_list(key)
+            for result_value in result_values:
+                index[_normalize_prefetch_value(result_value)].append(result)
+        found[(table, key)] = index
+
+    def get_matches(value: NotLoaded) -> List[LdapObject]:
+        table, key, key_value = _get_prefetch_key(value)
+        return found[(table, key)].get(_normalize_prefetch_value(key_value), [])
+
+    def get_one_match(value: NotLoaded) -> LdapObject:
+        matches = get_matches(value)
+        if len(matches) == 0:
+            raise ObjectDoesNotExist(f"Cannot find result for {value}.")
+        if len(matches) > 1:
+            raise MultipleObjectsReturned(f"Found multiple results for {value}.")
+        return matches[0]
+
+    # Put the results in the objects.
+    result = []
+    for python_data in objects:
+        changes = {}
+        for name in names:
+            value_list = python_data.get_as_list(name)
+            if isinstance(value_list, NotLoadedList):
+                changes[name] = get_matches(value_list)
+            elif isinstance(value_list, NotLoadedField):
+                changes[name] = get_one_match(value_list).get_as_list(value_list._name)
+            elif any(isinstance(value, NotLoadedObject) for value in value_list):
+                changes[name] = [
+                    get_one_match(value) if isinstance(value, NotLoadedObject) else value
+                    for value in value_list
+                ]
+        result.append(python_data.merge(changes))
+    return result
+
+
 def insert(python_data: LdapObject, database: Optional[Database] = None) -> LdapObject:
     """ Insert a new python_data object in the database. """
     assert isinstance(python_data, LdapObject)
@@ -598,10 +1243,15 @@ def save(changes: Changeset, database: Optional[Database] = None) -> LdapObject:
                 raise ObjectDoesNotExist(
                     "Object with dn %r doesn't already exist doing modify" % dn)
 
+    database.invalidate(dn)
+
     # get new values
     python_data = table(changes.src.to_dict())
     python_data = python_data.merge(changes.to_dict())
     python_data = python_data.on_load(python_data, database)
+    if database.identity_map is not None:
+        database.identity_map.remove(table, dn)
+        database.identity_map.add(python_data, table.get_schema().get_search_options(database).pk_field)
     return python_data
 
 
@@ -614,12 +1264,15 @@ def delete(python_data: LdapObject, database: Optional[Database] = None) -> None
     connection = database.connection
 
     connection.delete(dn)
+    database.invalidate(dn)
+    if database.identity_map is not None:
+        database.identity_map.remove(type(python_data), dn)
 
 
 def _get_field_by_name(table: LdapObjectClass, name: str) -> tldap.fields.Field:
     """ Lookup a field by its name. """
-    fields = table.get_fields()
-    return fields[name]
+    schema = table.get_schema()
+    return schema.fields[schema.lc.get(name.lower(), name)]
 
 
 def rename(python_data: LdapObject, new_base_dn: str = None,
@@ -669,7 +1322,13 @@ def rename(python_data: LdapObject, new_base_dn: str = None,
 
     new_dn = dn2str(tmp_list)
 
+    database.invalidate(dn)
+    database.invalidate(new_dn)
+
     python_data = python_data.merge({
         'dn': new_dn,
     })
+    if database.identity_map is not None:
+        database.identity_map.remove(table, dn)
+        database.identity_map.add(python_data, table.get_schema().get_search_options(database).pk_field)
     return python_data
@@ -0,0 +1,102 @@
+# Copyright 2026 Brian May
+#
+# This file is part of python-tldap.
+#
+# python-tldap is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# python-tldap is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with python-tldap  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Asyncio versions of the high level database functions.
+
+The blocking functions in :py:mod:`tldap.database`, including the on_load
+and on_save hooks, are run in the executor of :py:mod:`tldap.backend.aio`.
+"""
+from typing import AsyncIterator, Optional, Sequence
+
+import tldap.backend.aio
+import tldap.database
+from tldap import Q
+from tldap.backend.base import DEFAULT_PAGE_SIZE
+from tldap.database import Changeset, Database, LdapObject, LdapObjectClass
+
+
+def get_default_database() -> Database:
+    return Database(tldap.backend.aio.get_connection().connection)
+
+
+def get_database(database: Optional[Database]) -> Database:
+    if database is None:
+        return get_default_database()
+    else:
+        return database
+
+
+async def search(table: LdapObjectClass, query: Optional[Q] = None,
+                 database: Optional[Database] = None, base_dn: Optional[str] = None,
+                 order_by: Optional[Sequence[str]] = None, offset: int = 0,
+                 limit: Optional[int] = None, only: Optional[Sequence[str]] = None,
+                 defer: Optional[Sequence[str]] = None, lazy_decode: bool = False) -> AsyncIterator[LdapObject]:
+    """ Search for a object of given type in the database. """
+    database = get_database(database)
+    chunk_size = database.settings.get('PAGE_SIZE', DEFAULT_PAGE_SIZE)
+
+    iterator = tldap.database.search(
+        table, query, database, base_dn, order_by=order_by, offset=offset, limit=limit,
+        only=only, defer=defer, lazy_decode=lazy_decode)
+    async for python_data in tldap.backend.aio.iterate(iterator, chunk_size=chunk_size):
+        yield python_data
+
+
+async def get_one(table: LdapObjectClass, query: Optional[Q] = None,
+                  database: Optional[Database] = None, base_dn: Optional[str] = None) -> LdapObject:
+    """ Get exactly one result from the database or fail. """
+    database = get_database(database)
+    return await tldap.backend.aio.run(tldap.database.get_one, table, query, database, base_dn)
+
+
+async def get_by_dn(table: LdapObjectClass, dn: str, database: Optional[Database] = None) -> LdapObject:
+    """ Get the object with the given DN. """
+    database = get_database(database)
+    return await tldap.backend.aio.run(tldap.database.get_by_dn, table, dn, database)
+
+
+async def preload(python_data: LdapObject, database: Optional[Database] = None) -> LdapObject:
+    """ Preload all NotLoaded fields in LdapObject. """
+    database = get_database(database)
+    return await tldap.backend.aio.run(tldap.database.preload, python_data, database)
+
+
+async def insert(python_data: LdapObject, database: Optional[Database] = None) -> LdapObject:
+    """ Insert a new python_data object in the database. """
+    database = get_database(database)
+    return await tldap.backend.aio.run(tldap.database.insert, python_data, database)
+
+
+async def save(changes: Changeset, database: Optional[Database] = None) -> LdapObject:
+    """ Save all changes in a LdapChanges. """
+    database = get_database(database)
+    return await tldap.backend.aio.run(tldap.database.save, changes, database)
+
+
+async def delete(python_data: LdapObject, database: Optional[Database] = None) -> None:
+    """ Delete a LdapObject from the database. """
+    database = get_database(database)
+    return await tldap.backend.aio.run(tldap.database.delete, python_data, database)
+
+
+async def rename(python_data: LdapObject, new_base_dn: str = None,
+                 database: Optional[Database] = None, **kwargs) -> LdapObject:
+    """ Move/rename a LdapObject in the database. """
+    database = get_database(database)
+    return await tldap.backend.aio.run(
+        tldap.database.rename, python_data, new_base_dn, database, **kwargs)
@@ -0,0 +1,148 @@
+# Copyright 2026 Brian May
+#
+# This file is part of python-tldap.
+#
+# python-tldap is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# python-tldap is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with python-tldap  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Cache of search results, so repeating the same search doesn't need a round
+trip to the server.
+
+Results are cached until they are older than their time to live, or are
+evicted because the cache is full. Changes made with
+:py:func:`tldap.database.save`, :py:func:`tldap.database.delete` and
+:py:func:`tldap.database.rename` remove any cached results from searches
+that could have included the changed entry. Changes made by other programs
+are not seen until the cached results expire.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from tldap.dn import is_dn_below, normalize_dn
+
+
+logger = logging.getLogger(__name__)
+
+
+def _debug(*argv) -> None:
+    argv = [str(arg) for arg in argv]
+    logger.debug(" ".join(argv))
+
+
+DEFAULT_CACHE_TTL = 60.0
+
+NormalizedDn = Tuple[Tuple[Tuple[str, str], ...], ...]
+
+
+class _Entry(object):
+
+    def __init__(self, base_dn: NormalizedDn, results: List[Tuple[str, dict]], expires: float) -> None:
+        self.base_dn = base_dn
+        self.results = results
+        self.expires = expires
+
+
+class ResultCache(object):
+    """
+    Thread safe least recently used cache of search results. At most
+    ``max_size`` searches are kept, each for ``ttl`` seconds unless a
+    different time is given when it is added.
+    """
+
+    def __init__(self, max_size: int = 1000, ttl: float = DEFAULT_CACHE_TTL) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Hashable, _Entry]' = OrderedDict()
+
+    @classmethod
+    def from_settings(cls, settings: dict) -> Optional['ResultCache']:
+        """ Create the cache for a connection, or None if it is disabled. """
+        max_size = settings.get('CACHE_MAX_SIZE', 0)
+        if not max_size:
+            return None
+        return cls(max_size=max_size, ttl=settings.get('CACHE_TTL', DEFAULT_CACHE_TTL))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[List[Tuple[str, dict]]]:
+        """ Get the cached results for key, or None if not cached. """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry.results
+
+    def set(self, key: Hashable, base_dn: str, results: List[Tuple[str, dict]],
+            ttl: Optional[float] = None) -> None:
+        """ Cache the results of a search of base_dn. """
+        if ttl is None:
+            ttl = self.ttl
+        if ttl <= 0:
+            return
+        entry = _Entry(normalize_dn(base_dn), results, time.monotonic() + ttl)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, dn: str) -> None:
+        """ Forget every search that could have found the entry dn. """
+        normalized = normalize_dn(dn)
+        with self._lock:
+            keys = [
+                key for key, entry in self._entries.items()
+                if is_dn_below(normalized, entry.base_dn)
+            ]
+            for key in keys:
+                del self._entries[key]
+        _debug("invalidated", len(keys), "cached searches for", dn)
+
+    def clear(self) -> None:
+        """ Forget every cached search. """
+        with self._lock:
+            self._entries = OrderedDict()
+
+
+_lock = threading.Lock()
+_caches: Dict[Any, Tuple[dict, Optional[ResultCache]]] = {}
+
+
+def get_cache(connection: Any) -> Optional[ResultCache]:
+    """
+    Get the cache shared by every thread using the same connection alias, or
+    None if caching is disabled by the settings.
+    """
+    settings = connection.settings_dict
+    if not settings.get('CACHE_MAX_SIZE', 0):
+        return None
+
+    alias = getattr(connection, 'alias', None)
+    with _lock:
+        value = _caches.get(alias)
+        # settings changed, for example tldap.backend.setup() was called again
+        if value is None or value[0] is not settings:
+            value = _caches[alias] = (settings, ResultCache.from_settings(settings))
+        return value[1]
@@ -29,12 +29,18 @@ from tldap.database import (
     Database,
     LdapObject,
     LdapObjectClass,
+    NotLoadedField,
     NotLoadedList,
     NotLoadedObject,
 )
 from tldap.dn import dn2str, str2dn
 
 
+def _not_loaded(python_data: LdapObject, name: str) -> NotLoadedField:
+    """ A field calculated from fields that were not loaded. """
+    return NotLoadedField(table=type(python_data), dn=python_data.get_as_single('dn'), name=name)
+
+
 def rdn_to_dn(changes: Changeset, name: str, base_dn: str) -> Changeset:
     """ Convert the rdn to a fully qualified DN for the specified LDAP
     connection.
@@ -93,9 +99,14 @@ def get_fields_person() -> Dict[str, tldap.fields.Field]:
 
 
 def load_person(python_data: LdapObject, group_table: LdapObjectClass) -> LdapObject:
+    if python_data.is_loaded('uid'):
+        groups = NotLoadedList(table=group_table, key="memberUid", value=python_data.get_as_single("uid"))
+    else:
+        groups = _not_loaded(python_data, 'groups')
+
     python_data = python_data.merge({
         'password': None,
-        'groups': NotLoadedList(table=group_table, key="memberUid", value=python_data.get_as_single("uid"))
+        'groups': groups,
     })
     return python_data
 
@@ -158,11 +169,16 @@ def get_fields_account() -> Dict[str, tldap.fields.Field]:
 
 
 def load_account(python_data: LdapObject, group_table: LdapObjectClass) -> LdapObject:
-    d = {
-        'locked': python_data.get_as_single('loginShell').startswith("/locked"),
-    }
+    d = {}
+
+    if python_data.is_loaded('loginShell'):
+        d['locked'] = python_data.get_as_single('loginShell').startswith("/locked")
+    else:
+        d['locked'] = _not_loaded(python_data, 'locked')
 
-    if 'gidNumber' in python_data:
+    if not python_data.is_loaded('gidNumber'):
+        d['primary_group'] = _not_loaded(python_data, 'primary_group')
+    elif 'gidNumber' in python_data:
         d['primary_group'] = NotLoadedObject(
             table=group_table, key='gidNumber', value=python_data.get_as_single('gidNumber'))
 
@@ -257,7 +273,9 @@ def get_fields_group() -> Dict[str, tldap.fields.Field]:
 def load_group(python_data: LdapObject, account_table: LdapObjectClass) -> LdapObject:
     d = {}
 
-    if 'gidNumber' in python_data:
+    if not python_data.is_loaded('memberUid'):
+        d['members'] = _not_loaded(python_data, 'members')
+    elif 'gidNumber' in python_data:
         d['members'] = [
             NotLoadedObject(table=account_table, key='uid', value=uid)
             for uid in python_data.get_as_list('memberUid')
@@ -313,8 +331,13 @@ def get_fields_pwdpolicy() -> Dict[str, tldap.fields.Field]:
 
 
 def load_pwdpolicy(python_data: LdapObject) -> LdapObject:
+    if python_data.is_loaded('pwdAccountLockedTime'):
+        locked = len(python_data['pwdAccountLockedTime']) > 0
+    else:
+        locked = _not_loaded(python_data, 'locked')
+
     python_data = python_data.merge({
-        'locked': len(python_data['pwdAccountLockedTime']) > 0,
+        'locked': locked,
     })
     return python_data
 
@@ -355,6 +378,8 @@ def get_fields_password_object() -> Dict[str, tldap.fields.Field]:
 
 def load_password_object(python_data: LdapObject) -> LdapObject:
     def is_locked():
+        if not python_data.is_loaded('nsAccountLock'):
+            return _not_loaded(python_data, 'locked')
         account_lock = python_data.get_as_single('nsAccountLock')
         if account_lock is None:
             return False
@@ -0,0 +1,137 @@
+# Copyright 2026 Brian May
+#
+# This file is part of python-tldap.
+#
+# python-tldap is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# python-tldap is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with python-tldap  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Identity map of loaded objects, so an entry is only loaded once.
+
+..  code-block:: python
+
+    database = tldap.database.get_default_database().with_identity_map()
+    group = tldap.database.get_one(Group, Q(cn='admin'), database)
+    group = tldap.database.preload(group, database)
+
+Once an object has been fully loaded, :py:func:`tldap.database.get_one`
+returns the same object for its DN or primary key without asking the
+server, and searches return it instead of creating a new object. Changes
+made with :py:func:`tldap.database.save`, :py:func:`tldap.database.delete`
+and :py:func:`tldap.database.rename` update the map. Changes made by other
+programs are not seen, so the map should only be used for a short time,
+such as one request or one transaction.
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from tldap.database.cache import NormalizedDn
+from tldap.dn import normalize_dn
+
+
+logger = logging.getLogger(__name__)
+
+
+def _debug(*argv) -> None:
+    argv = [str(arg) for arg in argv]
+    logger.debug(" ".join(argv))
+
+
+def _normalize_value(value: Any) -> Any:
+    # LDAP matches are usually case insensitive
+    if isinstance(value, str):
+        return value.lower()
+    return value
+
+
+def get_lookup(query: Any, pk: str) -> Optional[Tuple[str, Any]]:
+    """
+    If query only matches a single DN or primary key value, get the name,
+    either ``dn`` or pk, and the value. Otherwise get None.
+    """
+    if query is None or query.negated or len(query.children) != 1:
+        return None
+    child = query.children[0]
+    if not isinstance(child, tuple):
+        return get_lookup(child, pk)
+    name, value = child
+    if name == "pk":
+        name = pk
+    if name not in ("dn", pk) or not isinstance(value, str):
+        return None
+    return name, value
+
+
+class IdentityMap(object):
+    """
+    Map of fully loaded objects, by DN and by primary key. Objects with
+    fields that were not loaded are never added.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # object and the key of its primary key, by DN
+        self._objects: Dict[Tuple[Any, NormalizedDn], Tuple[Any, Tuple[Any, Any]]] = {}
+        self._pks: Dict[Tuple[Any, Any], NormalizedDn] = {}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._objects)
+
+    def get(self, table: Any, name: str, value: Any) -> Optional[Any]:
+        """ Get the object of table with field name, which must be dn or pk, equal to value. """
+        with self._lock:
+            if name == "dn":
+                dn = normalize_dn(value)
+            else:
+                dn = self._pks.get((table, _normalize_value(value)))
+                if dn is None:
+                    return None
+            entry = self._objects.get((table, dn))
+            return None if entry is None else entry[0]
+
+    def add(self, python_data: Any, pk: str) -> Any:
+        """
+        Add a loaded object, and return the object in the map. An object
+        already in the map for the same DN is kept.
+        """
+        table = type(python_data)
+        if any(not python_data.is_loaded(name) for name in python_data.keys()):
+            return python_data
+
+        dn = normalize_dn(python_data.get_as_single('dn'))
+        with self._lock:
+            old = self._objects.get((table, dn))
+            if old is not None:
+                return old[0]
+            pk_key = (table, _normalize_value(python_data.get_as_single(pk)))
+            self._objects[(table, dn)] = (python_data, pk_key)
+            self._pks[pk_key] = dn
+            return python_data
+
+    def remove(self, table: Any, dn: str) -> None:
+        """ Forget the object of table with DN dn. """
+        normalized = normalize_dn(dn)
+        with self._lock:
+            old = self._objects.pop((table, normalized), None)
+            if old is not None:
+                self._pks.pop(old[1], None)
+        _debug("removed", dn, "from identity map")
+
+    def clear(self) -> None:
+        """ Forget every object. """
+        with self._lock:
+            self._objects = {}
+            self._pks = {}
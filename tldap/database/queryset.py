@@ -0,0 +1,205 @@
+# Copyright 2026 Brian May
+#
+# This file is part of python-tldap.
+#
+# python-tldap is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# python-tldap is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with python-tldap  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Lazy chainable searches of a table.
+
+..  code-block:: python
+
+    accounts = QuerySet(Account).filter(Q(uid__contains='tux')).order_by('-uid')
+    for account in accounts[10:20]:
+        print(account.get_as_single('uid'))
+
+Nothing is retrieved from the database until the results are needed.
+"""
+
+from typing import Iterator, List, Optional, Sequence, Union
+
+import tldap.database
+from tldap import Q
+from tldap.database import Database, LdapObject, LdapObjectClass
+from tldap.exceptions import MultipleObjectsReturned, ObjectDoesNotExist
+
+
+class QuerySet(object):
+    """
+    A search of table, that is only run when the results are used. Methods
+    that change the search return a new QuerySet.
+    """
+
+    def __init__(self, table: LdapObjectClass, database: Optional[Database] = None,
+                 base_dn: Optional[str] = None) -> None:
+        self._table = table
+        self._database = database
+        self._base_dn = base_dn
+        self._query: Optional[Q] = None
+        self._order_by: Optional[Sequence[str]] = None
+        self._only: Optional[Sequence[str]] = None
+        self._defer: Optional[Sequence[str]] = None
+        self._offset = 0
+        self._limit: Optional[int] = None
+        self._lazy_decode = False
+        self._results: Optional[List[LdapObject]] = None
+
+    def _clone(self) -> 'QuerySet':
+        clone = self.__class__(self._table, self._database, self._base_dn)
+        clone._query = self._query
+        clone._order_by = self._order_by
+        clone._only = self._only
+        clone._defer = self._defer
+        clone._offset = self._offset
+        clone._limit = self._limit
+        clone._lazy_decode = self._lazy_decode
+        return clone
+
+    def _add_query(self, query: Q) -> 'QuerySet':
+        clone = self._clone()
+        if len(query) == 0:
+            pass
+        elif clone._query is None:
+            clone._query = query
+        else:
+            clone._query = clone._query & query
+        return clone
+
+    def _set_window(self, offset: int, limit: Optional[int]) -> 'QuerySet':
+        """ Restrict the results to limit results, starting offset within the current window. """
+        clone = self._clone()
+        clone._offset = self._offset + offset
+        if limit is not None and self._limit is not None:
+            limit = max(min(limit, self._limit - offset), 0)
+        elif limit is None and self._limit is not None:
+            limit = max(self._limit - offset, 0)
+        clone._limit = limit
+        return clone
+
+    @property
+    def query(self) -> Optional[Q]:
+        return self._query
+
+    def using(self, database: Database) -> 'QuerySet':
+        """ Search a different database. """
+        clone = self._clone()
+        clone._database = database
+        return clone
+
+    def filter(self, *args, **kwargs) -> 'QuerySet':
+        """ Only return results matching the Q objects and lookups given. """
+        return self._add_query(Q(*args, **kwargs))
+
+    def exclude(self, *args, **kwargs) -> 'QuerySet':
+        """ Only return results not matching the Q objects and lookups given. """
+        if len(args) == 0 and len(kwargs) == 0:
+            return self._clone()
+        return self._add_query(~Q(*args, **kwargs))
+
+    def order_by(self, *names: str) -> 'QuerySet':
+        """ Sort by the fields given, prefixed with ``-`` for descending order. """
+        clone = self._clone()
+        clone._order_by = list(names) or None
+        return clone
+
+    def only(self, *names: str) -> 'QuerySet':
+        """ Only retrieve the fields given. """
+        clone = self._clone()
+        clone._only = list(names)
+        return clone
+
+    def defer(self, *names: str) -> 'QuerySet':
+        """ Don't retrieve the fields given. """
+        clone = self._clone()
+        clone._defer = list(self._defer or []) + list(names)
+        return clone
+
+    def lazy_decode(self) -> 'QuerySet':
+        """ Only convert the values of each field when they are used. """
+        clone = self._clone()
+        clone._lazy_decode = True
+        return clone
+
+    def iterator(self, chunk_size: Optional[int] = None) -> Iterator[LdapObject]:
+        """
+        Search without keeping the results, retrieving ``chunk_size`` results
+        from the server at a time.
+        """
+        return tldap.database.search(
+            self._table, self._query, self._database, self._base_dn,
+            order_by=self._order_by, offset=self._offset, limit=self._limit,
+            only=self._only, defer=self._defer, page_size=chunk_size,
+            lazy_decode=self._lazy_decode,
+        )
+
+    def _fetch_all(self) -> List[LdapObject]:
+        if self._results is None:
+            self._results = list(self.iterator())
+        return self._results
+
+    def __iter__(self) -> Iterator[LdapObject]:
+        return iter(self._fetch_all())
+
+    def __len__(self) -> int:
+        return len(self._fetch_all())
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[LdapObject, 'QuerySet']:
+        if self._results is not None:
+            return self._results[key]
+
+        if isinstance(key, slice):
+            if key.step is not None or (key.start or 0) < 0 or (key.stop is not None and key.stop < 0):
+                raise ValueError("Only positive slices without a step are supported.")
+            start = key.start or 0
+            limit = None if key.stop is None else max(key.stop - start, 0)
+            return self._set_window(start, limit)
+
+        if key < 0:
+            raise ValueError("Negative indexing is not supported.")
+        results = list(self._set_window(key, 1).iterator())
+        if len(results) == 0:
+            raise IndexError("QuerySet index out of range.")
+        return results[0]
+
+    def first(self) -> Optional[LdapObject]:
+        """ Get the first result, or None if there are no results. """
+        try:
+            return self[0]
+        except IndexError:
+            return None
+
+    def exists(self) -> bool:
+        """ Are there any results? Only one result is requested from the server. """
+        if self._results is not None:
+            return len(self._results) > 0
+        if self._offset == 0 and self._limit != 0:
+            return tldap.database.exists(self._table, self._query, self._database, self._base_dn)
+        queryset = self.only("pk")._set_window(0, 1)
+        return next(queryset.iterator(), None) is not None
+
+    def get(self, *args, **kwargs) -> LdapObject:
+        """
+        Get exactly one result matching the Q objects and lookups given, or
+        fail. At most two results are requested from the server.
+        """
+        queryset = self.filter(*args, **kwargs) if args or kwargs else self
+        results = list(queryset._set_window(0, 2).iterator())
+        if len(results) == 0:
+            raise ObjectDoesNotExist(f"Cannot find result for {queryset.query}.")
+        if len(results) > 1:
+            raise MultipleObjectsReturned(f"Found multiple results for {queryset.query}.")
+        return results[0]
+
+    def __repr__(self) -> str:
+        return f"<QuerySet {self._table.__name__} {self._query}>"
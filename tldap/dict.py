@@ -15,7 +15,20 @@
 # You should have received a copy of the GNU General Public License
 # along with python-tldap  If not, see <http://www.gnu.org/licenses/>.
 """ Dictionary related classes. """
-from typing import Dict, ItemsView, KeysView, Optional, Set, TypeVar
+import collections.abc
+import functools
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    ItemsView,
+    Iterator,
+    KeysView,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
 
 
 Entity = TypeVar('Entity', bound='CaseInsensitiveDict')
@@ -26,6 +39,7 @@ class CaseInsensitiveDict:
     Case insensitve dictionary for searches however preserves the case for
     retrieval. Needs to be supplied with a set of allowed keys.
     """
+    __slots__ = ('_lc', '_dict')
 
     def __init__(self, allowed_keys: Set[str], d: Optional[dict] = None) -> None:
         self._lc: Dict[str, str] = {
@@ -75,16 +89,181 @@ class CaseInsensitiveDict:
         return self._dict
 
 
+_BITS = 3
+_WIDTH = 1 << _BITS
+_MASK = _WIDTH - 1
+
+_MISSING = object()
+
+
+class _KeyIndex:
+    """ Slot of each allowed key, shared by every PersistentDict with the same keys. """
+
+    def __init__(self, allowed_keys: FrozenSet[str]) -> None:
+        self.keys = sorted(allowed_keys)
+        self.lc: Dict[str, str] = {key.lower(): key for key in self.keys}
+        self.slots: Dict[str, int] = {key.lower(): slot for slot, key in enumerate(self.keys)}
+
+        depth = 1
+        while _WIDTH ** depth < len(self.keys):
+            depth += 1
+        # bits of the slot used at each level of the trie, from the root
+        self.shifts: Tuple[int, ...] = tuple(range((depth - 1) * _BITS, -1, -_BITS))
+
+        empty: Any = (_MISSING,) * _WIDTH
+        for _ in range(depth - 1):
+            empty = (empty,) * _WIDTH
+        self.empty = empty
+
+    def build(self, leaves: list) -> tuple:
+        """ Build the trie with the value of each slot. """
+        nodes = leaves + [_MISSING] * (_WIDTH ** len(self.shifts) - len(leaves))
+        while True:
+            nodes = [tuple(nodes[i:i + _WIDTH]) for i in range(0, len(nodes), _WIDTH)]
+            if len(nodes) == 1:
+                return nodes[0]
+
+
+@functools.lru_cache(maxsize=256)
+def _get_key_index(allowed_keys: FrozenSet[str]) -> _KeyIndex:
+    return _KeyIndex(allowed_keys)
+
+
+def _assoc(node: tuple, shifts: Tuple[int, ...], slot: int, value: Any) -> tuple:
+    """ Copy the path to slot, sharing every other node. """
+    i = (slot >> shifts[0]) & _MASK
+    if len(shifts) == 1:
+        child = value
+    else:
+        child = _assoc(node[i], shifts[1:], slot, value)
+    return node[:i] + (child,) + node[i + 1:]
+
+
+def _leaves(node: tuple, depth: int):
+    if depth == 1:
+        yield from node
+    else:
+        for child in node:
+            yield from _leaves(child, depth - 1)
+
+
+class _ItemsView(collections.abc.ItemsView):
+    """ Items of a PersistentDict, read from the trie in one pass. """
+    __slots__ = ()
+
+    def __iter__(self) -> Iterator[Tuple[str, Any]]:
+        return self._mapping._iter_items()
+
+
+class PersistentDict:
+    """
+    Case insensitive dictionary that cannot be changed. :py:meth:`set` returns
+    a new dictionary sharing everything except the path to the changed
+    value, so changing k keys costs O(k log n) instead of copying every key.
+
+    Values are kept in a trie indexed by the slot of each key, with the slots
+    and lowercase names shared by every dictionary with the same allowed
+    keys.
+    """
+    __slots__ = ('_index', '_root')
+
+    def __init__(self, allowed_keys: Set[str], d: Optional[dict] = None) -> None:
+        self._index = _get_key_index(frozenset(allowed_keys))
+        if d is None:
+            self._root = self._index.empty
+        else:
+            leaves = [_MISSING] * len(self._index.keys)
+            for key, value in d.items():
+                leaves[self._slot(key)] = value
+            self._root = self._index.build(leaves)
+
+    def _slot(self, key: str) -> int:
+        try:
+            return self._index.slots[key.lower()]
+        except KeyError:
+            raise KeyError(key.lower())
+
+    def _lookup(self, key: str) -> Any:
+        node = self._root
+        slot = self._slot(key)
+        for shift in self._index.shifts:
+            node = node[(slot >> shift) & _MASK]
+        return node
+
+    def fix_key(self, key: str) -> str:
+        try:
+            return self._index.lc[key.lower()]
+        except KeyError:
+            raise KeyError(key.lower())
+
+    def set(self, key: str, value: Any) -> 'PersistentDict':
+        clone = PersistentDict.__new__(PersistentDict)
+        clone._index = self._index
+        clone._root = _assoc(self._root, self._index.shifts, self._slot(key), value)
+        return clone
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._lookup(key)
+        if value is _MISSING:
+            raise KeyError(self.fix_key(key))
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return self._lookup(key) is not _MISSING
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self._lookup(key)
+        if value is _MISSING:
+            return default
+        return value
+
+    def _iter_items(self) -> Iterator[Tuple[str, Any]]:
+        for key, value in zip(self._index.keys, _leaves(self._root, len(self._index.shifts))):
+            if value is not _MISSING:
+                yield key, value
+
+    def __iter__(self) -> Iterator[str]:
+        for key, _ in self._iter_items():
+            yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self._iter_items())
+
+    def keys(self) -> KeysView[str]:
+        """ Get a view of the keys, without copying the dictionary. """
+        return collections.abc.KeysView(self)
+
+    def items(self) -> ItemsView[str, Any]:
+        """ Get a view of the items, without copying the dictionary. """
+        return _ItemsView(self)
+
+    def to_dict(self) -> dict:
+        return dict(self._iter_items())
+
+
 ImmutableDictEntity = TypeVar('ImmutableDictEntity', bound='ImmutableDict')
 
 
+@functools.lru_cache(maxsize=None)
+def _get_slot_names(cls: type) -> Tuple[str, ...]:
+    """ Get the names of the slots of cls, including inherited slots. """
+    return tuple(
+        name
+        for base in cls.__mro__
+        for name in base.__dict__.get('__slots__', ())
+        if name not in ('__dict__', '__weakref__')
+    )
+
+
 class ImmutableDict:
     """
     Immutable dictionary that cannot be changed without creating a new instance.
     """
+    __slots__ = ('_allowed_keys', '_dict')
+
     def __init__(self, allowed_keys: Optional[Set[str]] = None, d: Optional[dict] = None) -> None:
         self._allowed_keys = allowed_keys
-        self._dict = CaseInsensitiveDict(allowed_keys)
+        self._dict = PersistentDict(allowed_keys)
         if d is not None:
             for key, value in d.items():
                 self._set(key, value)
@@ -112,10 +291,15 @@ class ImmutableDict:
         return self._dict.items()
 
     def __copy__(self: ImmutableDictEntity) -> ImmutableDictEntity:
-        return self.__class__(self._allowed_keys, self._dict)
+        # the values are never changed, so can be shared with the copy. Only
+        # slots are copied, touching __dict__ would allocate one.
+        clone = self.__class__.__new__(self.__class__)
+        for name in _get_slot_names(type(self)):
+            setattr(clone, name, getattr(self, name))
+        return clone
 
     def _set(self, key: str, value: any) -> None:
-        self._dict[key] = value
+        self._dict = self._dict.set(key, value)
 
     def merge(self: ImmutableDictEntity, d: dict) -> ImmutableDictEntity:
         clone = self.__copy__()
@@ -18,18 +18,13 @@
 """ Django specific database helper functions. """
 
 from tldap import Q
-from tldap.database import Changeset, Database, LdapObjectClass, get_one
+from tldap.database import Changeset, Database, LdapObjectClass, exists
 from tldap.django.models import Counters
-from tldap.exceptions import ObjectDoesNotExist
 
 
 def _check_exists(database: Database, table: LdapObjectClass, key: str, value: str):
     """ Check if a given LDAP object exists. """
-    try:
-        get_one(table, Q(**{key: value}), database=database)
-        return True
-    except ObjectDoesNotExist:
-        return False
+    return exists(table, Q(**{key: value}), database=database)
 
 
 def save_account(changes: Changeset, table: LdapObjectClass, database: Database) -> Changeset:
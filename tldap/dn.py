@@ -593,3 +593,26 @@ def explode_rdn(rdn, notypes=0, flags=0):
     else:
         return ['='.join((atype, escape_dn_chars(avalue or '')))
                 for atype, avalue, dummy in rdn_decomp]
+
+
+def normalize_dn(dn):
+    """
+    normalize_dn(dn) -> tuple
+
+    This function takes a DN and returns a case insensitive form of it,
+    that can be compared with other normalized DNs.
+    """
+    return tuple(
+        tuple(sorted((atype.lower(), avalue.lower()) for atype, avalue, dummy in rdn))
+        for rdn in str2dn(dn)
+    )
+
+
+def is_dn_below(dn, base_dn):
+    """
+    is_dn_below(dn, base_dn) -> bool
+
+    This function takes two normalized DNs and returns True if dn is the
+    same as, or below, base_dn.
+    """
+    return len(base_dn) <= len(dn) and dn[len(dn) - len(base_dn):] == base_dn
@@ -54,3 +54,13 @@ class ValidationError(Exception):
 class RollbackError(Exception):
     """An error in rollback and consistency cannot be guaranteed."""
     pass
+
+
+class PoolTimeout(Exception):
+    """Timed out waiting for a free connection in the pool."""
+    pass
+
+
+class CircuitOpen(Exception):
+    """The server recently failed, so operations fail fast without trying."""
+    pass
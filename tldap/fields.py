@@ -20,6 +20,7 @@
 """ LDAP field types. """
 
 import datetime
+import functools
 import struct
 
 import six
@@ -27,8 +28,50 @@ import six
 import tldap.exceptions
 
 
+@functools.lru_cache(maxsize=None)
+def _get_sid_struct(length):
+    """ Get the compiled struct of a SID with length sub authorities. """
+    return struct.Struct('<bbbbbbbb' + 'I' * length)
+
+
+def _parse_ints(values):
+    """
+    Parse a list of bytes values as integers in one pass. Returns None if any
+    value isn't valid, so the caller can find the error.
+    """
+    for value in values:
+        if not isinstance(value, bytes):
+            return None
+    try:
+        return list(map(int, values))
+    except (TypeError, ValueError):
+        return None
+
+
+def _flatten(values):
+    """ Get every value of a column, and the number of values of each entry. """
+    flat = []
+    lengths = []
+    for value in values:
+        assert isinstance(value, list)
+        flat.extend(value)
+        lengths.append(len(value))
+    return flat, lengths
+
+
+def _unflatten(flat, lengths):
+    """ Split the values of a column back into the values of each entry. """
+    result = []
+    start = 0
+    for length in lengths:
+        result.append(flat[start:start + length])
+        start += length
+    return result
+
+
 class Field(object):
     """ The base field type. """
+    __slots__ = ('_max_instances', '_required')
     db_field = True
 
     def __init__(self, max_instances=1, required=False):
@@ -70,6 +113,14 @@ class Field(object):
         # return result
         return value
 
+    def to_python_many(self, values):
+        """
+        Converts a column of values, the list of values of each entry, as
+        returned by a search. Same as calling :py:meth:`to_python` for each
+        entry, but subclasses may convert the whole column at once.
+        """
+        return [self.to_python(value) for value in values]
+
     def validate(self, value):
         """
         Validates value and throws ValidationError. Subclasses should override
@@ -130,6 +181,7 @@ class Field(object):
 
 
 class FakeField(Field):
+    __slots__ = ()
     db_field = False
 
     """ Field contains a binary value that can not be interpreted in anyway.
@@ -163,6 +215,7 @@ class FakeField(Field):
 class BinaryField(Field):
     """ Field contains a binary value that can not be interpreted in anyway.
     """
+    __slots__ = ()
 
     def value_to_db(self, value):
         """ Returns field's single value prepared for saving into a database. """
@@ -191,6 +244,7 @@ class BinaryField(Field):
 
 class CharField(Field):
     """ Field contains a UTF8 character string. """
+    __slots__ = ()
 
     def value_to_db(self, value):
         """ Returns field's single value prepared for saving into a database. """
@@ -210,6 +264,15 @@ class CharField(Field):
         value = value.decode("utf_8")
         return value
 
+    def to_python_many(self, values):
+        """ Converts a column of values, decoding every value at once. """
+        for value in values:
+            assert isinstance(value, list)
+            for v in value:
+                if not isinstance(v, bytes):
+                    return super(CharField, self).to_python_many(values)
+        return [[v.decode("utf_8") for v in value] for value in values]
+
     def value_validate(self, value):
         """
         Validates value and throws ValidationError. Subclasses should override
@@ -221,6 +284,7 @@ class CharField(Field):
 
 class UnicodeField(Field):
     """ Field contains a UTF16 character string. """
+    __slots__ = ()
 
     def value_to_db(self, value):
         """ Returns field's single value prepared for saving into a database. """
@@ -250,6 +314,7 @@ class UnicodeField(Field):
 
 class IntegerField(Field):
     """ Field contains an integer value. """
+    __slots__ = ()
 
     def value_to_python(self, value):
         """
@@ -267,6 +332,15 @@ class IntegerField(Field):
         except (TypeError, ValueError):
             raise tldap.exceptions.ValidationError("is invalid integer")
 
+    def to_python_many(self, values):
+        """ Converts a column of values, parsing every integer at once. """
+        flat, lengths = _flatten(values)
+        flat = _parse_ints(flat)
+        if flat is None:
+            # convert each value to get the error
+            return super(IntegerField, self).to_python_many(values)
+        return _unflatten(flat, lengths)
+
     def value_to_db(self, value):
         """ Returns field's single value prepared for saving into a database. """
         assert isinstance(value, six.integer_types)
@@ -290,6 +364,7 @@ class IntegerField(Field):
 
 class DaysSinceEpochField(Field):
     """ Field is an integer containing number of days since epoch. """
+    __slots__ = ()
 
     def value_to_python(self, value):
         """
@@ -313,6 +388,19 @@ class DaysSinceEpochField(Field):
 
         return value
 
+    def to_python_many(self, values):
+        """ Converts a column of values, parsing every integer at once. """
+        flat, lengths = _flatten(values)
+        flat = _parse_ints(flat)
+        if flat is not None:
+            fromtimestamp = datetime.date.fromtimestamp
+            try:
+                return _unflatten([fromtimestamp(value * 24 * 60 * 60) for value in flat], lengths)
+            except OverflowError:
+                pass
+        # convert each value to get the error
+        return super(DaysSinceEpochField, self).to_python_many(values)
+
     def value_to_db(self, value):
         """ Returns field's single value prepared for saving into a database. """
         assert isinstance(value, datetime.date)
@@ -341,6 +429,7 @@ class DaysSinceEpochField(Field):
 
 class SecondsSinceEpochField(Field):
     """ Field is an integer containing number of seconds since epoch. """
+    __slots__ = ()
 
     def value_to_python(self, value):
         """
@@ -364,6 +453,19 @@ class SecondsSinceEpochField(Field):
 
         return value
 
+    def to_python_many(self, values):
+        """ Converts a column of values, parsing every integer at once. """
+        flat, lengths = _flatten(values)
+        flat = _parse_ints(flat)
+        if flat is not None:
+            utcfromtimestamp = datetime.datetime.utcfromtimestamp
+            try:
+                return _unflatten([utcfromtimestamp(value) for value in flat], lengths)
+            except OverflowError:
+                pass
+        # convert each value to get the error
+        return super(SecondsSinceEpochField, self).to_python_many(values)
+
     def value_to_db(self, value):
         """ Returns field's single value prepared for saving into a database. """
         assert isinstance(value, datetime.datetime)
@@ -391,6 +493,7 @@ class SecondsSinceEpochField(Field):
 
 class SidField(Field):
     """ Field is a binary representation of a Microsoft SID. """
+    __slots__ = ()
 
     def value_to_python(self, value):
         """
@@ -408,7 +511,7 @@ class SidField(Field):
 
         length = length // 4
 
-        array = struct.unpack('<bbbbbbbb' + 'I' * length, value)
+        array = _get_sid_struct(length).unpack(value)
 
         if array[1] != length:
             raise tldap.exceptions.ValidationError("Invalid sid")
@@ -433,7 +536,7 @@ class SidField(Field):
         array = array[1:2] + [length, 0, 0, 0, 0, 0] + array[2:]
         array = [int(i) for i in array]
 
-        return struct.pack('<bbbbbbbb' + 'I' * length, *array)
+        return _get_sid_struct(length).pack(*array)
 
     def value_validate(self, value):
         """
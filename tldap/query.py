@@ -14,15 +14,83 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with python-tldap  If not, see <http://www.gnu.org/licenses/>.
-from typing import Dict, Iterator, Optional, Set, Tuple
+import collections
+import functools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
 
 import ldap3
 from ldap3.core.exceptions import LDAPNoSuchObjectResult
 
 import tldap
 import tldap.fields
-from tldap.backend.base import LdapBase
-from tldap.filter import filter_format
+from tldap.backend.base import DEFAULT_PAGE_SIZE, LdapBase
+from tldap.dn import dn2str, is_dn_below, normalize_dn, str2dn
+from tldap.exceptions import InvalidDN
+from tldap.filter import escape_filter_chars
+
+
+FILTER_CACHE_SIZE = 256
+""" Maximum number of compiled filter templates kept. """
+
+DEFAULT_FILTER_MAX_SIZE = 32768
+""" Size in bytes above which filters with ``__in`` lookups are split into chunks. """
+
+DEFAULT_PARALLEL_SEARCHES = 4
+""" Number of chunks searched at once. """
+
+SEARCH_THREADS = 16
+""" Number of threads shared by every search of several chunks. """
+
+_PUT_TIMEOUT = 0.1
+""" Seconds between checks that the consumer of chunk results is still there. """
+
+_DONE = object()
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+_FILTER_TEMPLATES = {
+    None: b"(%s=%%s)",
+    "contains": b"(%s=*%%s*)",
+    "startswith": b"(%s=%%s*)",
+    "endswith": b"(%s=*%%s)",
+    "gte": b"(%s>=%%s)",
+    "lte": b"(%s<=%%s)",
+    "approx": b"(%s~=%%s)",
+    "present": b"(%s=*)",
+}
+""" RFC 4515 filter for each search operation, given the attribute name. """
+
+_MATCH_ALL_FILTER = b"(objectClass=*)"
+""" Filter matching every entry, used for the negation of an empty ``__in``. """
+
+
+def _get_filter_template(name: str, operation: Optional[str]) -> bytes:
+    """
+    Get the filter string for a term, with ``%s`` in place of the escaped
+    value, if the operation uses one.
+    """
+    try:
+        template = _FILTER_TEMPLATES[operation]
+    except KeyError:
+        raise ValueError("Unknown search operation %s" % operation)
+    name = escape_filter_chars(name).replace(b"%", b"%%")
+    return template % name
 
 
 def get_filter_item(name: str, operation: bytes, value: bytes) -> bytes:
@@ -31,19 +99,140 @@ def get_filter_item(name: str, operation: bytes, value: bytes) -> bytes:
     """
     assert isinstance(name, str)
     assert isinstance(value, bytes)
-    if operation is None:
-        return filter_format(b"(%s=%s)", [name, value])
-    elif operation == "contains":
+    if operation == "contains":
         assert value != ""
-        return filter_format(b"(%s=*%s*)", [name, value])
+    if operation == "present":
+        return _get_filter_template(name, operation)
+    return _get_filter_template(name, operation) % escape_filter_chars(value)
+
+
+def _split_name(name: str, pk: str) -> Tuple[str, Optional[str]]:
+    """ Split a lookup like ``uid__contains`` into the field and operation. """
+    name, _, operation = name.rpartition("__")
+    if name == "":
+        name, operation = operation, None
+
+    # replace pk with the real attribute
+    if name == "pk":
+        name = pk
+    return name, operation
+
+
+def _get_shape(q: tldap.Q, values: List[Any]) -> Optional[tuple]:
+    """
+    Get the structure of the Q tree without the values, which are appended
+    to values in the order they appear. Returns None for trees that can't be
+    compiled.
+    """
+    children = []
+    for child in q.children:
+        if isinstance(child, tldap.Q):
+            shape = _get_shape(child, values)
+            if shape is None:
+                return None
+            children.append(shape)
+        else:
+            name, value = child
+            field_name, _, operation = name.rpartition("__")
+            if operation == "in":
+                return None
+            if operation == "present":
+                # the value decides if the attribute must be present or absent
+                children.append(name if value else (tldap.Q.AND, True, (name,)))
+                continue
+            if isinstance(value, list):
+                if len(value) != 1 or (field_name or name) == "dn":
+                    return None
+                value = value[0]
+                assert isinstance(value, str)
+            children.append(name)
+            values.append(value)
+    return q.connector, q.negated, tuple(children)
+
+
+def _compile_shape(shape: tuple, pk: str, slots: List[str]) -> bytes:
+    connector, negated, children = shape
+
+    # check the details are valid
+    if negated and len(children) == 1:
+        op = b"!"
+    elif connector == tldap.Q.AND:
+        op = b"&"
+    elif connector == tldap.Q.OR:
+        op = b"|"
     else:
-        raise ValueError("Unknown search operation %s" % operation)
+        raise ValueError("Invalid value of op found")
 
+    search = []
+    for child in children:
+        if isinstance(child, tuple):
+            search.append(_compile_shape(child, pk, slots))
+        else:
+            name, operation = _split_name(child, pk)
+            # DN is a special case
+            attribute = "entryDN:" if name == "dn" else name
+            search.append(_get_filter_template(attribute, operation))
+            if operation != "present":
+                slots.append(name)
+
+    if len(search) == 1 and not negated:
+        return search[0]
+    else:
+        return b"(" + op + b"".join(search) + b")"
 
-def get_filter(q: tldap.Q, fields: Dict[str, tldap.fields.Field], pk: str):
+
+@functools.lru_cache(maxsize=FILTER_CACHE_SIZE)
+def _compile_filter(shape: tuple, pk: str) -> Tuple[bytes, Tuple[str, ...]]:
+    """
+    Compile the structure of a Q tree into a filter template, and the name
+    of the field for each value.
+    """
+    slots: List[str] = []
+    template = _compile_shape(shape, pk, slots)
+    return template, tuple(slots)
+
+
+def _get_filter_value(fields: Dict[str, tldap.fields.Field], name: str, value: Any) -> bytes:
+    if name == "dn":
+        assert isinstance(value, str)
+        return escape_filter_chars(value.encode('utf_8'))
+    return escape_filter_chars(fields[name].value_to_filter(value))
+
+
+def _get_in_filter(fields: Dict[str, tldap.fields.Field], name: str, values: Iterable[Any]) -> bytes:
+    """ Get a filter matching any of the values. """
+    attribute = "entryDN:" if name == "dn" else name
+    template = _get_filter_template(attribute, None)
+    s = [template % _get_filter_value(fields, name, value) for value in values]
+    return b"(|" + b"".join(s) + b")"
+
+
+def get_filter(q: tldap.Q, fields: Dict[str, tldap.fields.Field], pk: str) -> Optional[bytes]:
     """
     Translate the Q tree into a filter string to search for, or None
     if no results possible.
+
+    The structure of the tree is compiled once into a template, then only
+    the values are converted and escaped for each search.
+    """
+    values: List[Any] = []
+    shape = _get_shape(q, values)
+    if shape is None:
+        return _get_filter_uncompiled(q, fields, pk)
+
+    template, slots = _compile_filter(shape, pk)
+    return template % tuple(
+        _get_filter_value(fields, name, value)
+        for name, value in zip(slots, values)
+    )
+
+
+def _get_filter_uncompiled(q: tldap.Q, fields: Dict[str, tldap.fields.Field], pk: str) -> Optional[bytes]:
+    """
+    Translate the Q tree into a filter string, for trees that can't be
+    compiled. Returns None if no results are possible, as an empty
+    ``__in`` lookup matches nothing, and servers reject the empty ``(|)``
+    filter.
     """
     # check the details are valid
     if q.negated and len(q.children) == 1:
@@ -57,22 +246,35 @@ def get_filter(q: tldap.Q, fields: Dict[str, tldap.fields.Field], pk: str):
 
     # scan through every child
     search = []
+    impossible = False
     for child in q.children:
         # if this child is a node, then descend into it
         if isinstance(child, tldap.Q):
-            search.append(get_filter(child, fields, pk))
+            item = get_filter(child, fields, pk)
+            if item is None:
+                impossible = True
+            else:
+                search.append(item)
         else:
             # otherwise get the values in this node
             name, value = child
 
             # split the name if possible
-            name, _, operation = name.rpartition("__")
-            if name == "":
-                name, operation = operation, None
+            name, operation = _split_name(name, pk)
+
+            if operation == "present":
+                item = _get_filter_template("entryDN:" if name == "dn" else name, operation)
+                search.append(item if value else b"(!" + item + b")")
+                continue
 
-            # replace pk with the real attribute
-            if name == "pk":
-                name = pk
+            # list of values, any of which may match
+            if operation == "in":
+                assert not isinstance(value, (str, bytes))
+                if len(value) == 0:
+                    impossible = True
+                else:
+                    search.append(_get_in_filter(fields, name, value))
+                continue
 
             # DN is a special case
             if name == "dn":
@@ -83,7 +285,7 @@ def get_filter(q: tldap.Q, fields: Dict[str, tldap.fields.Field], pk: str):
                         assert isinstance(v, str)
                         v = v.encode('utf_8')
                         s.append(get_filter_item(dn_name, operation, v))
-                    search.append("(&".join(search) + ")")
+                    search.append(b"(&" + b"".join(s) + b")")
 
                 # or process just the single value
                 else:
@@ -104,13 +306,17 @@ def get_filter(q: tldap.Q, fields: Dict[str, tldap.fields.Field], pk: str):
                 for v in value:
                     v = field.value_to_filter(v)
                     s.append(get_filter_item(name, operation, v))
-                search.append(b"(&".join(search) + b")")
+                search.append(b"(&" + b"".join(s) + b")")
 
             # or process just the single value
             else:
                 value = field.value_to_filter(value)
                 search.append(get_filter_item(name, operation, value))
 
+    # a term that matches nothing decides an AND, and is dropped from an OR
+    if impossible and (q.connector == tldap.Q.AND or len(search) == 0):
+        return _MATCH_ALL_FILTER if q.negated else None
+
     # output the results
     if len(search) == 1 and not q.negated:
         # just one non-negative term, return it
@@ -120,12 +326,19 @@ def get_filter(q: tldap.Q, fields: Dict[str, tldap.fields.Field], pk: str):
         return b"(" + op + b"".join(search) + b")"
 
 
-def _get_search_params(query: Optional[tldap.Q], fields: Dict[str, tldap.fields.Field],
-                       object_classes: Set[str], pk: str):
-    # add object classes to search array
+@functools.lru_cache(maxsize=FILTER_CACHE_SIZE)
+def _get_object_class_query(object_classes: FrozenSet[str]) -> tldap.Q:
+    """ Get a query matching every object class. Must not be modified. """
     oc_query = tldap.Q()
     for oc in sorted(object_classes):
         oc_query = oc_query & tldap.Q(objectClass=oc)
+    return oc_query
+
+
+def _get_search_params(query: Optional[tldap.Q], fields: Dict[str, tldap.fields.Field],
+                       object_classes: Set[str], pk: str):
+    # add object classes to search array
+    oc_query = _get_object_class_query(frozenset(object_classes))
 
     if query is None:
         query = oc_query
@@ -144,18 +357,245 @@ def _get_search_params(query: Optional[tldap.Q], fields: Dict[str, tldap.fields.
     return scope, search_filter
 
 
+def get_search_filter(query: Optional[tldap.Q], fields: Dict[str, tldap.fields.Field],
+                      object_classes: Set[str], pk: str) -> Optional[bytes]:
+    """ Get the filter string used to search for query, or None if no results are possible. """
+    _, search_filter = _get_search_params(query, fields, object_classes, pk)
+    return search_filter
+
+
+def _get_base_lookup(query: Optional[tldap.Q], pk: str) -> Optional[Tuple[str, str, Optional[tldap.Q]]]:
+    """
+    If every match of query must have a given DN or primary key, get the
+    name, either ``dn`` or pk, the value, and the rest of the query.
+    """
+    if query is None or query.negated or query.connector != tldap.Q.AND:
+        return None
+    for i, child in enumerate(query.children):
+        if isinstance(child, tldap.Q):
+            continue
+        name, value = child
+        if name == "pk":
+            name = pk
+        if name in ("dn", pk) and isinstance(value, str):
+            children = query.children[:i] + query.children[i + 1:]
+            rest = query._new_instance(children, query.connector, query.negated) if children else None
+            return name, value, rest
+    return None
+
+
+def plan_search(query: Optional[tldap.Q], fields: Dict[str, tldap.fields.Field],
+                base_dn: str, object_classes: Set[str], pk: str,
+                pk_in_rdn: bool = False) -> Tuple[str, str, Optional[bytes]]:
+    """
+    Get the base, scope and filter of the search for query.
+
+    A query for a DN below base_dn is a BASE search of that entry, without
+    the DN in the filter. If pk_in_rdn is set, every entry is named by its
+    primary key directly below base_dn, so a query for a primary key is a
+    BASE search of that entry too. Anything else is a SUBTREE search of
+    base_dn.
+    """
+    subtree = (base_dn, ldap3.SUBTREE, get_search_filter(query, fields, object_classes, pk))
+
+    lookup = _get_base_lookup(query, pk)
+    if lookup is None:
+        return subtree
+    name, value, rest = lookup
+
+    try:
+        if name == "dn":
+            if not is_dn_below(normalize_dn(value), normalize_dn(base_dn)):
+                return subtree
+            dn = value
+        elif pk_in_rdn:
+            dn = dn2str([[(pk, value, 1)]] + str2dn(base_dn))
+        else:
+            return subtree
+    except InvalidDN:
+        return subtree
+    return dn, ldap3.BASE, get_search_filter(rest, fields, object_classes, pk)
+
+
 def search(
         connection: LdapBase, query: Optional[tldap.Q], fields: Dict[str, tldap.fields.Field],
-        base_dn: str, object_classes: Set[str], pk: str) -> Iterator[Tuple[str, dict]]:
-    field_names = list(fields.keys())
+        base_dn: str, object_classes: Set[str], pk: str, order_by: Optional[Sequence[str]] = None,
+        offset: int = 0, count: Optional[int] = None,
+        attributes: Optional[Sequence[str]] = None,
+        page_size: Optional[int] = None, pk_in_rdn: bool = False) -> Iterator[Tuple[str, dict]]:
+    """
+    Search for entries matching query. Every field is retrieved, unless
+    a list of attributes is given. See :py:func:`plan_search` for pk_in_rdn.
+    """
+    if attributes is not None:
+        field_names = list(attributes)
+    else:
+        field_names = list(fields.keys())
+
+    kwargs = {}
+    if order_by or offset or count is not None:
+        kwargs = {'order_by': order_by, 'offset': offset, 'count': count}
+    if page_size is not None:
+        kwargs['limit'] = page_size
 
-    scope, search_filter = _get_search_params(query, fields, object_classes, pk)
+    search_base, scope, search_filter = plan_search(query, fields, base_dn, object_classes, pk, pk_in_rdn)
+    if search_filter is None:
+        return
 
     try:
-        results = connection.search(base_dn, scope, search_filter, field_names)
+        results = connection.search(search_base, scope, search_filter, field_names, **kwargs)
         for result in results:
             dn = result[0]
             data = result[1]
             yield dn, data
     except LDAPNoSuchObjectResult:
         pass
+
+
+def _find_in_lookup(q: tldap.Q, path: Tuple[int, ...] = ()) -> Optional[Tuple[Tuple[int, ...], int]]:
+    """
+    Find the ``__in`` lookup with the most values that isn't negated.
+    Returns the indexes of the children leading to it, and the number of
+    values.
+    """
+    if q.negated:
+        return None
+
+    best = None
+    for i, child in enumerate(q.children):
+        if isinstance(child, tldap.Q):
+            found = _find_in_lookup(child, path + (i,))
+        else:
+            name, value = child
+            found = None
+            if name.endswith("__in") and len(value) > 1:
+                found = (path + (i,), len(value))
+        if found is not None and (best is None or found[1] > best[1]):
+            best = found
+    return best
+
+
+def _replace_in_lookup(q: tldap.Q, path: Tuple[int, ...], values: List[Any]) -> tldap.Q:
+    """ Copy the Q tree, with different values for the lookup at path. """
+    children = list(q.children)
+    i = path[0]
+    if len(path) == 1:
+        name, _ = children[i]
+        children[i] = (name, values)
+    else:
+        children[i] = _replace_in_lookup(children[i], path[1:], values)
+    return q._new_instance(children, q.connector, q.negated)
+
+
+def split_query(query: Optional[tldap.Q], fields: Dict[str, tldap.fields.Field],
+                object_classes: Set[str], pk: str, max_size: int) -> List[Optional[tldap.Q]]:
+    """
+    Split a query whose filter is longer than max_size bytes into several
+    queries, each with some of the values of its largest ``__in`` lookup. The
+    results of all the queries together are the results of the query.
+    Queries that are short enough, or can't be split, are returned as is.
+    """
+    if query is None:
+        return [query]
+
+    found = _find_in_lookup(query)
+    search_filter = get_search_filter(query, fields, object_classes, pk)
+    if found is None or search_filter is None or len(search_filter) <= max_size:
+        return [query]
+    path, _ = found
+
+    node = query
+    for i in path[:-1]:
+        node = node.children[i]
+    values = list(node.children[path[-1]][1])
+
+    def split(chunk_values: List[Any]) -> List[Optional[tldap.Q]]:
+        chunk = _replace_in_lookup(query, path, chunk_values)
+        if len(chunk_values) <= 1 or len(get_search_filter(chunk, fields, object_classes, pk)) <= max_size:
+            return [chunk]
+        middle = len(chunk_values) // 2
+        return split(chunk_values[:middle]) + split(chunk_values[middle:])
+
+    return split(values)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """ Get the threads shared by every search of several chunks. """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=SEARCH_THREADS, thread_name_prefix="tldap-search")
+        return _executor
+
+
+def search_chunks(
+        connection: LdapBase, queries: Sequence[Optional[tldap.Q]], fields: Dict[str, tldap.fields.Field],
+        base_dn: str, object_classes: Set[str], pk: str, attributes: Optional[Sequence[str]] = None,
+        page_size: Optional[int] = None, pk_in_rdn: bool = False,
+        max_workers: int = DEFAULT_PARALLEL_SEARCHES) -> Iterator[Tuple[str, dict]]:
+    """
+    Search for entries matching any of the queries, running up to
+    max_workers searches at once with connections from the pool. Entries
+    found by more than one query are only returned once.
+
+    Results are passed on as they arrive, and the searches only read ahead
+    a page of results. Closing the iterator stops the searches.
+    """
+    remaining = collections.deque(queries)
+    results: queue.Queue = queue.Queue(maxsize=page_size or DEFAULT_PAGE_SIZE)
+    stopped = threading.Event()
+
+    def put(item: Any) -> bool:
+        # don't wait forever for a consumer that has gone away
+        while not stopped.is_set():
+            try:
+                results.put(item, timeout=_PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def search_remaining() -> None:
+        try:
+            while not stopped.is_set():
+                try:
+                    query = remaining.popleft()
+                except IndexError:
+                    break
+                iterator = search(
+                    connection, query, fields, base_dn, object_classes, pk,
+                    attributes=attributes, page_size=page_size, pk_in_rdn=pk_in_rdn)
+                try:
+                    for result in iterator:
+                        if not put(result):
+                            break
+                finally:
+                    iterator.close()
+        except Exception as e:
+            put(e)
+        finally:
+            put(_DONE)
+
+    workers = max(min(max_workers, len(queries)), 1)
+    executor = _get_executor()
+    futures = [executor.submit(search_remaining) for _ in range(workers)]
+
+    seen = set()
+    try:
+        while workers > 0:
+            item = results.get()
+            if item is _DONE:
+                workers -= 1
+                continue
+            if isinstance(item, Exception):
+                raise item
+            dn, data = item
+            key = dn.lower()
+            if key in seen:
+                continue
+            seen.add(key)
+            yield dn, data
+    finally:
+        stopped.set()
+        for future in futures:
+            future.cancel()
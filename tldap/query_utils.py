@@ -26,6 +26,8 @@ class Q(Node):
     Encapsulates filters as objects that can then be combined logically
     (using ``&`` and ``|``).
     """
+    __slots__ = ()
+
     # Connection types
     AND = 'AND'
     OR = 'OR'
@@ -57,3 +59,30 @@ class Q(Node):
         obj.add(self, self.AND)
         obj.negate()
         return obj
+
+    def get_key(self) -> tuple:
+        """
+        Get a hashable representation of the tree. Trees with the same
+        structure and values have the same key.
+        """
+        return (self.connector, self.negated, tuple(
+            child.get_key() if isinstance(child, Q) else (child[0], _freeze(child[1]))
+            for child in self.children
+        ))
+
+    def __eq__(self, other):
+        if not isinstance(other, Q):
+            return NotImplemented
+        return self.get_key() == other.get_key()
+
+    def __hash__(self):
+        return hash(self.get_key())
+
+
+def _freeze(value):
+    """ Convert a lookup value into something that can be hashed. """
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(v) for v in value)
+    return value
@@ -29,9 +29,11 @@ Managed transactions don't do those commits, but will need some kind of manual
 or implicit commits or rollbacks.
 """
 import sys
+from contextlib import asynccontextmanager
 from functools import wraps
 
 import tldap.backend
+import tldap.backend.aio
 
 
 class TransactionManagementError(Exception):
@@ -232,3 +234,40 @@ def commit_manually(using=None):
         leave_transaction_management(using=using)
 
     return _transaction_func(entering, exiting, using)
+
+
+###########
+# ASYNCIO #
+###########
+
+
+def _get_async_connections(using):
+    if using is None:
+        return [tldap.backend.aio.get_connection(using) for using in tldap.backend.connections]
+    return [tldap.backend.aio.get_connection(using)]
+
+
+@asynccontextmanager
+async def async_commit_on_success(using=None):
+    """
+    Asyncio version of :py:func:`commit_on_success`, for use with the
+    connections of the current task. If the block runs successfully, a
+    commit is made; if it produces an exception, a rollback is made.
+    """
+    connections = _get_async_connections(using)
+
+    for connection in connections:
+        connection.enter_transaction_management()
+    try:
+        yield
+    except BaseException:
+        for connection in connections:
+            if connection.is_dirty():
+                await connection.rollback()
+        raise
+    else:
+        for connection in connections:
+            await connection.commit()
+    finally:
+        for connection in connections:
+            connection.leave_transaction_management()
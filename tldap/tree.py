@@ -12,6 +12,8 @@ class Node(object):
     connection (the root) with the children being either leaf nodes or other
     Node instances.
     """
+    __slots__ = ('children', 'connector', 'negated')
+
     # Standard connector type. Clients usually won't use this at all and
     # subclasses will usually override the value.
     default = 'DEFAULT'
@@ -37,8 +39,10 @@ class Node(object):
         method to allow a Node to create a new instance of them (if they have
         any extra setting up to do).
         """
-        obj = Node(children, connector, negated)
-        obj.__class__ = cls
+        # subclasses may have a different layout, such as a __dict__, so
+        # the class can't be changed after creating a Node
+        obj = cls.__new__(cls)
+        Node.__init__(obj, children, connector, negated)
         return obj
 
     def __str__(self):
@@ -55,8 +59,8 @@ class Node(object):
         """
         Utility method used by copy.deepcopy().
         """
-        obj = Node(connector=self.connector, negated=self.negated)
-        obj.__class__ = self.__class__
+        obj = self.__class__.__new__(self.__class__)
+        Node.__init__(obj, connector=self.connector, negated=self.negated)
         obj.children = copy.deepcopy(self.children, memodict)
         return obj
 
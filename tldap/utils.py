@@ -18,7 +18,7 @@
 """ Contains ConnectionHandler which represents a list of connections. """
 
 import sys
-from threading import local
+from threading import Lock, local
 
 
 DEFAULT_LDAP_ALIAS = "default"
@@ -30,21 +30,40 @@ def load_backend(backend_name):
 
 
 class ConnectionHandler(object):
-    """ Contains a list of known LDAP connections. """
+    """
+    Contains a list of known LDAP connections. Every thread gets its own
+    connection object for each alias, however the pool of LDAP connections
+    behind each alias is shared between all threads.
+    """
 
     def __init__(self, databases):
         self.databases = databases
         self._connections = local()
+        self._pool_owners = {}
+        self._lock = Lock()
 
     def __getitem__(self, alias):
         if hasattr(self._connections, alias):
             return getattr(self._connections, alias)
 
+        conn = self.create(alias)
+        setattr(self._connections, alias, conn)
+        return conn
+
+    def create(self, alias):
+        """ Create a new connection object for alias that shares its pool. """
         db = self.databases[alias]
 
         backend = load_backend(db['ENGINE'])
         conn = backend.LDAPwrapper(db)
-        setattr(self._connections, alias, conn)
+        conn.alias = alias
+
+        with self._lock:
+            if alias in self._pool_owners:
+                conn.share_pools(self._pool_owners[alias])
+            else:
+                self._pool_owners[alias] = conn
+
         return conn
 
     def __iter__(self):